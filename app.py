@@ -1,38 +1,373 @@
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g, stream_with_context, has_request_context
 import os
+import json
+import hashlib
+import hmac
+import gzip
+import zlib
 import logging
 import threading
 import time
-from datetime import datetime, timedelta
-from translation_worker import process_translation_jobs
-from database import init_db, get_db, execute_with_params
+import metrics
+import webhooks
+from translation_worker import start_workers, partial_translation, WORKER_COUNT
+from database import init_db, get_db, execute_read, execute_with_params, write_transaction, utc_timestamp, compress_text, put_texts, get_texts, in_batches
+from purge import run_scheduler as run_purge_scheduler
+from scheduler import PRIORITY_MIN, PRIORITY_MAX
+from notifications import notify_work_available, notify_deliveries_queued, status_registry
+from log_config import setup_logging, bind_log_context, reset_log_context
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+try:
+    import brotli
+except ImportError:  # Optional: without it, responses fall back to gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 API_KEY = os.getenv("TRANSLATION_API_KEY", "your_default_api_key")  # Use env variable for security
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # Bearer token for /metrics; empty = open to the scraper network
+STATUS_MAX_WAIT_SECONDS = float(os.getenv('STATUS_MAX_WAIT_SECONDS', '60'))  # Cap on /status?wait=
+SSE_MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_STREAM_SECONDS', '3600'))  # Cap on one event stream
+SSE_HEARTBEAT_SECONDS = 15  # Keep-alive comment interval on idle streams
+API_THREADS = int(os.getenv('API_THREADS', '32'))  # Request threads per API process (see gunicorn.conf.py)
+# Long-polls and event streams held open per API process. Each holds a request thread,
+# so the default leaves half of them for other requests; beyond it a long-poll answers
+# at once and an event stream gets a 503.
+STATUS_MAX_WAITERS = int(os.getenv('STATUS_MAX_WAITERS', str(max(1, API_THREADS // 2))))
+TERMINAL_STATUSES = ('completed', 'failed')
+_waiter_slots = threading.BoundedSemaphore(STATUS_MAX_WAITERS)
+REQUIRED_JOB_FIELDS = ('sermon_guid', 'sermon_title', 'transcription', 'current_language', 'convert_to_language', 'region')
+BATCH_MAX_JOBS = int(os.getenv('BATCH_MAX_JOBS', '500'))  # Items accepted per batch request
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))  # Smaller bodies are sent as-is
+MAX_TARGET_LANGUAGES = int(os.getenv('MAX_TARGET_LANGUAGES', '20'))  # Languages per multi-target submission
+FANOUT_STATUS = 'fanout'  # Stored status of a multi-target job; clients see its children's combined status
 
-def purge_old_completed_jobs():
-    """Deletes translation jobs that were completed more than 4 hours ago."""
-    try:
-        threshold_time = (datetime.utcnow() - timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
-        execute_with_params(
-            "DELETE FROM translations WHERE status = 'completed' AND finished_at <= ?",
-            (threshold_time,)
+# Fields a multi-target job reports per language, under "translations"
+LANGUAGE_STATUS_FIELDS = ('status', 'translated_sermon_title', 'translated_text', 'finished', 'progress')
+PROGRESS_KEYS = ('chunks_done', 'chunks_total', 'characters_done', 'characters_total')
+
+# /status response field -> translations column (or expression)
+STATUS_FIELD_COLUMNS = {
+    "sermon_guid": "sermon_guid",
+    "translated_sermon_title": "translated_sermon_title",
+    "translated_text": "translated_text",
+    "status": "status",
+    "created": "created_at",
+    "convert_to_language": "convert_to_language",
+    "finished": "finished_at",
+    # NULL until a worker starts translating the job
+    "progress": "CASE WHEN chunks_total IS NULL THEN NULL ELSE json_object({}) END".format(
+        ", ".join(f"'{key}', {key}" for key in PROGRESS_KEYS)
+    ),
+}
+
+def compute_content_hash(transcription, sermon_title, current_language, convert_to_language):
+    """Content address of a job: identical inputs always produce identical translations."""
+    payload = json.dumps([transcription, sermon_title, current_language, convert_to_language], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def missing_required_fields(data):
+    """Whether a submitted job lacks any of the required fields, or has one that is not a non-empty string.
+
+    convert_to_language may also be a list; invalid_optional_fields checks its shape.
+    """
+    return not isinstance(data, dict) or not all(
+        data.get(field) and (field == 'convert_to_language' or isinstance(data[field], str))
+        for field in REQUIRED_JOB_FIELDS
+    )
+
+def invalid_optional_fields(data):
+    """Error message for a malformed optional field (or list of target languages, or
+    reserved sermon GUID) of a submitted job, or None."""
+    if '/' in data['sermon_guid']:
+        return "sermon_guid must not contain '/'"
+    targets = data['convert_to_language']
+    if not (isinstance(targets, str) or isinstance(targets, list) and len(targets) <= MAX_TARGET_LANGUAGES
+            and all(target and isinstance(target, str) for target in targets) and len(set(targets)) == len(targets)):
+        return f"convert_to_language must be a language code or a list of up to {MAX_TARGET_LANGUAGES} distinct codes"
+    priority = data.get('priority', 0)
+    if isinstance(priority, bool) or not isinstance(priority, int) or not PRIORITY_MIN <= priority <= PRIORITY_MAX:
+        return f"priority must be an integer from {PRIORITY_MIN} to {PRIORITY_MAX}"
+    client_id = data.get('client_id')
+    if client_id is not None and not isinstance(client_id, str):
+        return "client_id must be a string"
+    if data.get('callback_url') is not None:
+        return webhooks.invalid_callback_url(data['callback_url'])
+    return None
+
+def _select_in(cursor, query, values):
+    """Run ``query`` (containing one ``{placeholders}``) for ``values`` in variable-limit-safe batches."""
+    rows = []
+    for batch, placeholders in in_batches(values):
+        rows.extend(cursor.execute(query.format(placeholders=placeholders), batch).fetchall())
+    return rows
+
+def target_guid(sermon_guid, language):
+    """GUID of the child job translating a multi-target job into ``language``.
+
+    Submitted GUIDs may not contain '/', so clients never collide with these.
+    """
+    return f"{sermon_guid}/{language}"
+
+def request_client_id():
+    """The submitting client's id from the X-Client-Id header, outside a request None."""
+    return request.headers.get('X-Client-Id') if has_request_context() else None
+
+def prepare_translation_jobs(jobs):
+    """Hash and compress validated jobs ahead of insert_translation_jobs.
+
+    Call this before taking the write lock so the CPU work is not done while holding it.
+    Jobs without a ``client_id`` take the request's X-Client-Id header, if any. A job
+    with a list of target languages gets one content hash per target. Already-prepared
+    jobs are returned unchanged.
+    """
+    prepared = []
+    for job in jobs:
+        if 'transcription_body' not in job:
+            targets = job['convert_to_language']
+            hashes = [
+                compute_content_hash(job['transcription'], job['sermon_title'], job['current_language'], target)
+                for target in (targets if isinstance(targets, list) else [targets])
+            ]
+            job = dict(
+                job,
+                content_hash=hashes if isinstance(targets, list) else hashes[0],
+                transcription_body=compress_text(job['transcription']),
+                size_chars=len(job['transcription']),
+                priority=job.get('priority', 0),
+                client_id=job.get('client_id') or request_client_id(),
+                callback_url=job.get('callback_url'),
+            )
+        prepared.append(job)
+    return prepared
+
+def insert_translation_jobs(cursor, jobs):
+    """Insert validated translation jobs inside an open write transaction.
+
+    Duplicate GUIDs (already stored, or repeated within ``jobs``) are skipped. If a job
+    with identical content already completed, its result is copied and the new job is
+    created completed with no API call. If one is still pending or processing (or is
+    earlier in ``jobs``), the new job is attached to it and completes when it does.
+    Lookups are one IN query each and inserts use executemany, however many jobs there
+    are. Transcriptions (and copied results) go to translation_texts, compressed; pass
+    jobs through prepare_translation_jobs first to compress outside the lock. Returns a
+    list parallel to ``jobs`` holding each new job's status, or None for a duplicate GUID.
+
+    A job with a list of target languages is stored as a FANOUT_STATUS row holding the
+    transcription once, plus one child job per language (see target_guid) that is
+    deduplicated, scheduled and claimed like any other job. Its status is 'pending'
+    unless every language was served from a completed translation.
+    """
+    jobs = prepare_translation_jobs(jobs)
+    # One unit per translation: a single-target job, or one language of a multi-target job
+    units = []
+    guids = []  # Per job, every GUID it would take
+    for index, job in enumerate(jobs):
+        if isinstance(job['convert_to_language'], list):
+            children = [dict(
+                job, sermon_guid=target_guid(job['sermon_guid'], language), convert_to_language=language,
+                content_hash=content_hash, parent_guid=job['sermon_guid']
+            ) for language, content_hash in zip(job['convert_to_language'], job['content_hash'])]
+            units.extend((index, dict(child, callback_url=None)) for child in children)  # The job's callback covers them
+            guids.append({job['sermon_guid'], *(child['sermon_guid'] for child in children)})
+        else:
+            units.append((index, job))
+            guids.append({job['sermon_guid']})
+
+    existing = {row['sermon_guid'] for row in _select_in(
+        cursor, "SELECT sermon_guid FROM translations WHERE sermon_guid IN ({placeholders})",
+        list(set().union(*guids))
+    )}
+    accepted = set()
+    for index, job_guids in enumerate(guids):
+        if not job_guids & existing:
+            existing |= job_guids
+            accepted.add(index)
+    units = [(index, unit) for index, unit in units if index in accepted]
+    parents = [jobs[index] for index in sorted(accepted) if isinstance(jobs[index]['convert_to_language'], list)]
+
+    cursor.executemany(
+        f"""
+        INSERT INTO translations
+        (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region,
+         priority, size_chars, client_id, callback_url, status)
+        VALUES (?, ?, '', ?, ?, ?, ?, ?, ?, ?, '{FANOUT_STATUS}')
+        """,
+        [(job['sermon_guid'], job['sermon_title'], job['current_language'], ",".join(job['convert_to_language']),
+          job['region'], job['priority'], job['size_chars'], job['client_id'], job['callback_url']) for job in parents]
+    )
+    parent_ids = {row['sermon_guid']: row['id'] for row in _select_in(
+        cursor, "SELECT sermon_guid, id FROM translations WHERE sermon_guid IN ({placeholders})",
+        [job['sermon_guid'] for job in parents]
+    )} if parents else {}
+
+    hashes = [unit['content_hash'] for _, unit in units]
+    completed = {row['content_hash']: row for row in _select_in(
+        cursor,
+        "SELECT content_hash, id, translated_text, translated_sermon_title FROM translations "
+        "WHERE content_hash IN ({placeholders}) AND status = 'completed'",
+        list(set(hashes))
+    )}
+    in_flight = {row['content_hash']: row['id'] for row in _select_in(
+        cursor,
+        "SELECT content_hash, id FROM translations "
+        "WHERE content_hash IN ({placeholders}) AND status IN ('pending', 'processing') AND duplicate_of IS NULL",
+        list(set(hashes) - set(completed))
+    )}
+
+    finished_at = utc_timestamp()
+    unit_statuses = {}
+    inserted, copied = [], []
+    copies, attached, roots, followers = [], [], [], []
+    root_guid_by_hash = {}
+    for (index, job), content_hash in zip(units, hashes):
+        inserted.append(job)
+        row = (job['sermon_guid'], job['sermon_title'], '', job['current_language'], job['convert_to_language'],
+               job['region'], job['priority'], job['size_chars'], job['client_id'], job['callback_url'],
+               parent_ids.get(job.get('parent_guid')))
+        if content_hash in completed:
+            match = completed[content_hash]
+            copies.append(row + (match['translated_sermon_title'], finished_at, content_hash))
+            copied.append(job)
+            unit_statuses.setdefault(index, []).append('completed')
+        elif content_hash in in_flight:
+            attached.append(row + (content_hash, in_flight[content_hash]))
+            unit_statuses.setdefault(index, []).append('pending')
+        elif content_hash in root_guid_by_hash:
+            followers.append((row, content_hash))
+            unit_statuses.setdefault(index, []).append('pending')
+        else:
+            root_guid_by_hash[content_hash] = job['sermon_guid']
+            roots.append(row + (content_hash, None))
+            unit_statuses.setdefault(index, []).append('pending')
+
+    cursor.executemany(
+        '''
+        INSERT INTO translations
+        (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region,
+         priority, size_chars, client_id, callback_url, parent_id, status, translated_sermon_title, finished_at,
+         content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'completed', ?, ?, ?)
+        ''',
+        copies
+    )
+    insert_pending = '''
+        INSERT INTO translations
+        (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region,
+         priority, size_chars, client_id, callback_url, parent_id, status, content_hash, duplicate_of)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)
+    '''
+    cursor.executemany(insert_pending, roots + attached)
+    if followers:
+        root_ids = {row['sermon_guid']: row['id'] for row in _select_in(
+            cursor, "SELECT sermon_guid, id FROM translations WHERE sermon_guid IN ({placeholders})",
+            list({root_guid_by_hash[content_hash] for _, content_hash in followers})
+        )}
+        cursor.executemany(insert_pending, [
+            row + (content_hash, root_ids[root_guid_by_hash[content_hash]]) for row, content_hash in followers
+        ])
+    # An urgent duplicate makes the job it waits on just as urgent
+    cursor.executemany(
+        "UPDATE translations SET priority = ? WHERE id = ? AND priority < ?",
+        [(row[6], row[-1], row[6]) for row in attached]
+        + [(row[6], root_ids[root_guid_by_hash[content_hash]], row[6]) for row, content_hash in followers]
+    )
+
+    if inserted:
+        new_ids = {row['sermon_guid']: row['id'] for row in _select_in(
+            cursor, "SELECT sermon_guid, id FROM translations WHERE sermon_guid IN ({placeholders})",
+            [job['sermon_guid'] for job in inserted]
+        )}
+        # Child jobs read the transcription of their multi-target job
+        put_texts(cursor, 'transcription', [
+            (new_ids[job['sermon_guid']], job['transcription_body']) for job in inserted if 'parent_guid' not in job
+        ] + [(parent_ids[job['sermon_guid']], job['transcription_body']) for job in parents])
+        # Results are copied as stored (still compressed); rows from before the
+        # split may hold theirs inline
+        cursor.executemany(
+            "INSERT OR REPLACE INTO translation_texts (job_id, kind, codec, body) "
+            "SELECT ?, kind, codec, body FROM translation_texts WHERE job_id = ? AND kind = 'translated_text'",
+            [(new_ids[job['sermon_guid']], completed[job['content_hash']]['id']) for job in copied]
         )
-        logging.info("Successfully purged old completed jobs.")
-    except Exception as e:
-        logging.error(f"Error while purging old completed jobs: {e}")
+        put_texts(cursor, 'translated_text', [
+            (new_ids[job['sermon_guid']], compress_text(completed[job['content_hash']]['translated_text']))
+            for job in copied if completed[job['content_hash']]['translated_text'] is not None
+        ])
+        if webhooks.enqueue_deliveries(cursor, [new_ids[job['sermon_guid']] for job in copied]):
+            notify_deliveries_queued()
+
+    if copies:
+        logger.info("%d job(s) matched completed translations; reused their results.", len(copies))
+    if attached or followers:
+        logger.info("%d job(s) attached to in-flight jobs with identical content.", len(attached) + len(followers))
+    return [
+        ('pending' if 'pending' in unit_statuses[index] else 'completed') if index in accepted else None
+        for index in range(len(jobs))
+    ]
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    sermon_guid = (request.view_args or {}).get('sermon_guid')
+    if sermon_guid:
+        g.log_context = bind_log_context(sermon_guid=sermon_guid)
 
 @app.before_request
 def require_api_key():
-    """Middleware to enforce API Key authentication."""
+    """Middleware to enforce API Key authentication.
+
+    /metrics is keyed separately, by METRICS_TOKEN, so scrapers never hold the API key.
+    """
+    if request.path == '/metrics':
+        expected = f"Bearer {METRICS_TOKEN}"
+        if METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            logger.warning("Unauthorized metrics scrape.", extra={"rate_limit": True})
+            return jsonify({"error": "Unauthorized"}), 401
+        return None
     key = request.headers.get('X-API-KEY')
     if key != API_KEY:
-        logging.warning("Unauthorized access attempt.")
+        logger.warning("Unauthorized access attempt.", extra={"rate_limit": True})
         return jsonify({"error": "Unauthorized"}), 401
 
+@app.after_request
+def record_request_latency(response):
+    """Observe the request's latency by route. Registered first, so it runs after compression."""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUEST_DURATION.labels(request.method, route, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress large JSON bodies with br or gzip, as negotiated via Accept-Encoding."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code >= 300 or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(body, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.teardown_request
+def unbind_log_context(exception=None):
+    token = g.pop('log_context', None)
+    if token is not None:
+        reset_log_context(token)
+
 @app.teardown_appcontext
 def cleanup(exception=None):
     """Cleanup resources at the end of request."""
@@ -44,7 +379,9 @@ def cleanup(exception=None):
 def request_translation():
     """Endpoint to submit a translation request."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
         sermon_guid = data.get('sermon_guid')
         sermon_title = data.get('sermon_title')  
         transcription = data.get('transcription')
@@ -53,106 +390,464 @@ def request_translation():
         region = data.get('region')
 
         # Check if all required fields are provided
-        if not all([sermon_guid, sermon_title, transcription, current_language, convert_to_language, region]):
-            logging.error("Missing required fields in request.")
+        if missing_required_fields(data):
+            logger.error("Missing required fields in request.")
             return jsonify({"error": "Missing required fields"}), 400
+        error = invalid_optional_fields(data)
+        if error:
+            return jsonify({"error": error}), 400
 
-        # Check if sermon GUID already exists
-        result = execute_with_params(
-            'SELECT id FROM translations WHERE sermon_guid = ?',
-            (sermon_guid,)
-        )
-        if result:
-            logging.warning(f"Duplicate sermon GUID detected: {sermon_guid}")
+        # Hash and compress before taking the lock; duplicate check and insert happen in one transaction
+        job = prepare_translation_jobs([{
+            "sermon_guid": sermon_guid,
+            "sermon_title": sermon_title,
+            "transcription": transcription,
+            "current_language": current_language,
+            "convert_to_language": convert_to_language,
+            "region": region,
+            "priority": data.get('priority', 0),
+            "client_id": data.get('client_id'),
+            "callback_url": data.get('callback_url'),
+        }])
+        with write_transaction() as cursor:
+            status = insert_translation_jobs(cursor, job)[0]
+        if status is None:
+            logger.warning("Duplicate sermon GUID detected: %s", sermon_guid)
             return jsonify({"error": "A translation request for this sermon already exists."}), 409
 
-        # Insert new translation request
-        execute_with_params(
-            '''
-            INSERT INTO translations 
-            (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'pending')
-            ''',
-            (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region)
-        )
-        logging.info(f"Translation request submitted: {sermon_guid}")
-        return jsonify({"message": "Translation request submitted successfully"}), 201
+        if status == 'pending':
+            notify_work_available()
+        logger.info("Translation request submitted: %s (%s)", sermon_guid, status)
+        return jsonify({"message": "Translation request submitted successfully", "status": status}), 201
 
     except Exception as e:
-        logging.exception(f"Error occurred while processing translation request: {e}")
+        logger.exception("Error occurred while processing translation request: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
+def _json_list(data, key):
+    """Accept either a bare JSON array or an object wrapping it under ``key``."""
+    if isinstance(data, dict):
+        data = data.get(key)
+    return data if isinstance(data, list) else None
+
+@app.route('/translate/batch', methods=['POST'])
+def request_translation_batch():
+    """Endpoint to submit many translation requests in one transaction.
+
+    Returns one result per submitted item: ``created`` (with the job's status),
+    ``duplicate`` or ``invalid``.
+    """
+    try:
+        jobs = _json_list(request.get_json(silent=True), 'jobs')
+        if jobs is None:
+            return jsonify({"error": "Expected a JSON array of jobs"}), 400
+        if len(jobs) > BATCH_MAX_JOBS:
+            return jsonify({"error": f"At most {BATCH_MAX_JOBS} jobs per batch"}), 413
+
+        results = []
+        valid = []
+        for index, job in enumerate(jobs):
+            error = "Missing required fields" if missing_required_fields(job) else invalid_optional_fields(job)
+            if error:
+                results.append({
+                    "index": index,
+                    "sermon_guid": job.get('sermon_guid') if isinstance(job, dict) else None,
+                    "result": "invalid",
+                    "error": error,
+                })
+            else:
+                results.append(None)
+                valid.append(index)
+
+        statuses = []
+        if valid:
+            prepared = prepare_translation_jobs([jobs[index] for index in valid])
+            with write_transaction() as cursor:
+                statuses = insert_translation_jobs(cursor, prepared)
+        for index, status in zip(valid, statuses):
+            result = {"index": index, "sermon_guid": jobs[index]['sermon_guid']}
+            if status is None:
+                result.update(result="duplicate", error="A translation request for this sermon already exists.")
+            else:
+                result.update(result="created", status=status)
+            results[index] = result
+
+        if 'pending' in statuses:
+            notify_work_available()
+        logger.info("Batch translation request: %d item(s), %d created.", len(jobs), sum(1 for status in statuses if status))
+        return jsonify({"results": results}), 200
+
+    except Exception as e:
+        logger.exception("Error occurred while processing batch translation request: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/status/batch', methods=['POST'])
+def get_translation_status_batch():
+    """Fetches the statuses of many jobs in one indexed query, in the order requested.
+
+    Supports the same ``?fields=`` projection as /status/<sermon_guid>.
+    """
+    try:
+        try:
+            fields = parse_status_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+        if 'sermon_guid' not in fields:
+            fields = ['sermon_guid'] + fields  # Needed to match rows to the request
+        sermon_guids = _json_list(request.get_json(silent=True), 'sermon_guids')
+        if sermon_guids is None or not all(isinstance(guid, str) for guid in sermon_guids):
+            return jsonify({"error": "Expected a JSON array of sermon GUIDs"}), 400
+        if len(sermon_guids) > BATCH_MAX_JOBS:
+            return jsonify({"error": f"At most {BATCH_MAX_JOBS} GUIDs per batch"}), 413
+
+        found = {}
+        for batch, placeholders in in_batches(dict.fromkeys(sermon_guids)):
+            rows = execute_with_params(
+                f"SELECT id, status AS job_status, {_status_columns(fields)} FROM translations "
+                f"WHERE sermon_guid IN ({placeholders})",
+                batch
+            )
+            found.update((response['sermon_guid'], response) for response in status_responses(rows, fields))
+
+        statuses = [found.get(guid) or {"sermon_guid": guid, "error": "Translation job not found."} for guid in sermon_guids]
+        return jsonify({"statuses": statuses}), 200
+
+    except Exception as e:
+        logger.exception("Error occurred while fetching batch translation status: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@metrics.register_collector
+def queue_depth():
+    """Jobs per status, counted from the database so every process reports the same numbers."""
+    rows = execute_read(
+        "SELECT status, COUNT(*) AS jobs FROM translations WHERE status <> ? GROUP BY status", (FANOUT_STATUS,)
+    )
+    depth = {(status,): 0 for status in ('pending', 'processing', *TERMINAL_STATUSES)}
+    depth.update({(row['status'],): row['jobs'] for row in rows})
+    return [('translator_queue_jobs', "Jobs in the queue by status.", ('status',), depth)]
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/')
 def index():
     """Default route serving a blank page."""
     return "", 200
 
+def parse_status_fields(value):
+    """Parse a ``?fields=`` projection into response field names (all fields when absent)."""
+    if not value:
+        return list(STATUS_FIELD_COLUMNS)
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in STATUS_FIELD_COLUMNS]
+    if unknown or not fields:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return fields
+
+def _status_columns(fields):
+    """SQL select list for a projection, aliased to the response field names."""
+    return ", ".join(f"{STATUS_FIELD_COLUMNS[field]} AS {field}" for field in fields)
+
+def load_translated_texts(rows, fields):
+    """Fill ``translated_text`` on status rows from translation_texts, if it was requested.
+
+    Rows still holding the text inline (written before the side table) keep that value.
+    """
+    if 'translated_text' not in fields or not rows:
+        return
+    texts = get_texts([row['id'] for row in rows], 'translated_text')
+    for row in rows:
+        row['translated_text'] = texts.get(row['id'], row['translated_text'])
+
+def load_progress(rows, fields):
+    """Decode ``progress`` on status rows, if it was requested."""
+    if 'progress' in fields:
+        for row in rows:
+            row['progress'] = json.loads(row['progress']) if row['progress'] else None
+
+def combined_progress(progresses):
+    """Progress of a multi-target job: its languages' progress summed, once all of them have started."""
+    if not progresses or None in progresses:
+        return None
+    return {key: sum(progress[key] for progress in progresses) for key in PROGRESS_KEYS}
+
+def load_partial_texts(rows):
+    """Set ``partial_text`` on unfinished status rows to their translation so far; see partial_translation."""
+    unfinished = [row for row in rows if row['job_status'] not in TERMINAL_STATUSES]
+    jobs = {}
+    for batch, placeholders in in_batches(row['id'] for row in unfinished):
+        jobs.update((job['id'], job) for job in execute_read(
+            f"SELECT id, parent_id, sermon_title, transcription, chunks_total FROM translations "
+            f"WHERE id IN ({placeholders})",
+            batch
+        ))
+    # Nothing to show before a worker has started; the languages of a multi-target job share its source
+    started = [job for job in jobs.values() if job['chunks_total'] is not None]
+    sources = get_texts({job['parent_id'] or job['id'] for job in started}, 'transcription')
+    for row in unfinished:
+        job = jobs.get(row['id'])
+        if job is None or job['chunks_total'] is None:
+            row['partial_text'] = ""
+        else:
+            transcription = sources.get(job['parent_id'] or job['id'], job['transcription'])
+            row['partial_text'] = partial_translation(job['id'], transcription, job['sermon_title'])
+
+def combined_status(statuses):
+    """Status of a multi-target job from the statuses of its languages."""
+    if all(status in TERMINAL_STATUSES for status in statuses):
+        return 'completed' if all(status == 'completed' for status in statuses) else 'failed'
+    return 'pending' if all(status == 'pending' for status in statuses) else 'processing'
+
+def status_responses(rows, fields, partial=False):
+    """Response data for status rows (selected with ``job_status``), in order.
+
+    A multi-target job reports its combined status and progress, its list of languages
+    and, under ``translations``, each language's status and requested translated fields.
+    With ``partial``, unfinished jobs (and languages) also report ``partial_text``.
+    """
+    parents = {row['id']: row for row in rows if row['job_status'] == FANOUT_STATUS}
+    singles = [row for row in rows if row['id'] not in parents]
+    load_translated_texts(singles, fields)
+    load_progress(singles, fields)
+    languages = {parent_id: {} for parent_id in parents}
+    language_fields = [field for field in LANGUAGE_STATUS_FIELDS if field == 'status' or field in fields]
+    children = []
+    for batch, placeholders in in_batches(parents):
+        children += execute_read(
+            f"SELECT id, parent_id, convert_to_language AS language, status AS job_status, "
+            f"{_status_columns(language_fields)} "
+            f"FROM translations WHERE parent_id IN ({placeholders}) ORDER BY id",
+            batch
+        )
+    load_translated_texts(children, language_fields)
+    load_progress(children, language_fields)
+    if partial:
+        load_partial_texts(singles + children)
+    for child in children:
+        result = {field: child[field] for field in language_fields}
+        if 'partial_text' in child:
+            result['partial_text'] = child['partial_text']
+        languages[child['parent_id']][child['language']] = result
+
+    responses = []
+    for row in rows:
+        if row['id'] not in parents:
+            response = {field: row[field] for field in fields}
+            if 'partial_text' in row:
+                response['partial_text'] = row['partial_text']
+            responses.append(response)
+            continue
+        results = languages[row['id']]
+        status = combined_status([result['status'] for result in results.values()])
+        response = {}
+        for field in fields:
+            if field == 'status':
+                response[field] = status
+            elif field == 'convert_to_language':
+                response[field] = row[field].split(",")
+            elif field == 'finished':
+                response[field] = max(result['finished'] for result in results.values()) if status in TERMINAL_STATUSES else None
+            elif field == 'progress':
+                response[field] = combined_progress([result['progress'] for result in results.values()])
+            elif field not in ('translated_text', 'translated_sermon_title'):
+                response[field] = row[field]
+        response['translations'] = results
+        responses.append(response)
+    return responses
+
+def status_etag(row, fields, partial=False):
+    """Weak ETag for a job's projection: changes with the row version, the field set and ``partial``."""
+    projection = ','.join(fields) + (';partial' if partial else '')
+    return f"{row['id']}.{row['version']}.{zlib.crc32(projection.encode()):08x}"
+
+def fetch_status_version(sermon_guid):
+    """Read just a job's id, version and (combined, for a multi-target job) status, or None if the GUID is unknown."""
+    result = execute_with_params(
+        "SELECT id, version, status FROM translations WHERE sermon_guid = ?",
+        (sermon_guid,)
+    )
+    if not result:
+        return None
+    row = result[0]
+    if row['status'] == FANOUT_STATUS:
+        children = execute_read("SELECT status FROM translations WHERE parent_id = ?", (row['id'],))
+        row['status'] = combined_status([child['status'] for child in children])
+    return row
+
+def fetch_translation_status(sermon_guid, fields=None, partial=False):
+    """Read a job's status fields, or None if the GUID is unknown.
+
+    Only the columns behind ``fields`` are read, so a status-only request never pulls
+    the translated text out of the database. See status_responses for ``partial``.
+    Returns ``(response_data, etag)``.
+    """
+    fields = fields or list(STATUS_FIELD_COLUMNS)
+    result = execute_with_params(
+        f"SELECT id, version, status AS job_status, {_status_columns(fields)} FROM translations WHERE sermon_guid = ?",
+        (sermon_guid,)
+    )
+    if not result:
+        return None
+    row = result[0]
+    return status_responses([row], fields, partial)[0], status_etag(row, fields, partial)
+
+def parse_wait_seconds(value, maximum):
+    """Parse a ``wait``/``timeout`` query value in seconds, capped at ``maximum``."""
+    if value is None:
+        return 0.0
+    seconds = float(value)
+    if seconds < 0:
+        raise ValueError("must not be negative")
+    return min(seconds, maximum)
+
+def parse_flag(value):
+    """Parse a boolean query value (absent means false)."""
+    if value is None or value.lower() in ('0', 'false'):
+        return False
+    if value.lower() in ('1', 'true'):
+        return True
+    raise ValueError("must be true or false")
+
 @app.route('/status/<sermon_guid>', methods=['GET'])
 def get_translation_status(sermon_guid):
-    """Fetches the status of a translation job by sermon GUID, returning only the translated fields and timestamps."""
+    """Fetches the status of a translation job by sermon GUID, returning only the translated fields and timestamps.
+
+    ``?fields=a,b`` limits the response (and the SQL) to those fields. Responses carry a
+    weak ETag; a matching ``If-None-Match`` gets a 304 without the row being read. With
+    ``?wait=<seconds>`` an unfinished or unchanged job is held open until it changes or
+    the wait elapses, whichever comes first; a finished chunk counts as a change.
+    ``?partial=true`` adds the translated text so far to unfinished jobs, as
+    ``partial_text``. With STATUS_MAX_WAITERS requests already waiting, the wait is skipped.
+    """
     try:
-        result = execute_with_params(
-            "SELECT * FROM translations WHERE sermon_guid = ?",
-            (sermon_guid,)
-        )
+        try:
+            wait = parse_wait_seconds(request.args.get('wait'), STATUS_MAX_WAIT_SECONDS)
+            fields = parse_status_fields(request.args.get('fields'))
+            partial = parse_flag(request.args.get('partial'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid query parameter: {e}"}), 400
 
-        if not result:
-            logging.warning(f"Translation status request: Sermon GUID not found - {sermon_guid}")
-            return jsonify({"error": "Translation job not found."}), 404
+        waiting = bool(wait) and _waiter_slots.acquire(blocking=False)
+        # Subscribe before reading so a change between the read and the wait is not missed
+        event = status_registry.subscribe(sermon_guid) if waiting else None
+        try:
+            current = fetch_status_version(sermon_guid)
+            if current is None:
+                logger.warning("Translation status request: Sermon GUID not found - %s", sermon_guid, extra={"rate_limit": True})
+                return jsonify({"error": "Translation job not found."}), 404
 
-        translation_data = result[0]
-        logging.info(f"Translation status retrieved for Sermon GUID: {sermon_guid}")
+            unchanged = request.if_none_match.contains_weak(status_etag(current, fields, partial))
+            if event is not None and (unchanged or current["status"] not in TERMINAL_STATUSES) and event.wait(wait):
+                current = fetch_status_version(sermon_guid) or current
+                unchanged = request.if_none_match.contains_weak(status_etag(current, fields, partial))
+        finally:
+            if event is not None:
+                status_registry.unsubscribe(sermon_guid, event)
+            if waiting:
+                _waiter_slots.release()
 
-        # Only return the desired fields
-        response_data = {
-            "sermon_guid": translation_data.get("sermon_guid"),
-            "translated_sermon_title": translation_data.get("translated_sermon_title"),
-            "translated_text": translation_data.get("translated_text"),
-            "status": translation_data.get("status"),
-            "created": translation_data.get("created"),
-            "convert_to_language": translation_data.get("convert_to_language"),
-            "finished": translation_data.get("finished_at")
-        }
+        if unchanged:
+            response = app.response_class(status=304)
+            response.set_etag(status_etag(current, fields, partial), weak=True)
+            return response
 
-        return jsonify(response_data), 200
+        fetched = fetch_translation_status(sermon_guid, fields, partial)
+        if fetched is None:
+            return jsonify({"error": "Translation job not found."}), 404
+        response_data, etag = fetched
+        logger.debug("Translation status retrieved for Sermon GUID: %s", sermon_guid)
+        response = jsonify(response_data)
+        response.set_etag(etag, weak=True)
+        return response, 200
 
     except Exception as e:
-        logging.exception(f"Error occurred while fetching translation status: {e}")
+        logger.exception("Error occurred while fetching translation status: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/status/<sermon_guid>/events', methods=['GET'])
+def stream_translation_status(sermon_guid):
+    """Server-Sent Events stream of a job's status transitions and progress.
+
+    Sends the current status immediately, then one ``status`` event per transition or
+    finished chunk, and closes after a terminal status or ``?timeout=<seconds>``.
+    ``?partial=true`` is as for /status. Comment lines keep idle connections alive.
+    With STATUS_MAX_WAITERS requests already waiting, the answer is 503 with Retry-After.
+    """
+    try:
+        timeout = parse_wait_seconds(request.args.get('timeout', SSE_MAX_STREAM_SECONDS), SSE_MAX_STREAM_SECONDS)
+    except ValueError:
+        return jsonify({"error": "timeout must be a non-negative number of seconds"}), 400
+    try:
+        partial = parse_flag(request.args.get('partial'))
+    except ValueError:
+        return jsonify({"error": "partial must be true or false"}), 400
+    if fetch_translation_status(sermon_guid) is None:
+        logger.warning("Translation status stream: Sermon GUID not found - %s", sermon_guid, extra={"rate_limit": True})
+        return jsonify({"error": "Translation job not found."}), 404
+    if not _waiter_slots.acquire(blocking=False):
+        logger.warning("Translation status stream refused: %d waiters already open.", STATUS_MAX_WAITERS,
+                       extra={"rate_limit": True})
+        response = jsonify({"error": "Too many open status streams; poll /status instead or retry later."})
+        response.headers['Retry-After'] = str(SSE_HEARTBEAT_SECONDS)
+        return response, 503
+
+    def generate():
+        event = status_registry.subscribe(sermon_guid)
+        try:
+            deadline = time.monotonic() + timeout
+            last_data = None
+            while True:
+                event.clear()
+                fetched = fetch_translation_status(sermon_guid, partial=partial)
+                if fetched is None:
+                    return  # Purged while streaming
+                response_data, _ = fetched
+                # Includes each language of a multi-target job, and progress
+                if response_data != last_data:
+                    last_data = response_data
+                    yield f"event: status\ndata: {json.dumps(response_data)}\n\n"
+                if last_data["status"] in TERMINAL_STATUSES:
+                    return
+                while not event.wait(min(SSE_HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0))):
+                    if time.monotonic() >= deadline:
+                        return
+                    yield ": keep-alive\n\n"
+        finally:
+            status_registry.unsubscribe(sermon_guid, event)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Runs once the stream ends or the client goes away, even if it never started
+    response.call_on_close(_waiter_slots.release)
+    return response
 
-def schedule_purge_task():
-    """Periodically purges old completed translation jobs."""
-    PURGE_INTERVAL = 15 * 60  # Run purge every 15 minutes
-    
-    while True:
-        time.sleep(PURGE_INTERVAL)
-        with app.app_context():
-            try:
-                purge_old_completed_jobs()
-            except Exception as e:
-                logging.error(f"Scheduled purge task failed: {e}")
 
 if __name__ == "__main__":
-    logging.info("Starting Translation API Server...")
+    # Development server: API, worker threads and purge scheduler in one process.
+    # In production run serve.py (or each service on its own) instead.
+    setup_logging()
+    logger.info("Starting Translation API Server...")
     init_db()
 
-    # Run initial purge
-    with app.app_context():
-        purge_old_completed_jobs()
-        
-    # Start translation worker thread
-    logging.info("Starting translation worker thread...")
-    worker_thread = threading.Thread(target=process_translation_jobs, daemon=True)
-    worker_thread.start()
-    logging.info("Translation worker thread started successfully.")
+    # Start translation worker threads
+    logger.info("Starting %d translation worker thread(s)...", WORKER_COUNT)
+    start_workers(WORKER_COUNT)
+    logger.info("Translation worker threads started successfully.")
     
-    # Start automatic purge thread
-    logging.info("Starting automatic purge thread...")
-    purge_thread = threading.Thread(target=schedule_purge_task, daemon=True)
+    # Start automatic purge thread (purges once right away)
+    logger.info("Starting automatic purge thread...")
+    purge_thread = threading.Thread(target=run_purge_scheduler, daemon=True)
     purge_thread.start()
-    logging.info("Automatic purge thread started successfully.")
+    logger.info("Automatic purge thread started successfully.")
+
+    # Send completion webhooks
+    webhooks.start_dispatcher(threading.Event())
     
-    logging.info("Translation API Server started successfully.")
+    logger.info("Translation API Server started successfully.")
     app.run(host='0.0.0.0', port=5090, debug=True, use_reloader=False)
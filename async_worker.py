@@ -0,0 +1,250 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import translation_memory
+import translation_worker
+from translation_worker import (
+    ChunkCheckpoint, make_worker_id, claim_jobs, renew_leases, finish_job, abandon_job, record_failure,
+    seconds_until_next_retry, group_jobs, source_characters,
+)
+from translation_backend import check_translations, create_async_backend
+from segmentation import MAX_CHARS, MAX_CONTENTS_PER_REQUEST, split_segments, pack_indices, pack_requests, reassemble
+from rate_limiter import create_limiter
+from notifications import work_signal, WakeupListener
+from log_config import log_context
+
+logger = logging.getLogger(__name__)
+
+# Asyncio worker settings (TRANSLATION_WORKER_MODE=asyncio)
+ASYNC_MAX_JOBS = int(os.getenv('TRANSLATION_ASYNC_MAX_JOBS', '32'))  # Jobs in progress per process
+ASYNC_MAX_IN_FLIGHT = int(os.getenv('TRANSLATION_ASYNC_MAX_IN_FLIGHT', '256'))  # Translation requests in flight per process
+ASYNC_DB_THREADS = int(os.getenv('TRANSLATION_ASYNC_DB_THREADS', '4'))  # Threads for database calls and other blocking work
+
+class AsyncWorker:
+    """Processes translation jobs on one event loop instead of one thread per job.
+
+    Up to ``max_jobs`` jobs (the languages of a multi-target job count as one) run
+    at once, each translating up to CHUNK_CONCURRENCY chunks at a time, and at most
+    ``max_in_flight`` translation requests are outstanding across all of them. Requests go through the backend's
+    ``translate_async`` and the quota limiter's ``call_async``, so waiting on the
+    network or on quota never blocks the loop. Database calls, segmentation and
+    compression run on a small thread pool. Claiming, checkpoints, retries and
+    failure handling are those of the threaded worker, so a job ends the same way
+    in either mode.
+    """
+
+    def __init__(self, worker_id=None, backend=None, limiter=None, max_jobs=None, max_in_flight=None, db_threads=None):
+        self.worker_id = worker_id or make_worker_id()
+        self.backend = backend or create_async_backend()
+        self.max_jobs = max_jobs or ASYNC_MAX_JOBS
+        self.max_in_flight = max_in_flight or ASYNC_MAX_IN_FLIGHT
+        self.limiter = limiter or create_limiter(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=db_threads or ASYNC_DB_THREADS, thread_name_prefix="async-worker-db")
+        self._requests = None  # Semaphore bounding requests in flight; created in the running loop
+
+    async def _blocking(self, fn, *args, **kwargs):
+        """Run a blocking call on the worker's thread pool, in the caller's log context."""
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def translate_texts(self, texts, source_language, target_language):
+        """Translates strings packed into as few requests as possible, returning them in input order."""
+        if not texts:
+            return []
+        if self._requests is None:
+            self._requests = asyncio.Semaphore(self.max_in_flight)
+
+        async def request(batch):
+            return check_translations(batch, await self.backend.translate_async(batch, source_language, target_language))
+
+        async def translate_batch(batch):
+            characters = sum(len(text) for text in batch)
+            metrics.CHARACTERS_SENT.labels(source_language, target_language).inc(characters)
+            async with self._requests:
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    translations = await self.limiter.call_async(lambda: request(batch), characters)
+                    outcome = 'ok'
+                finally:
+                    metrics.API_REQUEST_DURATION.labels(outcome).observe(time.perf_counter() - started)
+            return translations
+
+        packed = pack_indices([len(text) for text in texts], MAX_CHARS, MAX_CONTENTS_PER_REQUEST)
+        results = await asyncio.gather(*(translate_batch([texts[i] for i in indices]) for indices in packed))
+        translations = [None] * len(texts)
+        for indices, batch in zip(packed, results):
+            for i, translation in zip(indices, batch):
+                translations[i] = translation
+        return translations
+
+    async def translate_segments(self, segments, source_language, target_language, checkpoint=None, use_memory=None,
+                                 characters=None):
+        """The asyncio counterpart of translation_worker.translate_segments."""
+        use_memory = translation_memory.MEMORY_ENABLED if use_memory is None else use_memory
+        unique = list(dict.fromkeys(segments))
+        chunks = await self._blocking(pack_requests, unique, MAX_CHARS, MAX_CONTENTS_PER_REQUEST)
+        saved = await self._blocking(checkpoint.start, chunks, characters) if checkpoint else {}
+        chunk_slots = asyncio.Semaphore(translation_worker.CHUNK_CONCURRENCY)
+
+        async def translate_chunk(index):
+            chunk = chunks[index]
+            if index in saved:
+                return saved[index]
+            async with chunk_slots:
+                if use_memory:
+                    cached = await self._blocking(translation_memory.lookup, chunk, source_language, target_language)
+                else:
+                    cached = [None] * len(chunk)
+                misses = [segment for segment, translation in zip(chunk, cached) if translation is None]
+                translated_misses = await self.translate_texts(misses, source_language, target_language)
+                if use_memory:
+                    await self._blocking(translation_memory.store, misses, translated_misses, source_language, target_language)
+                translated_misses = iter(translated_misses)
+                translations = [translation if translation is not None else next(translated_misses) for translation in cached]
+                if checkpoint:
+                    await self._blocking(checkpoint.save, index, chunk, translations)
+                return translations
+
+        # A failing chunk does not cancel the others, so their work is checkpointed too
+        results = await asyncio.gather(*(translate_chunk(index) for index in range(len(chunks))), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        table = {}
+        for chunk, translations in zip(chunks, results):
+            table.update(zip(chunk, translations))
+        return [table[segment] for segment in segments]
+
+    async def translate_job(self, transcription, sermon_title, source_language, target_language, checkpoint=None,
+                            segments=None):
+        """The asyncio counterpart of translation_worker.translate_job."""
+        if segments is None:
+            if isinstance(transcription, bytes):
+                transcription = transcription.decode("utf-8")
+            segments = await self._blocking(split_segments, transcription, MAX_CHARS)
+        cores = [core for _, core, _ in segments if core]
+        translated = await self.translate_segments(
+            cores + [sermon_title], source_language, target_language, checkpoint, characters=source_characters(segments)
+        )
+        return reassemble(segments, translated[:-1]), translated[-1]
+
+    async def process_job(self, job, segments=None):
+        """The asyncio counterpart of translation_worker.process_job."""
+        job_id = job['id']
+        source_language = job['current_language']
+        target_language = job['convert_to_language']
+        region = job['region'] if job['region'] else "US"  # Default to US if region is not set
+        attempts = job.get('attempts', 1)
+
+        with log_context(job_id=job_id, sermon_guid=job.get('sermon_guid'), worker_id=self.worker_id):
+            if attempts > translation_worker.MAX_ATTEMPTS:
+                await self._blocking(abandon_job, job, self.worker_id)
+                return
+
+            logger.info(
+                "Processing translation job %s: %s → %s (Region: %s), attempt %d/%d...",
+                job_id, source_language, target_language, region, attempts, translation_worker.MAX_ATTEMPTS
+            )
+
+            started = time.perf_counter()
+            try:
+                translated_text, translated_sermon_title = await self.translate_job(
+                    job['transcription'], job['sermon_title'], source_language, target_language, ChunkCheckpoint(job_id),
+                    segments
+                )
+                outcome = 'completed'
+                if await self._blocking(
+                    finish_job, job_id, self.worker_id, 'completed', translated_text, translated_sermon_title
+                ):
+                    logger.info("Translation job %s completed successfully.", job_id)
+            except Exception as e:
+                outcome = await self._blocking(record_failure, job_id, self.worker_id, attempts, e)
+            metrics.JOB_DURATION.labels(outcome).observe(time.perf_counter() - started)
+
+    async def _process_job_logged(self, job, segments=None):
+        try:
+            await self.process_job(job, segments)
+        except Exception as e:
+            logger.error("Error in translation worker: %s", e, extra={"rate_limit": True})
+
+    async def process_jobs(self, group):
+        """The languages of one multi-target job (or a single job) in parallel, from one segmentation."""
+        segments = None
+        if len(group) > 1:
+            try:
+                segments = await self._blocking(split_segments, group[0]['transcription'], MAX_CHARS)
+            except Exception as e:
+                logger.error("Error in translation worker: %s", e, extra={"rate_limit": True})
+                return
+        await asyncio.gather(*(self._process_job_logged(job, segments) for job in group))
+
+    async def _keep_leases(self):
+        """Renew the leases of every job this worker holds until cancelled."""
+        while True:
+            await asyncio.sleep(translation_worker.LEASE_SECONDS / 3)
+            try:
+                await self._blocking(renew_leases, self.worker_id)
+            except Exception as e:
+                logger.error("Lease renewal for %s failed: %s", self.worker_id, e, extra={"rate_limit": True})
+
+    async def run(self, stop_event):
+        """Claim and process jobs until ``stop_event`` (a threading.Event) is set, then finish the claimed ones."""
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        lease_keeper = asyncio.create_task(self._keep_leases())
+        try:
+            while not stop_event.is_set():
+                if len(tasks) >= self.max_jobs:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                try:
+                    # Read the generation before looking for work, so a submission that arrives
+                    # after an empty claim still wakes us
+                    generation = work_signal.generation
+                    jobs = await self._blocking(claim_jobs, self.worker_id, self.max_jobs - len(tasks))
+                    if not jobs:
+                        logger.debug("No pending translations. Waiting...")
+                        next_retry = await self._blocking(seconds_until_next_retry)
+                        poll = translation_worker.TRANSLATION_POLL_INTERVAL
+                        timeout = poll if next_retry is None else min(poll, next_retry + 1)
+                        # Waits in the loop's default executor; running jobs carry on meanwhile
+                        await loop.run_in_executor(None, work_signal.wait, generation, timeout)
+                        continue
+                except Exception as e:
+                    logger.error("Error in translation worker: %s", e, extra={"rate_limit": True})
+                    await loop.run_in_executor(None, stop_event.wait, translation_worker.TRANSLATION_POLL_INTERVAL)
+                    continue
+                for group in group_jobs(jobs):
+                    task = asyncio.create_task(self.process_jobs(group))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)  # Drain: finish every claimed job
+        finally:
+            lease_keeper.cancel()
+            close = getattr(self.backend, 'close_async', None)
+            if close is not None:
+                await close()
+            self._executor.shutdown()
+
+def run_async_worker(stop_event=None, backend=None):
+    """Run an AsyncWorker with a cross-process wakeup listener until ``stop_event`` is set.
+
+    Returns once every claimed job has finished; set the event with
+    translation_worker.stop_workers so an idle worker wakes up to see it.
+    """
+    stop_event = stop_event or threading.Event()
+    listener = WakeupListener().start()
+    try:
+        asyncio.run(AsyncWorker(backend=backend).run(stop_event))
+    finally:
+        listener.stop()
+    logger.info("Translation workers stopped.")
@@ -0,0 +1,115 @@
+"""Micro-benchmark: pooled WAL access layer vs. the original per-call connect.
+
+Runs the same mix of concurrent readers (status lookups) and writers (job inserts
+and status updates) against both implementations and reports ops/sec.
+
+    python -m benchmarks.db_pool [--readers 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import database
+
+SEED_ROWS = 2000
+
+def legacy_execute_with_params(query, params=None, _lock=threading.Lock()):
+    """The original implementation: one connection per call, one global lock for everything."""
+    with _lock:
+        conn = sqlite3.connect(database.get_db_path())
+        conn.row_factory = database.dict_factory
+        try:
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            result = cursor.fetchall()
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+def seed(execute):
+    for i in range(SEED_ROWS):
+        execute(
+            "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (f'seed-{i}', 'Title', 'Transcript ' * 50, 'en', 'es', 'US')
+        )
+
+def run(execute, readers, writers, seconds):
+    """Drive ``execute`` from reader and writer threads; return (read ops/s, write ops/s)."""
+    stop = threading.Event()
+    counts = {'read': 0, 'write': 0}
+    counts_lock = threading.Lock()
+
+    def reader(n):
+        done = 0
+        i = n
+        while not stop.is_set():
+            execute("SELECT * FROM translations WHERE sermon_guid = ?", (f'seed-{i % SEED_ROWS}',))
+            i += 7
+            done += 1
+        with counts_lock:
+            counts['read'] += done
+
+    def writer(n):
+        done = 0
+        while not stop.is_set():
+            execute(
+                "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (f'bench-{n}-{done}', 'Title', 'Transcript', 'en', 'es', 'US')
+            )
+            execute("UPDATE translations SET status = 'completed' WHERE sermon_guid = ?", (f'bench-{n}-{done}',))
+            done += 2
+        with counts_lock:
+            counts['write'] += done
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return counts['read'] / seconds, counts['write'] / seconds
+
+def bench(name, execute, args, tmpdir):
+    os.environ['DATABASE_PATH'] = os.path.join(tmpdir, f'{name}.db')
+    database.init_db()
+    if name == 'legacy':
+        # The original schema ran in the default rollback-journal mode
+        database.close_pools()
+        conn = sqlite3.connect(database.get_db_path())
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+    seed(execute)
+    reads, writes = run(execute, args.readers, args.writers, args.seconds)
+    print(f"{name:>8}: {reads:10.0f} reads/s  {writes:10.0f} writes/s  {reads + writes:10.0f} total ops/s")
+    database.close_pools()
+    return reads + writes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per run")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy = bench('legacy', legacy_execute_with_params, args, tmpdir)
+        pooled = bench('pooled', database.execute_with_params, args, tmpdir)
+    print(f"speedup: {pooled / legacy:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""Benchmark: end-to-end load test of the API and workers against a fake translation backend.
+
+Starts the service locally, either in this process (Flask's threaded server and a
+worker pool) or as the production stack (serve.py: gunicorn, worker processes),
+on a scratch database. Concurrent submitters POST /translate while pollers read
+/status. Reports submit throughput, /status p50/p99 latency, queue-to-complete time
+(as observed by the pollers) and database write-lock contention from /metrics.
+The fake backend's latency and error rate are configurable.
+
+    python -m benchmarks.load --scenario titles|transcripts|mixed [--stack inprocess|serve]
+        [--jobs N] [--submitters 8] [--pollers 8] [--workers 4] [--worker-mode threads|asyncio]
+        [--latency 0.05] [--latency-per-char 1e-6] [--jitter 0.5] [--error-rate 0]
+        [--json results.json] [--compare baseline.json] [--tolerance 0.25]
+
+With --compare, the run exits with status 1 if any headline number is worse than
+the baseline by more than the tolerance.
+"""
+import argparse
+import collections
+import http.client
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import quote, urlsplit
+
+from benchmarks.segmentation import make_transcript
+
+API_KEY = 'load-test-key'
+LARGE_TRANSCRIPT_CHARS = 500_000
+TITLE_TRANSCRIPT_CHARS = 80
+UNLIMITED_QUOTA = 10 ** 12  # The quota limiter is not under test
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: (default job count, size of job i's transcription)
+SCENARIOS = {
+    'titles': (2000, lambda i: TITLE_TRANSCRIPT_CHARS),
+    'transcripts': (10, lambda i: LARGE_TRANSCRIPT_CHARS),
+    'mixed': (500, lambda i: LARGE_TRANSCRIPT_CHARS if i % 50 == 0 else 2000 + (i * 7919) % 20000),
+}
+
+# Headline numbers compared against a baseline; True means higher is better
+HEADLINES = {
+    'submit_jobs_per_second': True,
+    'status_p50_ms': False,
+    'status_p99_ms': False,
+    'complete_p50_seconds': False,
+    'complete_p99_seconds': False,
+    'db_lock_wait_mean_ms': False,
+}
+
+def make_jobs(scenario, count):
+    sizes = SCENARIOS[scenario][1]
+    run = uuid.uuid4().hex[:8]  # Unique content per run, so nothing is served from dedup or memory
+    return [{
+        "sermon_guid": f"load-{run}-{i}",
+        "sermon_title": f"Sermon {run} {i}",
+        "transcription": f"{run} {i}. " + make_transcript(sizes(i), seed=i),
+        "current_language": "en",
+        "convert_to_language": "es",
+        "region": "US",
+    } for i in range(count)]
+
+class Client:
+    """A keep-alive HTTP connection to the service, for one thread.
+
+    A request on a connection the server closed while it was idle is retried once
+    on a new one.
+    """
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port, timeout
+        self.connection = None
+
+    def request(self, method, path, payload=None):
+        """Send a request with the API key. Returns (status, body bytes)."""
+        headers = {'X-API-KEY': API_KEY}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        while True:
+            reused = self.connection is not None
+            if not reused:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.connection.close()
+                self.connection = None
+                if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue  # Closed by the server while idle
+                raise
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def service_environment(args, tmpdir, port):
+    return {
+        'DATABASE_PATH': os.path.join(tmpdir, 'load.db'),
+        'TRANSLATION_API_KEY': API_KEY,
+        'TRANSLATION_BACKEND': 'fake',
+        'FAKE_TRANSLATION_LATENCY': str(args.latency),
+        'FAKE_TRANSLATION_LATENCY_PER_CHAR': str(args.latency_per_char),
+        'FAKE_TRANSLATION_JITTER': str(args.jitter),
+        'FAKE_TRANSLATION_ERROR_RATE': str(args.error_rate),
+        'TRANSLATION_QUOTA_CHARS_PER_MINUTE': str(UNLIMITED_QUOTA),
+        'TRANSLATION_QUOTA_REQUESTS_PER_MINUTE': str(UNLIMITED_QUOTA),
+        'TRANSLATION_WORKER_COUNT': str(args.workers),
+        'TRANSLATION_WORKER_MODE': args.worker_mode,
+        'TRANSLATION_WAKEUP_DIR': os.path.join(tmpdir, 'wakeup'),
+        'METRICS_DIR': os.path.join(tmpdir, 'metrics'),
+        'METRICS_SNAPSHOT_SECONDS': '1',
+        'API_BIND': f'127.0.0.1:{port}',
+        'SERVE_PURGE': '0',
+    }
+
+def start_inprocess(args, tmpdir, port):
+    """Run the API and a worker pool in this process. Returns a function that stops them."""
+    os.environ.update(service_environment(args, tmpdir, port))
+    os.environ['METRICS_DIR'] = ''  # One process: the live registry is complete
+    # Imported only now, so the settings above are picked up
+    from werkzeug.serving import make_server
+    import app as app_module
+    from database import init_db, close_pools
+    from rate_limiter import QuotaLimiter, set_limiter
+    from translation_backend import create_backend
+    from translation_worker import run_worker_pool, stop_workers
+    from async_worker import run_async_worker
+    for name in ('', 'werkzeug'):
+        logging.getLogger(name).setLevel(logging.WARNING)  # Per-job and per-request logging would dominate
+
+    init_db()
+    set_limiter(QuotaLimiter(UNLIMITED_QUOTA, UNLIMITED_QUOTA))
+    stop_event = threading.Event()
+    if args.worker_mode == 'asyncio':
+        pool = threading.Thread(target=run_async_worker, args=(stop_event, create_backend('fake')))
+    else:
+        pool = threading.Thread(target=run_worker_pool, args=(args.workers, stop_event, create_backend('fake')))
+    pool.start()
+    server = make_server('127.0.0.1', port, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        stop_workers(stop_event)
+        pool.join()
+        close_pools()
+    return stop
+
+def start_serve(args, tmpdir, port):
+    """Run the production stack (serve.py) in child processes. Returns a function that stops it."""
+    log = open(os.path.join(tmpdir, 'serve.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, 'serve.py'], cwd=REPO_ROOT, env={**os.environ, **service_environment(args, tmpdir, port)},
+        stdout=log, stderr=subprocess.STDOUT
+    )
+
+    def stop():
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+        log.close()
+    return stop
+
+def wait_until_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    client = Client(base_url, timeout=1)
+    while time.monotonic() < deadline:
+        try:
+            if client.request('GET', '/metrics')[0] == 200:
+                return
+        except (OSError, http.client.HTTPException):  # Not listening, or still booting
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service at {base_url} did not become ready")
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def histogram(text, name):
+    """``(count, sum, {le: cumulative})`` of an unlabeled histogram in exposition text."""
+    buckets = {
+        float(le): float(count)
+        for le, count in re.findall(rf'^{name}_bucket\{{le="([^"]+)"\}} (\S+)$', text, re.MULTILINE)
+    }
+    count = re.search(rf'^{name}_count (\S+)$', text, re.MULTILINE)
+    total = re.search(rf'^{name}_sum (\S+)$', text, re.MULTILINE)
+    return (float(count.group(1)) if count else 0.0), (float(total.group(1)) if total else 0.0), buckets
+
+def histogram_delta(before, after):
+    count = after[0] - before[0]
+    buckets = {le: value - before[2].get(le, 0.0) for le, value in after[2].items()}
+    return count, after[1] - before[1], buckets
+
+def histogram_quantile(delta, fraction):
+    """Upper bound of the bucket holding the ``fraction`` quantile."""
+    count, _, buckets = delta
+    for le in sorted(buckets):
+        if buckets[le] >= fraction * count:
+            return le
+    return None
+
+def drive(base_url, jobs, args):
+    """Submit ``jobs`` and poll them to completion. Returns the raw measurements."""
+    pending = collections.deque(enumerate(jobs))
+    outstanding = collections.deque()  # (guid, accepted_at), polled round-robin
+    results = {'submit': [], 'status': [], 'complete': [], 'rejected': 0, 'failed': 0, 'unfinished': 0}
+    lock = threading.Lock()
+    submitting = threading.Event()
+    submitting.set()
+
+    def submitter():
+        client = Client(base_url)
+        while True:
+            try:
+                _, job = pending.popleft()
+            except IndexError:
+                return
+            started = time.perf_counter()
+            status, _ = client.request('POST', '/translate', job)
+            accepted = time.perf_counter()
+            with lock:
+                results['submit'].append(accepted - started)
+                if status != 201:
+                    results['rejected'] += 1
+                    continue
+            outstanding.append((job['sermon_guid'], accepted))
+
+    def poller():
+        client = Client(base_url)
+        while True:
+            try:
+                guid, accepted = outstanding.popleft()
+            except IndexError:
+                if not submitting.is_set() or time.perf_counter() > deadline:
+                    return
+                time.sleep(args.poll_interval)
+                continue
+            started = time.perf_counter()
+            code, body = client.request('GET', f"/status/{quote(guid)}?fields=status")
+            finished = time.perf_counter()
+            status = json.loads(body).get('status') if code == 200 else None
+            with lock:
+                results['status'].append(finished - started)
+                if status in ('completed', 'failed'):
+                    results['complete'].append(finished - accepted)
+                    results['failed'] += status == 'failed'
+                    continue
+            if finished > deadline:
+                with lock:
+                    results['unfinished'] += 1
+                continue
+            outstanding.append((guid, accepted))
+            time.sleep(args.poll_interval)
+
+    started = time.perf_counter()
+    deadline = started + args.timeout
+    submitters = [threading.Thread(target=submitter) for _ in range(args.submitters)]
+    pollers = [threading.Thread(target=poller) for _ in range(args.pollers)]
+    for thread in submitters + pollers:
+        thread.start()
+    for thread in submitters:
+        thread.join()
+    results['submit_seconds'] = time.perf_counter() - started
+    submitting.clear()
+    for thread in pollers:
+        thread.join()
+    results['total_seconds'] = time.perf_counter() - started
+    return results
+
+def summarize(args, jobs, results, lock_wait, lock_hold):
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    submitted_bytes = sum(len(job['transcription'].encode('utf-8')) for job in jobs)
+    return {
+        'scenario': args.scenario,
+        'stack': args.stack,
+        'worker_mode': args.worker_mode,
+        'jobs': len(jobs),
+        'rejected': results['rejected'],
+        'failed': results['failed'],
+        'unfinished': results['unfinished'],
+        'submit_jobs_per_second': round(len(jobs) / results['submit_seconds'], 1),
+        'submit_megabytes_per_second': round(submitted_bytes / results['submit_seconds'] / 1e6, 2),
+        'submit_p50_ms': ms(percentile(results['submit'], 0.5)),
+        'submit_p99_ms': ms(percentile(results['submit'], 0.99)),
+        'status_requests': len(results['status']),
+        'status_p50_ms': ms(percentile(results['status'], 0.5)),
+        'status_p99_ms': ms(percentile(results['status'], 0.99)),
+        'complete_p50_seconds': round(percentile(results['complete'], 0.5) or 0, 3),
+        'complete_p99_seconds': round(percentile(results['complete'], 0.99) or 0, 3),
+        'total_seconds': round(results['total_seconds'], 2),
+        'db_writes': int(lock_hold[0]),
+        'db_lock_wait_mean_ms': ms(lock_wait[1] / lock_wait[0]) if lock_wait[0] else 0,
+        'db_lock_wait_p99_ms': ms(histogram_quantile(lock_wait, 0.99)),
+        'db_lock_hold_mean_ms': ms(lock_hold[1] / lock_hold[0]) if lock_hold[0] else 0,
+        'db_lock_busy_fraction': round(lock_hold[1] / results['total_seconds'], 3),  # Summed over processes
+    }
+
+def report(summary):
+    print(f"{summary['scenario']} ({summary['stack']}, {summary['worker_mode']} worker): {summary['jobs']} jobs in {summary['total_seconds']}s, "
+          f"{summary['rejected']} rejected, {summary['failed']} failed, {summary['unfinished']} unfinished")
+    print(f"  submit    {summary['submit_jobs_per_second']:10.1f} jobs/s  {summary['submit_megabytes_per_second']:8.2f} MB/s  "
+          f"p50 {summary['submit_p50_ms']} ms  p99 {summary['submit_p99_ms']} ms")
+    print(f"  /status   {summary['status_requests']:10d} polls   p50 {summary['status_p50_ms']} ms  p99 {summary['status_p99_ms']} ms")
+    print(f"  complete  p50 {summary['complete_p50_seconds']} s  p99 {summary['complete_p99_seconds']} s  (as polled)")
+    print(f"  db lock   {summary['db_writes']} writes  wait mean {summary['db_lock_wait_mean_ms']} ms  "
+          f"p99 <= {summary['db_lock_wait_p99_ms']} ms  hold mean {summary['db_lock_hold_mean_ms']} ms  "
+          f"busy {summary['db_lock_busy_fraction']:.1%}")
+
+def compare(summary, baseline, tolerance):
+    """Print the change of every headline number; return the names of those that regressed."""
+    regressions = []
+    for name, higher_is_better in HEADLINES.items():
+        old, new = baseline.get(name), summary.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > tolerance else ""
+        print(f"  {name:<26} {old:>10} -> {new:<10} {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mixed')
+    parser.add_argument('--stack', choices=('inprocess', 'serve'), default='inprocess')
+    parser.add_argument('--jobs', type=int, help="Default depends on the scenario")
+    parser.add_argument('--submitters', type=int, default=8)
+    parser.add_argument('--pollers', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4, help="Worker threads (per worker process)")
+    parser.add_argument('--worker-mode', choices=('threads', 'asyncio'), default='threads')
+    parser.add_argument('--poll-interval', type=float, default=0.01)
+    parser.add_argument('--latency', type=float, default=0.05, help="Fake backend seconds per request")
+    parser.add_argument('--latency-per-char', type=float, default=1e-6, help="Fake backend seconds per character")
+    parser.add_argument('--jitter', type=float, default=0.5, help="Latency stretched by up to this fraction")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of backend requests that fail")
+    parser.add_argument('--timeout', type=float, default=600, help="Give up on unfinished jobs after this long")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--compare', help="Baseline results file from an earlier --json run")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.scenario, args.jobs or SCENARIOS[args.scenario][0])
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stop = (start_inprocess if args.stack == 'inprocess' else start_serve)(args, tmpdir, port)
+        try:
+            wait_until_ready(base_url)
+            client = Client(base_url)
+            before = client.request('GET', '/metrics')[1].decode('utf-8')
+            results = drive(base_url, jobs, args)
+            if args.stack == 'serve':
+                time.sleep(2)  # Let every process write a fresh metrics snapshot
+            after = client.request('GET', '/metrics')[1].decode('utf-8')
+        finally:
+            stop()
+    lock_wait = histogram_delta(*(histogram(text, 'translator_db_lock_wait_seconds') for text in (before, after)))
+    lock_hold = histogram_delta(*(histogram(text, 'translator_db_lock_hold_seconds') for text in (before, after)))
+    summary = summarize(args, jobs, results, lock_wait, lock_hold)
+    report(summary)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(summary, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
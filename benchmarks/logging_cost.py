@@ -0,0 +1,126 @@
+"""Micro-benchmark: cost of logging to the thread that logs, before and after the queued pipeline.
+
+"legacy" is the original setup: basicConfig at DEBUG, every record formatted and
+written by the calling thread. "queued" is log_config.setup_logging(): INFO by
+default, records handed to a writer thread through a queue. Both write to a file;
+``--sink-latency`` adds a delay per written record, as a slow pipe or collector would.
+
+Reports the caller's cost per logging call and the latency of API requests made
+through Flask's test client, which log on every request.
+
+    python -m benchmarks.logging_cost [--calls 20000] [--requests 2000] [--sink-latency 0]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import logging
+
+import database
+import log_config
+
+class SinkHandler(logging.StreamHandler):
+    """A file handler that takes ``latency`` seconds longer per record."""
+
+    def __init__(self, stream, latency):
+        super().__init__(stream)
+        self.latency = latency
+
+    def emit(self, record):
+        super().emit(record)
+        if self.latency:
+            time.sleep(self.latency)
+
+def reset_logging():
+    log_config.stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+def setup_legacy(stream, latency):
+    reset_logging()
+    handler = SinkHandler(stream, latency)
+    handler.setFormatter(logging.Formatter(log_config.TEXT_FORMAT))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+def setup_queued(stream, latency):
+    reset_logging()
+    log_config.setup_logging(handler=SinkHandler(stream, latency))
+
+def per_call(calls):
+    """Microseconds per call for an emitted INFO record and a DEBUG record, eager f-string vs lazy args."""
+    logger = logging.getLogger('benchmark')
+    results = {}
+    started = time.perf_counter()
+    for i in range(calls):
+        logger.info("Translation job %s completed successfully.", i)
+    results['info'] = (time.perf_counter() - started) / calls * 1e6
+    started = time.perf_counter()
+    for i in range(calls):
+        logger.debug(f"Translation status retrieved for Sermon GUID: guid-{i}")
+    results['debug f-string'] = (time.perf_counter() - started) / calls * 1e6
+    started = time.perf_counter()
+    for i in range(calls):
+        logger.debug("Translation status retrieved for Sermon GUID: %s", f"guid-{i}")
+    results['debug lazy'] = (time.perf_counter() - started) / calls * 1e6
+    return results
+
+def per_request(client, requests, headers):
+    """Latencies in microseconds of alternating submissions and status lookups."""
+    latencies = []
+    for i in range(requests):
+        guid = f'bench-{time.monotonic_ns()}-{i}'
+        started = time.perf_counter()
+        client.post('/translate', headers=headers, json={
+            "sermon_guid": guid, "sermon_title": "Title", "transcription": "Transcript",
+            "current_language": "en", "convert_to_language": "es", "region": "US",
+        })
+        client.get(f'/status/{guid}', headers=headers)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+def bench(name, setup, args, client, headers, tmpdir):
+    # A fresh database per run, so the second run doesn't query a bigger table
+    os.environ['DATABASE_PATH'] = os.path.join(tmpdir, f'{name}.db')
+    database.init_db()
+    with open(os.path.join(tmpdir, f'{name}.log'), 'w') as stream:
+        setup(stream, args.sink_latency)
+        calls = per_call(args.calls)
+        latencies = per_request(client, args.requests, headers)
+        started = time.perf_counter()
+        reset_logging()  # Waits for the writer thread to drain the queue
+        drained = time.perf_counter() - started
+    database.close_pools()
+    latencies.sort()
+    print(
+        f"{name:>7}: info {calls['info']:7.2f} us/call  debug f-string {calls['debug f-string']:5.2f}  "
+        f"debug lazy {calls['debug lazy']:5.2f}  request p50 {statistics.median(latencies):8.1f} us  "
+        f"p99 {latencies[int(len(latencies) * 0.99)]:8.1f} us  (drain {drained:.2f}s)"
+    )
+    return statistics.median(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sink-latency', type=float, default=0.0, help="Seconds added per written record")
+    parser.add_argument('--rate-limit', type=int, default=0, help="LOG_RATE_LIMIT for the queued run (0 = off)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_config.LOG_QUEUE_SIZE = 0  # Unbounded: measure the hand-off, not dropped records
+        log_config.LOG_RATE_LIMIT = args.rate_limit
+        import app as app_module
+        client = app_module.app.test_client()
+        headers = {'X-API-KEY': app_module.API_KEY}
+
+        print(f"{args.calls} calls, {args.requests} request pairs, {args.sink_latency * 1e6:g} us sink latency")
+        legacy = bench('legacy', setup_legacy, args, client, headers, tmpdir)
+        queued = bench('queued', setup_queued, args, client, headers, tmpdir)
+    print(f"request p50 speedup: {legacy / queued:.2f}x")
+
+if __name__ == "__main__":
+    main()
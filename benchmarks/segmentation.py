@@ -0,0 +1,87 @@
+"""Benchmark: segmentation and request packing on large transcripts.
+
+Compares the original chunker (cut at the last '.' below MAX_CHARS, one string per
+request, delimiter dropped) with segmentation.split_segments + pack_requests, and
+reports time, request count, fill ratio and whether the text round-trips.
+
+    python -m benchmarks.segmentation [--megabytes 1] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+from segmentation import MAX_CHARS, MAX_CONTENTS_PER_REQUEST, split_segments, pack_requests, reassemble
+
+WORDS = "and the of to grace faith we in that is you Lord he his for with love church".split()
+
+def make_transcript(size, seed=0):
+    """Sermon-like text: sentences of varying length, paragraphs, some long unpunctuated runs."""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 40)))
+        sentence = sentence.capitalize() + rng.choice([". ", "? ", "! ", ".\n\n", ", "])
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+def legacy_chunks(text):
+    """The original chunker from translate_text."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + MAX_CHARS
+        if end >= len(text):
+            chunks.append(text[start:])
+            break
+        break_point = text.rfind('.', start, end)
+        if break_point == -1 or break_point <= start:
+            break_point = text.rfind(' ', start, end)
+        if break_point == -1 or break_point <= start:
+            break_point = end
+        chunks.append(text[start:break_point])
+        start = break_point + 1 if break_point < len(text) else break_point
+    return [[chunk] for chunk in chunks if chunk.strip()]
+
+def packed_requests(text):
+    segments = split_segments(text, MAX_CHARS)
+    cores = [core for _, core, _ in segments if core]
+    return segments, pack_requests(list(dict.fromkeys(cores)), MAX_CHARS, MAX_CONTENTS_PER_REQUEST)
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def report(name, seconds, requests, size):
+    chars = sum(len(text) for request in requests for text in request)
+    fill = chars / (len(requests) * MAX_CHARS) if requests else 0
+    print(f"  {name:<8} {seconds * 1000:8.1f} ms  {len(requests):5d} requests  "
+          f"{fill:6.1%} avg fill  {size / seconds / 1e6:8.1f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    size = int(args.megabytes * 1_000_000)
+    text = make_transcript(size)
+    print(f"{len(text):,} character transcript, best of {args.repeat}")
+
+    seconds, requests = timed(lambda: legacy_chunks(text), args.repeat)
+    report("legacy", seconds, requests, len(text))
+    lost = len(text) - sum(len(request[0]) for request in requests)
+    print(f"           {lost} characters dropped at split points")
+
+    seconds, (segments, requests) = timed(lambda: packed_requests(text), args.repeat)
+    report("packed", seconds, requests, len(text))
+    identity = reassemble(segments, [core for _, core, _ in segments if core])
+    print(f"           round-trip exact: {identity == text}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: import time and memory of the API process, with a guard against heavy imports.
+
+Imports each entry module in a fresh interpreter under ``-X importtime`` and reports
+the total import time, the resident set size after the import and the slowest
+top-level imports. The API process (``app``) must not load the Google Cloud
+Translate client or the gRPC/protobuf stack under it; they belong to the worker
+processes, whose numbers are shown for comparison with the client loaded.
+
+    python -m benchmarks.startup [--runs 5] [--top 8]
+
+Exits with status 1 if ``app`` loads any of FORBIDDEN_IN_API.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+FORBIDDEN_IN_API = ('google.cloud.translate', 'google.api_core', 'grpc', 'google.protobuf', 'proto')
+
+TARGETS = {
+    'api': ("import app", {'app'}),
+    'worker': ("import translation_worker, translation_backend; "
+               "translation_backend.GoogleTranslationBackend._default_client_factory()",
+               {'translation_worker', 'google.cloud.translate'}),
+}
+
+# Run in the child after the import: peak RSS in kB (ru_maxrss is kB on Linux)
+REPORT_RSS = "; import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+def measure(statement):
+    """Run ``statement`` in a fresh interpreter. Returns (modules, peak RSS in MB), where
+    ``modules`` maps each imported module, in -X importtime order, to its (self, cumulative)
+    import time in us and its nesting depth."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement + REPORT_RSS],
+        capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(own), int(cumulative), (len(name) - len(name.lstrip()) - 1) // 2)
+    return modules, int(result.stdout.split()[-1]) / 1024
+
+def direct_imports(modules, parents):
+    """Modules imported directly by any of ``parents``, with their cumulative time.
+
+    -X importtime lists a module's imports (one level deeper) right before it."""
+    found, pending = [], []
+    for name, (_, cumulative, depth) in modules.items():
+        if depth == 1:
+            pending.append((cumulative, name))
+        elif depth == 0:
+            if name in parents:
+                found.extend(pending)
+            pending = []
+    return sorted(found, reverse=True)
+
+def loaded(modules, prefixes):
+    return sorted(name for name in modules if any(name == p or name.startswith(p + '.') for p in prefixes))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="Slowest direct imports to list")
+    args = parser.parse_args()
+
+    forbidden = []
+    for target, (statement, entry_modules) in TARGETS.items():
+        runs = [measure(statement) for _ in range(args.runs)]
+        totals = [sum(own for own, _, _ in modules.values()) / 1000 for modules, _ in runs]
+        modules, rss = runs[-1]
+        print(f"{target:>6}: import {statistics.median(totals):6.1f} ms  peak RSS {max(rss for _, rss in runs):6.1f} MB  "
+              f"{len(modules)} modules")
+        for cumulative, name in direct_imports(modules, entry_modules)[:args.top]:
+            print(f"        {cumulative / 1000:6.1f} ms  {name}")
+        if target == 'api':
+            forbidden = loaded(modules, FORBIDDEN_IN_API)
+
+    if forbidden:
+        print(f"FAIL: the API process loads {', '.join(forbidden[:10])}"
+              f"{' ...' if len(forbidden) > 10 else ''}")
+        sys.exit(1)
+    print("OK: the API process does not load the translation client")
+
+if __name__ == "__main__":
+    main()
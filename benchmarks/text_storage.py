@@ -0,0 +1,107 @@
+"""Benchmark: transcriptions and translations stored inline vs. compressed in translation_texts.
+
+Seeds the same jobs both ways and reports the database size (after VACUUM) and the
+time taken by the queries that touch the translations table: a full-table scan, the
+worker's claim query, the content-hash duplicate check and the purge.
+
+    python -m benchmarks.text_storage [--jobs 2000] [--text-bytes 50000]
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+
+import database
+
+SENTENCES = [
+    "The Lord is my shepherd; I shall not want.",
+    "He maketh me to lie down in green pastures.",
+    "Let us consider how we may spur one another on toward love and good deeds.",
+    "Grace and peace to you from God our Father.",
+    "Today we turn to the book of Romans, chapter eight.",
+]
+
+def make_text(n, size):
+    words = []
+    length = 0
+    i = n
+    while length < size:
+        sentence = f"{SENTENCES[i % len(SENTENCES)]} ({i})"
+        words.append(sentence)
+        length += len(sentence) + 1
+        i += 3
+    return " ".join(words)
+
+def seed(layout, jobs, text_bytes):
+    with database.write_transaction() as cursor:
+        for n in range(jobs):
+            transcription = make_text(n, text_bytes)
+            translated = f"[es] {transcription}"
+            status = 'completed' if n % 2 else 'pending'
+            content_hash = hashlib.sha256(transcription.encode('utf-8')).hexdigest()
+            inline = layout == 'inline'
+            cursor.execute(
+                "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, "
+                "convert_to_language, region, status, translated_text, finished_at, content_hash) "
+                "VALUES (?, 'Title', ?, 'en', 'es', 'US', ?, ?, ?, ?)",
+                (f'guid-{n}', transcription if inline else '', status,
+                 translated if inline and status == 'completed' else None,
+                 database.utc_timestamp(-86400 * 2) if status == 'completed' else None, content_hash)
+            )
+            if not inline:
+                job_id = cursor.lastrowid
+                database.put_texts(cursor, 'transcription', [(job_id, database.compress_text(transcription))])
+                if status == 'completed':
+                    database.put_texts(cursor, 'translated_text', [(job_id, database.compress_text(translated))])
+    database.close_pools()
+    conn = sqlite3.connect(database.get_db_path())
+    conn.execute("VACUUM")
+    conn.close()
+
+def timed(label, fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<22} {elapsed * 1000:9.2f} ms")
+
+def bench(layout, args, tmpdir):
+    path = os.path.join(tmpdir, f'{layout}.db')
+    os.environ['DATABASE_PATH'] = path
+    database.init_db()
+    seed(layout, args.jobs, args.text_bytes)
+    print(f"{layout}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    timed("full scan", lambda: database.execute_read(
+        "SELECT COUNT(*) FROM translations WHERE region = 'US' AND sermon_title <> ''"))
+    timed("claim candidates", lambda: database.execute_read(
+        "SELECT id, sermon_guid, status FROM translations WHERE status = 'pending' AND duplicate_of IS NULL "
+        "ORDER BY id LIMIT 16"))
+    timed("duplicate check", lambda: database.execute_read(
+        "SELECT id FROM translations WHERE content_hash IN (?, ?, ?) AND status = 'completed'",
+        ('a' * 64, 'b' * 64, 'c' * 64)))
+
+    def purge():
+        with database.write_transaction() as cursor:
+            cursor.execute("DELETE FROM translations WHERE status = 'completed' AND finished_at <= ?",
+                           (database.utc_timestamp(-86400),))
+            cursor.execute("ROLLBACK")
+            cursor.execute("BEGIN")  # Keep the rows for the next repetition
+    timed("purge (rolled back)", purge, repeat=3)
+    database.close_pools()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--text-bytes', type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{args.jobs} jobs with ~{args.text_bytes} byte transcriptions")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench('inline', args, tmpdir)
+        bench('split', args, tmpdir)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,53 @@
 import sqlite3
 import os
 import logging
+import queue
+import atexit
+import zlib
+import time
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from threading import Lock
+from metrics import DB_LOCK_WAIT, DB_LOCK_HOLD
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 # Database configuration
 def get_db_path():
     """Get the database path from environment or default."""
     return os.getenv('DATABASE_PATH', 'translations.db')
 
-# Thread-safe database operations
+def utc_timestamp(offset_seconds=0):
+    """UTC time formatted the way the tables store timestamps."""
+    return (datetime.utcnow() + timedelta(seconds=offset_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+def backoff(attempts, base, cap, full_jitter=False):
+    """Seconds to wait after failed attempt number ``attempts``: ``base`` doubled per earlier
+    attempt, at most ``cap``, with jitter so failures that coincided retry apart.
+
+    The wait is at least half the delay, or anywhere from zero with ``full_jitter``."""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return random.uniform(0 if full_jitter else delay / 2, delay)
+
+IN_QUERY_BATCH_SIZE = 500  # Values per IN (...) clause, well under SQLite's variable limit
+
+def in_batches(values):
+    """Split ``values`` for ``IN (...)`` clauses. Yields (batch, placeholders), where
+    ``placeholders`` is one "?" per value in the batch."""
+    values = list(values)
+    for start in range(0, len(values), IN_QUERY_BATCH_SIZE):
+        batch = values[start:start + IN_QUERY_BATCH_SIZE]
+        yield batch, ", ".join("?" * len(batch))
+
+# Connection pool and pragma tuning
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))  # Max reader connections per database file
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))  # Wait this long on a locked database
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))  # Bytes of the file to memory-map
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable enough under WAL
+
+# Serializes writers within the process. Readers never take it: in WAL mode they
+# read a consistent snapshot while the single writer commits.
 db_lock = Lock()
 
 def dict_factory(cursor, row):
@@ -19,18 +55,274 @@ def dict_factory(cursor, row):
     fields = [column[0] for column in cursor.description]
     return {key: value for key, value in zip(fields, row)}
 
+def _apply_pragmas(conn, read_only=False):
+    """Apply the per-connection tuning pragmas."""
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if read_only:
+        # A write routed to a reader by mistake fails loudly instead of racing the writer
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn.execute("PRAGMA journal_mode = WAL")
+
 def get_db():
     """Get a database connection with row factory set to return dictionaries."""
-    conn = sqlite3.connect(get_db_path())
+    conn = sqlite3.connect(
+        get_db_path(),
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+    )
     conn.row_factory = dict_factory
     return conn
 
+class ConnectionPool:
+    """Bounded pool of SQLite connections for one database file.
+
+    Readers check a connection out of a LIFO queue, so the most recently used (warmest)
+    connection is handed out first, and at most ``size`` reader connections are ever
+    opened. All writes go through one dedicated writer connection guarded by ``db_lock``.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._open_lock = Lock()
+        self._writer = None
+        self._closed = False
+
+    def _connect(self, read_only):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.row_factory = dict_factory
+        _apply_pragmas(conn, read_only=read_only)
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._open_lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._connect(read_only=True)
+            except Exception:
+                with self._open_lock:
+                    self._opened -= 1
+                raise
+        # Pool is at capacity; wait for another reader to hand its connection back
+        return self._idle.get()
+
+    @contextmanager
+    def reader(self):
+        """Check out a read-only connection for the duration of the block."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def writer(self):
+        """Return the writer connection. Callers must hold ``db_lock``."""
+        if self._writer is None:
+            self._writer = self._connect(read_only=False)
+        return self._writer
+
+    def close(self):
+        """Close every idle connection and the writer."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+_pools = {}
+_pools_lock = Lock()
+
+def get_pool():
+    """Get the connection pool for the currently configured database path."""
+    path = get_db_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+def close_pools():
+    """Close all pooled connections, e.g. before the database file is replaced."""
+    with _pools_lock:
+        with db_lock:
+            for pool in _pools.values():
+                pool.close()
+            _pools.clear()
+
+# Checkpoint the WAL back into the main file on a clean shutdown
+atexit.register(close_pools)
+
+def _remove_orphaned_journals(path):
+    """Delete -wal/-shm files left behind by a database file that no longer exists.
+
+    SQLite would otherwise replay the stale WAL into the freshly created file.
+    """
+    if os.path.exists(path):
+        return
+    for suffix in ('-wal', '-shm'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+# Columns added after the original schema, applied to existing databases by init_db
+TRANSLATIONS_ADDED_COLUMNS = {
+    'worker_id': 'TEXT DEFAULT NULL',
+    'lease_expires_at': 'TIMESTAMP DEFAULT NULL',
+    'content_hash': 'TEXT DEFAULT NULL',
+    'duplicate_of': 'INTEGER DEFAULT NULL',
+    'version': 'INTEGER NOT NULL DEFAULT 0',
+    'attempts': 'INTEGER NOT NULL DEFAULT 0',
+    'last_error': 'TEXT DEFAULT NULL',
+    'retry_after': 'TIMESTAMP DEFAULT NULL',
+    'priority': 'INTEGER NOT NULL DEFAULT 0',
+    'size_chars': 'INTEGER NOT NULL DEFAULT 0',
+    'client_id': 'TEXT DEFAULT NULL',
+    'parent_id': 'INTEGER DEFAULT NULL',
+    'chunks_done': 'INTEGER DEFAULT NULL',
+    'chunks_total': 'INTEGER DEFAULT NULL',
+    'characters_done': 'INTEGER DEFAULT NULL',
+    'characters_total': 'INTEGER DEFAULT NULL',
+    'callback_url': 'TEXT DEFAULT NULL',
+}
+
+def _add_missing_columns(cursor, table, columns):
+    """ALTER an existing table to add any of ``columns`` it does not have yet."""
+    existing = {row['name'] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            logger.info("Migrated %s: added column %s.", table, name)
+
+# Text stored in translation_texts: the source transcription and the translated text
+TEXT_KINDS = ('transcription', 'translated_text')
+TEXT_CODEC = 'zlib'
+TEXT_COMPRESSION_LEVEL = 6
+MIGRATION_BATCH_SIZE = 200  # Rows moved per step when migrating inline text
+
+def compress_text(text):
+    """Compress text for translation_texts. Do this before taking the write lock."""
+    return zlib.compress(text.encode('utf-8'), TEXT_COMPRESSION_LEVEL)
+
+def decompress_text(body, codec=TEXT_CODEC):
+    if codec != TEXT_CODEC:
+        raise ValueError(f"Unsupported text codec: {codec}")
+    return zlib.decompress(body).decode('utf-8')
+
+def put_texts(cursor, kind, bodies):
+    """Store compressed ``(job_id, body)`` pairs of one kind inside an open write transaction."""
+    cursor.executemany(
+        "INSERT OR REPLACE INTO translation_texts (job_id, kind, codec, body) VALUES (?, ?, ?, ?)",
+        [(job_id, kind, TEXT_CODEC, body) for job_id, body in bodies]
+    )
+
+def get_texts(job_ids, kind, cursor=None):
+    """Load and decompress one kind of text for ``job_ids``. Returns {job_id: text}.
+
+    Jobs without a stored text are absent from the result. Pass ``cursor`` to read
+    inside an open write transaction.
+    """
+    texts = {}
+    for batch, placeholders in in_batches(job_ids):
+        query = f"SELECT job_id, codec, body FROM translation_texts WHERE kind = ? AND job_id IN ({placeholders})"
+        rows = cursor.execute(query, (kind, *batch)).fetchall() if cursor else execute_read(query, (kind, *batch))
+        texts.update((row['job_id'], decompress_text(row['body'], row['codec'])) for row in rows)
+    return texts
+
+def _move_inline_texts(cursor):
+    """Migrate text still stored inline in translations into translation_texts.
+
+    Databases created before the split, and rows written directly by older code, keep
+    their transcription/translated_text inline; this compresses them into the side table
+    and blanks the inline columns.
+    """
+    moved = 0
+    while True:
+        rows = cursor.execute(
+            "SELECT id, transcription, translated_text FROM translations "
+            "WHERE transcription <> '' OR translated_text IS NOT NULL LIMIT ?",
+            (MIGRATION_BATCH_SIZE,)
+        ).fetchall()
+        if not rows:
+            break
+        put_texts(cursor, 'transcription', [(row['id'], compress_text(row['transcription'])) for row in rows if row['transcription']])
+        put_texts(cursor, 'translated_text', [(row['id'], compress_text(row['translated_text'])) for row in rows if row['translated_text'] is not None])
+        cursor.executemany(
+            "UPDATE translations SET transcription = '', translated_text = NULL WHERE id = ?",
+            [(row['id'],) for row in rows]
+        )
+        moved += len(rows)
+    if moved:
+        logger.info("Migrated inline text of %d translation job(s) into translation_texts.", moved)
+
+def _enable_incremental_vacuum():
+    """Switch the database to auto_vacuum=INCREMENTAL so freed pages can be returned to the OS.
+
+    The pragma alone only takes effect before the file's first page is written; otherwise
+    the file is rebuilt with a one-off VACUUM.
+    """
+    pool = get_pool()
+    with db_lock:
+        conn = pool.writer()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()['auto_vacuum'] == 2:
+            return
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if conn.execute("PRAGMA auto_vacuum").fetchone()['auto_vacuum'] != 2:
+            logger.info("Rebuilding database to enable incremental auto-vacuum...")
+            conn.execute("VACUUM")
+
+def incremental_vacuum(max_pages):
+    """Return up to ``max_pages`` free pages to the filesystem. Returns bytes reclaimed."""
+    pool = get_pool()
+    with db_lock:
+        conn = pool.writer()
+        page_size = conn.execute("PRAGMA page_size").fetchone()['page_size']
+        before = conn.execute("PRAGMA page_count").fetchone()['page_count']
+        # execute() steps the pragma once, freeing a single page; a script runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        after = conn.execute("PRAGMA page_count").fetchone()['page_count']
+    return (before - after) * page_size
+
+def free_pages():
+    """Number of unused pages in the database file."""
+    return execute_read("PRAGMA freelist_count")[0]['freelist_count']
+
 def init_db():
     """Initialize the database with required tables."""
     try:
-        with db_lock:
-            conn = get_db()
-            cursor = conn.cursor()
+        # Connections opened against a previous file at this path must not be reused
+        close_pools()
+        _remove_orphaned_journals(get_db_path())
+        _enable_incremental_vacuum()
+        with write_transaction() as cursor:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS translations (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -44,31 +336,219 @@ def init_db():
                     translated_sermon_title TEXT DEFAULT NULL,
                     status TEXT DEFAULT 'pending',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    finished_at TIMESTAMP DEFAULT NULL
+                    finished_at TIMESTAMP DEFAULT NULL,
+                    worker_id TEXT DEFAULT NULL,
+                    lease_expires_at TIMESTAMP DEFAULT NULL,
+                    content_hash TEXT DEFAULT NULL,
+                    duplicate_of INTEGER DEFAULT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT DEFAULT NULL,
+                    retry_after TIMESTAMP DEFAULT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    size_chars INTEGER NOT NULL DEFAULT 0,
+                    client_id TEXT DEFAULT NULL,
+                    parent_id INTEGER DEFAULT NULL,
+                    chunks_done INTEGER DEFAULT NULL,
+                    chunks_total INTEGER DEFAULT NULL,
+                    characters_done INTEGER DEFAULT NULL,
+                    characters_total INTEGER DEFAULT NULL,
+                    callback_url TEXT DEFAULT NULL
                 )
             ''')
-            conn.commit()
-            conn.close()
-            logging.info("Database initialized successfully.")
+            _add_missing_columns(cursor, 'translations', TRANSLATIONS_ADDED_COLUMNS)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_status_lease "
+                "ON translations (status, lease_expires_at)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_content_hash "
+                "ON translations (content_hash, status)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_status_finished "
+                "ON translations (status, finished_at)"
+            )
+            # Scheduler candidate indexes: claimable jobs by urgency, age and size
+            for name, columns in (('priority', 'priority DESC, id'), ('age', 'id'), ('size', 'size_chars, id')):
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_translations_pending_{name} ON translations ({columns}) "
+                    "WHERE status = 'pending' AND duplicate_of IS NULL"
+                )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_duplicate_of "
+                "ON translations (duplicate_of) WHERE duplicate_of IS NOT NULL"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_parent "
+                "ON translations (parent_id) WHERE parent_id IS NOT NULL"
+            )
+            # Bump the row version whenever a client-visible column changes (drives /status ETags).
+            # Lease renewals only touch lease_expires_at and so leave the version alone.
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_bump_version
+                AFTER UPDATE OF status, translated_text, translated_sermon_title, finished_at ON translations
+                FOR EACH ROW
+                BEGIN
+                    UPDATE translations SET version = version + 1 WHERE id = NEW.id;
+                END
+            ''')
+            # A multi-target job's status is made of its per-language child jobs' statuses
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_bump_parent_version
+                AFTER UPDATE OF status, translated_text, translated_sermon_title, finished_at ON translations
+                FOR EACH ROW WHEN NEW.parent_id IS NOT NULL
+                BEGIN
+                    UPDATE translations SET version = version + 1 WHERE id = NEW.parent_id;
+                END
+            ''')
+            # ...and it holds their shared source text until the last of them is purged
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_delete_parent
+                AFTER DELETE ON translations
+                FOR EACH ROW WHEN OLD.parent_id IS NOT NULL
+                BEGIN
+                    DELETE FROM translations WHERE id = OLD.parent_id
+                    AND NOT EXISTS (SELECT 1 FROM translations WHERE parent_id = OLD.parent_id);
+                END
+            ''')
+            # Translation progress is client-visible too, for the job and its multi-target job
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_bump_progress_version
+                AFTER UPDATE OF chunks_done, chunks_total ON translations
+                FOR EACH ROW
+                BEGIN
+                    UPDATE translations SET version = version + 1 WHERE id IN (NEW.id, NEW.parent_id);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS translation_memory (
+                    source_language TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    segment_hash TEXT NOT NULL,
+                    translated_text TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (source_language, target_language, segment_hash)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translation_memory_last_used "
+                "ON translation_memory (last_used_at)"
+            )
+            # Bulky text lives here, compressed, so translations rows stay small
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS translation_texts (
+                    id INTEGER PRIMARY KEY,
+                    job_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    UNIQUE (job_id, kind)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_delete_texts
+                AFTER DELETE ON translations
+                FOR EACH ROW
+                BEGIN
+                    DELETE FROM translation_texts WHERE job_id = OLD.id;
+                END
+            ''')
+            # Translated chunks of unfinished jobs, so a retry resumes where the last attempt stopped
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS translation_chunks (
+                    job_id INTEGER NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    PRIMARY KEY (job_id, chunk_index)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_delete_chunks
+                AFTER DELETE ON translations
+                FOR EACH ROW
+                BEGIN
+                    DELETE FROM translation_chunks WHERE job_id = OLD.id;
+                END
+            ''')
+            # Completion webhooks waiting to be sent (see webhooks.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS webhook_deliveries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TIMESTAMP NOT NULL,
+                    last_error TEXT DEFAULT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_webhook_deliveries_due ON webhook_deliveries (next_attempt_at)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_webhook_deliveries_job ON webhook_deliveries (job_id)"
+            )
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS translations_delete_webhooks
+                AFTER DELETE ON translations
+                FOR EACH ROW
+                BEGIN
+                    DELETE FROM webhook_deliveries WHERE job_id = OLD.id;
+                END
+            ''')
+            _move_inline_texts(cursor)
+        logger.info("Database initialized successfully.")
     except Exception as e:
-        logging.error(f"Error initializing database: {e}")
+        logger.error("Error initializing database: %s", e)
         raise
 
-def execute_with_params(query, params=None):
-    """Execute a query with parameters in a thread-safe way."""
+def _is_read_only(query):
+    """Whether a statement can be served by a reader connection."""
+    return query.lstrip()[:6].upper() == 'SELECT'
+
+@contextmanager
+def write_transaction():
+    """Run a block of statements as one IMMEDIATE transaction on the writer connection.
+
+    Yields a cursor. The transaction commits when the block exits normally and rolls
+    back if it raises. Time spent waiting for and holding ``db_lock`` is recorded.
+    """
+    pool = get_pool()
+    requested = time.perf_counter()
     with db_lock:
-        conn = get_db()
+        acquired = time.perf_counter()
+        DB_LOCK_WAIT.observe(acquired - requested)
         try:
+            conn = pool.writer()
             cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            result = cursor.fetchall()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
             conn.commit()
-            return result
-        except Exception as e:
-            conn.rollback()
-            raise e
         finally:
-            conn.close()
+            DB_LOCK_HOLD.observe(time.perf_counter() - acquired)
+
+def execute_read(query, params=None):
+    """Execute a read-only query on a pooled reader connection without taking ``db_lock``."""
+    with get_pool().reader() as conn:
+        return conn.execute(query, params or ()).fetchall()
+
+def execute_with_params(query, params=None):
+    """Execute a query with parameters in a thread-safe way.
+
+    SELECTs are served from the reader pool; every other statement runs in its own
+    transaction on the writer connection.
+    """
+    if _is_read_only(query):
+        return execute_read(query, params)
+    with write_transaction() as cursor:
+        cursor.execute(query, params or ())
+        return cursor.fetchall()
@@ -0,0 +1,36 @@
+# Gunicorn settings for the API in production: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.getenv('API_BIND', '0.0.0.0:5090')
+workers = int(os.getenv('API_PROCESSES', '4'))  # API processes
+worker_class = 'gthread'
+# Threads per process. Each long-poll or SSE client holds one, so at most STATUS_MAX_WAITERS
+# (default: half of them) may wait at once; see app.py
+threads = int(os.getenv('API_THREADS', '32'))
+graceful_timeout = int(os.getenv('API_GRACEFUL_TIMEOUT', '30'))  # Seconds in-flight requests get on shutdown
+keepalive = 5
+
+def on_starting(server):
+    """Set up logging and create and migrate the database once, in the master, before any process forks.
+
+    Forked API processes restart the log writer thread themselves."""
+    from log_config import setup_logging
+    from database import init_db, close_pools
+    setup_logging()
+    init_db()
+    close_pools()  # Connections must not be shared with the forked API processes
+
+def post_worker_init(worker):
+    """Receive status changes from worker processes so long-polls and SSE streams wake up,
+    and share this process's metrics with the others."""
+    import metrics
+    from notifications import StatusListener
+    worker.status_listener = StatusListener().start()
+    metrics.start_snapshots()
+
+def worker_exit(server, worker):
+    import metrics
+    listener = getattr(worker, 'status_listener', None)
+    if listener is not None:
+        listener.stop()
+    metrics.write_snapshot()
@@ -0,0 +1,211 @@
+"""Logging for every service. Each entry point calls ``setup_logging()`` once per process.
+
+Threads that log only filter the record and put it on a queue; a QueueListener thread
+formats and writes it, so request and worker threads never wait on log I/O. Output is
+one JSON object per line (LOG_FORMAT=text gives the classic format), carrying the
+job id, sermon GUID and worker id bound with ``log_context()``. Messages a call site
+may repeat without end (a failing poll loop, an unknown GUID polled by a client) are
+logged with ``extra={"rate_limit": True}``; each such template is rate-limited, and the
+number of suppressed repeats is reported on the next record that gets through.
+
+Modules log through ``logging.getLogger(__name__)`` with %-style arguments, so a
+record below the configured level costs a level check and nothing else.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # DEBUG for development
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # 'json' (one object per line) or 'text'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # Records awaiting the writer; more are dropped, not waited for
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '10'))  # Records per rate-limited message template per window; 0 = unlimited
+LOG_RATE_WINDOW_SECONDS = float(os.getenv('LOG_RATE_WINDOW_SECONDS', '60'))
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+CONTEXT_FIELDS = ('job_id', 'sermon_guid', 'worker_id')
+_context = contextvars.ContextVar('log_context', default={})
+
+@contextmanager
+def log_context(**fields):
+    """Add ``fields`` (e.g. job_id, sermon_guid) to every record logged inside the block.
+
+    The context follows the thread, and each asyncio task has its own.
+    """
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+def bind_log_context(**fields):
+    """Add ``fields`` to the current context until ``reset_log_context(token)``. Returns the token."""
+    return _context.set({**_context.get(), **fields})
+
+def reset_log_context(token):
+    _context.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copies the bound log context onto each record, without overriding explicit ``extra`` fields."""
+
+    def filter(self, record):
+        for field, value in _context.get().items():
+            if not hasattr(record, field):
+                setattr(record, field, value)
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most ``limit`` records of each message template through per ``window`` seconds.
+
+    Only records logged with ``extra={"rate_limit": True}`` are limited, and never an
+    error about a job. Records are keyed by logger, level and unformatted message, so
+    "Poll failed: %s" counts as one message whatever the error. When a template's window
+    rolls over, the first record let through carries ``suppressed``, the number dropped.
+    """
+
+    MAX_KEYS = 10000  # Forget all counts beyond this many templates
+
+    def __init__(self, limit=None, window=None, clock=time.monotonic):
+        super().__init__()
+        self.limit = LOG_RATE_LIMIT if limit is None else limit
+        self.window = window or LOG_RATE_WINDOW_SECONDS
+        self._clock = clock
+        self._counts = {}  # key: [window_start, records, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.limit or not getattr(record, 'rate_limit', False):
+            return True
+        if record.levelno >= logging.ERROR and getattr(record, 'job_id', None) is not None:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = self._clock()
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if entry is None and len(self._counts) >= self.MAX_KEYS:
+                    self._counts.clear()
+                suppressed = entry[2] if entry else 0
+                self._counts[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if entry[1] < self.limit:
+                entry[1] += 1
+                return True
+            entry[2] += 1
+            return False
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, context fields and exception."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in (*CONTEXT_FIELDS, 'suppressed'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _QueueHandler(QueueHandler):
+    """Enqueues records for the listener thread without blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the arguments now (they may change later) but leave the formatting,
+        # including any traceback, to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _StderrHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stderr`` is when the record is written (test runners replace it)."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+_listener = None
+_settings = None
+
+def _formatter(fmt):
+    return JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT)
+
+def setup_logging(level=None, fmt=None, handler=None):
+    """Send all records through a queue to a writer thread, replacing any earlier setup.
+
+    ``level`` and ``fmt`` default to LOG_LEVEL and LOG_FORMAT. Records are written to
+    stderr unless another ``handler`` is given. Forked children set themselves up
+    again, since the writer thread does not survive a fork.
+
+    Records stop collecting the caller's file and line and the multiprocessing process
+    name, which neither format uses and which make up much of a record's cost.
+    """
+    global _listener, _settings
+    level = level or LOG_LEVEL
+    fmt = fmt or LOG_FORMAT
+    stop_logging()
+    logging._srcfile = None
+    logging.logMultiprocessing = False
+    handler = handler or _StderrHandler()
+    handler.setFormatter(_formatter(fmt))
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, _QueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    _settings = (level, fmt, handler)
+    return queue_handler
+
+def stop_logging():
+    """Write out every queued record and stop the writer thread (forked children no longer restart it)."""
+    global _listener, _settings
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _settings = None
+
+def _restart_after_fork():
+    global _listener
+    if _settings is not None:
+        settings = _settings
+        _listener = None  # The parent's thread is not running here
+        setup_logging(*settings)
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,291 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated on hot paths, so an update is a dictionary lookup
+and a few additions under the metric's own lock; there is no global lock. Gauges that
+describe shared state (such as queue depth) are computed at scrape time by collectors.
+
+The API, worker and purge services run in separate processes. When ``METRICS_DIR`` is
+set, every process that calls ``start_snapshots()`` writes its counters and histograms
+there every few seconds, and ``render()`` adds up the snapshots of all processes, so
+any API process can answer a scrape for the whole deployment.
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv('METRICS_DIR', '')  # Shared directory for per-process snapshots; empty = this process only
+METRICS_SNAPSHOT_SECONDS = float(os.getenv('METRICS_SNAPSHOT_SECONDS', '5'))  # Snapshot interval
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+_metrics = {}
+_collectors = []
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def labels(self, *values):
+        """The child for one combination of label values."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        """``{label_values: value}`` for every child, as plain data."""
+        with self._lock:
+            return {values: child.value() for values, child in self._children.items()}
+
+class _CounterChild:
+    def __init__(self, lock):
+        self._lock = lock
+        self._value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        return self._value
+
+class Counter(_Metric):
+    """A monotonically increasing total."""
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+class _HistogramChild:
+    def __init__(self, lock, buckets):
+        self._lock = lock
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # Per bucket, not cumulative; the last one is +Inf
+        self._sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time the block takes."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def value(self):
+        return [list(self._counts), self._sum]
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, with their sum."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+def register_collector(collector):
+    """Add a function called at scrape time that returns gauges as ``(name, help, labelnames, {values: value})``."""
+    _collectors.append(collector)
+    return collector
+
+def reset():
+    """Zero every metric in this process (for tests)."""
+    for metric in _metrics.values():
+        with metric._lock:
+            metric._children.clear()
+
+# Snapshots shared between processes
+
+def _snapshot():
+    return {
+        name: [[list(values), value] for values, value in metric.samples().items()]
+        for name, metric in _metrics.items()
+    }
+
+def write_snapshot(directory=None):
+    """Write this process's counters and histograms to ``directory`` (default METRICS_DIR)."""
+    directory = directory or METRICS_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(f"{path}.tmp", path)  # Readers never see a partial file
+
+def _read_snapshots(directory):
+    """Snapshots written by every other process."""
+    own = f"{os.getpid()}.json"
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.json') and name != own]
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Replaced or removed while being read
+    return snapshots
+
+def start_snapshots(stop_event=None, interval=None):
+    """Write a snapshot every ``interval`` seconds in a daemon thread, and once more when ``stop_event`` is set."""
+    if not METRICS_DIR:
+        return None
+    stop_event = stop_event or threading.Event()
+    interval = interval or METRICS_SNAPSHOT_SECONDS
+
+    def run():
+        while True:
+            stopping = stop_event.wait(interval)
+            try:
+                write_snapshot()
+            except OSError as e:
+                logger.warning("Could not write metrics snapshot: %s", e, extra={"rate_limit": True})
+            if stopping:
+                return
+
+    thread = threading.Thread(target=run, daemon=True, name="metrics-snapshots")
+    thread.start()
+    return thread
+
+# Exposition
+
+def _merged_samples(directory):
+    """``{name: {label_values: value}}`` over this process and, if ``directory`` is set, all others."""
+    merged = {name: metric.samples() for name, metric in _metrics.items()}
+    for snapshot in (_read_snapshots(directory) if directory else []):
+        for name, samples in snapshot.items():
+            metric = _metrics.get(name)
+            if metric is None:
+                continue
+            totals = merged[name]
+            for values, value in samples:
+                values = tuple(values)
+                if values not in totals:
+                    totals[values] = value
+                elif metric.kind == 'counter':
+                    totals[values] += value
+                else:
+                    counts, total = totals[values]
+                    totals[values] = [[a + b for a, b in zip(counts, value[0])], total + value[1]]
+    return merged
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def render(directory=None):
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    directory = METRICS_DIR if directory is None else directory
+    lines = []
+    for name, samples in _merged_samples(directory).items():
+        metric = _metrics[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for values, value in sorted(samples.items()):
+            if metric.kind == 'counter':
+                lines.append(f"{name}{_labels(metric.labelnames, values)} {_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, values, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, values)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, values)} {cumulative}")
+    for collector in _collectors:
+        try:
+            gauges = collector()
+        except Exception as e:
+            logger.error("Metrics collector %s failed: %s", collector.__name__, e, extra={"rate_limit": True})
+            continue
+        for name, documentation, labelnames, samples in gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for values, value in sorted(samples.items()):
+                lines.append(f"{name}{_labels(labelnames, values)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+# Metrics of this service
+
+DB_LOCK_WAIT = Histogram('translator_db_lock_wait_seconds', "Time spent waiting for the database write lock.")
+DB_LOCK_HOLD = Histogram('translator_db_lock_hold_seconds', "Time the database write lock was held per transaction.")
+HTTP_REQUEST_DURATION = Histogram(
+    'translator_http_request_duration_seconds', "API request latency until the response is returned.",
+    ('method', 'route', 'status')
+)
+QUEUE_WAIT = Histogram(
+    'translator_queue_wait_seconds', "Time from submission to a job's first claim by a worker.", buckets=JOB_BUCKETS
+)
+JOB_DURATION = Histogram(
+    'translator_job_duration_seconds', "Time to process one claimed job, by outcome.", ('outcome',), buckets=JOB_BUCKETS
+)
+API_REQUEST_DURATION = Histogram(
+    'translator_api_request_duration_seconds', "Latency of one Translation API request (one packed chunk), "
+    "including quota waits and retries.", ('outcome',)
+)
+CHARACTERS_SENT = Counter(
+    'translator_characters_sent_total', "Characters sent to the Translation API, by language pair.",
+    ('source_language', 'target_language')
+)
+PURGE_DURATION = Histogram('translator_purge_duration_seconds', "Duration of one purge run.", buckets=JOB_BUCKETS)
+PURGED_JOBS = Counter('translator_purged_jobs_total', "Jobs deleted by the purge, by status.", ('status',))
+MEMORY_LOOKUPS = Counter(
+    'translator_translation_memory_lookups_total', "Segments looked up in the translation memory, by result (hit or miss).",
+    ('result',)
+)
+MEMORY_STORED = Counter('translator_translation_memory_stored_total', "Segments written to the translation memory.")
+MEMORY_EVICTED = Counter('translator_translation_memory_evicted_total', "Translation memory entries evicted.")
+WEBHOOK_DELIVERIES = Counter(
+    'translator_webhook_deliveries_total', "Webhook delivery attempts, by outcome (delivered, retried or dropped).",
+    ('outcome',)
+)
+WEBHOOK_REQUEST_DURATION = Histogram(
+    'translator_webhook_request_duration_seconds', "Time to send one webhook, by outcome.", ('outcome',)
+)
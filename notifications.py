@@ -0,0 +1,206 @@
+import os
+import socket
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Directory where worker and API processes bind their notification sockets. All processes
+# must agree on it (point it at a shared volume when they run in separate containers).
+WAKEUP_DIR = os.getenv('TRANSLATION_WAKEUP_DIR', os.path.join(tempfile.gettempdir(), 'translator-wakeup'))
+WAKEUP_SOCKET_PREFIX = 'worker-'  # Worker processes: "new work queued" (or DELIVERY_WAKEUP: "webhook queued")
+STATUS_SOCKET_PREFIX = 'api-'  # API processes: "this GUID changed status"
+DELIVERY_WAKEUP = b"webhook"
+
+class WorkSignal:
+    """Wakes waiting workers when new work is queued.
+
+    A generation counter makes waiting race-free: a worker reads ``generation`` before
+    it looks for work and then waits for it to change, so a notification that lands
+    between the two is never lost.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, since, timeout=None):
+        """Block until notified after generation ``since``, or ``timeout`` elapses. Returns True if notified."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._generation != since, timeout)
+
+work_signal = WorkSignal()
+# Wakes the webhook dispatcher of a worker process when a delivery is queued or a slot frees up
+delivery_signal = WorkSignal()
+
+class StatusRegistry:
+    """Per-GUID change notifications for clients waiting on a job's status.
+
+    Each waiting request subscribes an Event for its GUID, so a status change wakes only
+    the requests watching that job. An idle waiter costs one Event and a dict entry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+
+    def subscribe(self, sermon_guid):
+        event = threading.Event()
+        with self._lock:
+            self._waiters.setdefault(sermon_guid, set()).add(event)
+        return event
+
+    def unsubscribe(self, sermon_guid, event):
+        with self._lock:
+            waiters = self._waiters.get(sermon_guid)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[sermon_guid]
+
+    def publish(self, sermon_guid):
+        with self._lock:
+            waiters = list(self._waiters.get(sermon_guid, ()))
+        for event in waiters:
+            event.set()
+
+    def waiting(self):
+        """Number of subscribed waiters, across all GUIDs."""
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+status_registry = StatusRegistry()
+
+def _send_to_listeners(prefix, payload):
+    """Send ``payload`` as one datagram to every listener socket named ``prefix*`` in ``WAKEUP_DIR``."""
+    try:
+        entries = list(os.scandir(WAKEUP_DIR))
+    except FileNotFoundError:
+        return  # No listeners have ever started on this host
+    if not entries:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.setblocking(False)
+        for entry in entries:
+            if not entry.name.startswith(prefix):
+                continue
+            try:
+                sock.sendto(payload, entry.path)
+            except ConnectionRefusedError:
+                # The listener is gone (process crashed); clean up its socket file
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            except (BlockingIOError, OSError) as e:
+                # A full buffer means that process is already well behind on wakeups
+                logger.debug("Notification to %s not delivered: %s", entry.path, e)
+
+def notify_work_available():
+    """Wake workers in this process and in standalone worker processes."""
+    work_signal.notify()
+    _send_to_listeners(WAKEUP_SOCKET_PREFIX, b"!")
+
+def notify_deliveries_queued():
+    """Wake webhook dispatchers in this process and in standalone worker processes."""
+    delivery_signal.notify()
+    _send_to_listeners(WAKEUP_SOCKET_PREFIX, DELIVERY_WAKEUP)
+
+def notify_status_changed(sermon_guids):
+    """Wake status waiters for ``sermon_guids`` in this process and in separate API processes."""
+    for sermon_guid in sermon_guids:
+        status_registry.publish(sermon_guid)
+        _send_to_listeners(STATUS_SOCKET_PREFIX, sermon_guid.encode("utf-8"))
+
+class _DatagramListener:
+    """Binds a Unix datagram socket in ``WAKEUP_DIR`` and hands each datagram to ``handle``."""
+
+    prefix = None
+
+    def __init__(self, directory=None):
+        self.directory = directory or WAKEUP_DIR
+        self.path = os.path.join(self.directory, f"{self.prefix}{os.getpid()}.sock")
+        self._sock = None
+        self._thread = None
+
+    def handle(self, data):
+        raise NotImplementedError
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._thread = threading.Thread(target=self._run, name=f"{self.prefix}listener", daemon=True)
+        self._thread.start()
+        logger.info("Listening for notifications on %s", self.path)
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                data = self._sock.recv(1024)
+            except OSError:
+                return  # Socket closed
+            if not data:
+                return  # Socket shut down
+            self.handle(data)
+
+    def stop(self):
+        if self._sock is not None:
+            # shutdown() unblocks the recv() in the listener thread before close()
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+class WakeupListener(_DatagramListener):
+    """Receives cross-process wakeups for a standalone worker process.
+
+    Every datagram becomes a ``work_signal.notify()`` for the worker threads of this
+    process, or a ``delivery_signal.notify()`` for its webhook dispatcher.
+    """
+
+    prefix = WAKEUP_SOCKET_PREFIX
+
+    def __init__(self, signal=work_signal, directory=None, deliveries=delivery_signal):
+        super().__init__(directory)
+        self.signal = signal
+        self.deliveries = deliveries
+
+    def handle(self, data):
+        (self.deliveries if data == DELIVERY_WAKEUP else self.signal).notify()
+
+class StatusListener(_DatagramListener):
+    """Receives status-change notifications from worker processes for an API process.
+
+    Each datagram carries a sermon GUID, which is published to the local registry.
+    """
+
+    prefix = STATUS_SOCKET_PREFIX
+
+    def __init__(self, registry=status_registry, directory=None):
+        super().__init__(directory)
+        self.registry = registry
+
+    def handle(self, data):
+        self.registry.publish(data.decode("utf-8", errors="replace"))
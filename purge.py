@@ -0,0 +1,108 @@
+import os
+import time
+import signal
+import logging
+import threading
+import translation_memory
+import metrics
+from database import init_db, write_transaction, utc_timestamp, incremental_vacuum, free_pages
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Retention and pacing
+COMPLETED_RETENTION_HOURS = float(os.getenv('PURGE_COMPLETED_RETENTION_HOURS', '24'))  # Keep completed jobs this long
+FAILED_RETENTION_HOURS = float(os.getenv('PURGE_FAILED_RETENTION_HOURS', '168'))  # Keep failed jobs this long
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', '200'))  # Rows deleted per write transaction
+PURGE_BATCH_PAUSE = float(os.getenv('PURGE_BATCH_PAUSE_SECONDS', '0.01'))  # Lets other writers in between batches
+PURGE_INTERVAL_SECONDS = float(os.getenv('PURGE_INTERVAL_SECONDS', str(15 * 60)))  # Time between scheduled purges
+VACUUM_STEP_PAGES = int(os.getenv('PURGE_VACUUM_STEP_PAGES', '1000'))  # Pages returned to the OS per lock hold
+
+def _delete_expired(status, retention_hours, batch_size, pause):
+    """Delete ``status`` jobs finished more than ``retention_hours`` ago, one small batch at a time.
+
+    Each batch is its own short transaction served by the (status, finished_at) index,
+    so the write lock is never held for long. Returns the number of jobs deleted.
+    """
+    threshold = utc_timestamp(-retention_hours * 3600)
+    deleted = 0
+    while True:
+        with write_transaction() as cursor:
+            cursor.execute(
+                "DELETE FROM translations WHERE id IN ("
+                "SELECT id FROM translations WHERE status = ? AND finished_at <= ? LIMIT ?)",
+                (status, threshold, batch_size)
+            )
+            count = cursor.rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+        time.sleep(pause)
+
+def reclaim_space(step_pages=None, pause=None):
+    """Return all free pages to the filesystem in steps of ``step_pages``. Returns bytes reclaimed."""
+    step_pages = step_pages or VACUUM_STEP_PAGES
+    pause = PURGE_BATCH_PAUSE if pause is None else pause
+    reclaimed = 0
+    while free_pages():
+        freed = incremental_vacuum(step_pages)
+        if not freed:
+            break
+        reclaimed += freed
+        time.sleep(pause)
+    return reclaimed
+
+def purge_old_jobs(completed_retention_hours=None, failed_retention_hours=None, batch_size=None, pause=None):
+    """Delete completed and failed jobs past their retention, then reclaim the freed space.
+
+    Returns a report: ``completed`` and ``failed`` rows deleted, ``bytes_reclaimed`` from
+    the database file, and ``seconds`` taken.
+    """
+    completed_retention_hours = COMPLETED_RETENTION_HOURS if completed_retention_hours is None else completed_retention_hours
+    failed_retention_hours = FAILED_RETENTION_HOURS if failed_retention_hours is None else failed_retention_hours
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    pause = PURGE_BATCH_PAUSE if pause is None else pause
+
+    started = time.monotonic()
+    report = {
+        "completed": _delete_expired('completed', completed_retention_hours, batch_size, pause),
+        "failed": _delete_expired('failed', failed_retention_hours, batch_size, pause),
+    }
+    report["bytes_reclaimed"] = reclaim_space(pause=pause)
+    report["seconds"] = round(time.monotonic() - started, 3)
+    metrics.PURGE_DURATION.observe(time.monotonic() - started)
+    metrics.PURGED_JOBS.labels('completed').inc(report["completed"])
+    metrics.PURGED_JOBS.labels('failed').inc(report["failed"])
+    logger.info(
+        "Purged %d completed and %d failed job(s); reclaimed %d bytes in %ss.",
+        report['completed'], report['failed'], report['bytes_reclaimed'], report['seconds']
+    )
+    return report
+
+def run_scheduler(stop_event=None, interval=None):
+    """Purge expired jobs and trim the translation memory now and every ``interval`` seconds.
+
+    Returns when ``stop_event`` is set; a purge in progress finishes first.
+    """
+    stop_event = stop_event or threading.Event()
+    interval = PURGE_INTERVAL_SECONDS if interval is None else interval
+    while not stop_event.is_set():
+        try:
+            purge_old_jobs()
+            translation_memory.evict()
+        except Exception as e:
+            logger.error("Scheduled purge task failed: %s", e, extra={"rate_limit": True})
+        stop_event.wait(interval)
+    logger.info("Purge scheduler stopped.")
+
+if __name__ == "__main__":
+    setup_logging()
+    logger.info("Starting purge scheduler (every %gs)...", PURGE_INTERVAL_SECONDS)
+    init_db()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    snapshots = metrics.start_snapshots(stop)
+    run_scheduler(stop)
+    if snapshots:
+        snapshots.join()
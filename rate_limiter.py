@@ -0,0 +1,256 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from database import backoff
+from translation_backend import is_quota_error, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+# Quota settings. The limits are the project's; each worker process takes an equal share.
+QUOTA_PROCESSES = max(1, int(os.getenv('TRANSLATION_WORKER_PROCESSES', '1')))
+QUOTA_CHARS_PER_MINUTE = int(os.getenv('TRANSLATION_QUOTA_CHARS_PER_MINUTE', '6000000'))
+QUOTA_REQUESTS_PER_MINUTE = int(os.getenv('TRANSLATION_QUOTA_REQUESTS_PER_MINUTE', '6000'))
+QUOTA_BURST_SECONDS = float(os.getenv('TRANSLATION_QUOTA_BURST_SECONDS', '5'))  # Bucket size, in seconds of quota
+
+# Adaptive concurrency settings (requests in flight per process, across all workers)
+CONCURRENCY_INITIAL = int(os.getenv('TRANSLATION_CONCURRENCY_INITIAL', '8'))
+CONCURRENCY_MIN = int(os.getenv('TRANSLATION_CONCURRENCY_MIN', '1'))
+CONCURRENCY_MAX = int(os.getenv('TRANSLATION_CONCURRENCY_MAX', '64'))
+TARGET_LATENCY_SECONDS = float(os.getenv('TRANSLATION_TARGET_LATENCY_SECONDS', '10'))  # Slower requests count as overload
+
+# Retry settings for quota and transient errors
+MAX_RETRIES = int(os.getenv('TRANSLATION_MAX_RETRIES', '5'))
+BACKOFF_BASE_SECONDS = float(os.getenv('TRANSLATION_BACKOFF_BASE_SECONDS', '1'))
+BACKOFF_MAX_SECONDS = float(os.getenv('TRANSLATION_BACKOFF_MAX_SECONDS', '60'))
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second, holding at most ``capacity``.
+
+    ``acquire`` reserves tokens immediately and sleeps off any deficit, so callers are
+    served in arrival order and a large request cannot be starved by small ones.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        """Take ``amount`` tokens without blocking. Returns the seconds to wait before using them."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= amount
+            return max(-self._tokens / self.rate, self._paused_until - now, 0.0)
+
+    def acquire(self, amount=1):
+        """Take ``amount`` tokens, blocking until they are available. Returns the seconds waited."""
+        wait = self.reserve(amount)
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hand out no tokens for ``seconds``, and drain the bucket so traffic resumes gently."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._paused_until = max(self._paused_until, now + seconds)
+
+class AdaptiveConcurrency:
+    """Concurrency limit adjusted by additive increase, multiplicative decrease (AIMD).
+
+    Every request that succeeds within ``target_latency`` raises the limit by ``1/limit``
+    (about one per full window of requests); an overload signal (quota or transient
+    error, or a slow response) multiplies it by ``decrease_factor``.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=64, target_latency=None, decrease_factor=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._async_waiters = []  # (loop, future) of coroutines in acquire_async
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < int(self._limit))
+            self._in_flight += 1
+
+    async def acquire_async(self):
+        """Like ``acquire``, but waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, latency=None, overloaded=False):
+        """Return a slot, recording how the request went."""
+        with self._condition:
+            self._in_flight -= 1
+            slow = self.target_latency is not None and latency is not None and latency > self.target_latency
+            if overloaded or slow:
+                self._limit = max(self.minimum, self._limit * self.decrease_factor)
+            else:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class QuotaLimiter:
+    """Paces translation requests to the project's character and request quotas.
+
+    Each call takes tokens from a character bucket and a request bucket, then a slot from
+    the adaptive concurrency limit. Quota and transient errors are retried with
+    exponential backoff and full jitter; a quota error also pauses the buckets so every
+    worker sharing this limiter backs off, not just the one that was rejected.
+    """
+
+    def __init__(self, chars_per_minute, requests_per_minute, concurrency=None, burst_seconds=QUOTA_BURST_SECONDS,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE_SECONDS, backoff_max=BACKOFF_MAX_SECONDS,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.characters = TokenBucket(chars_per_minute / 60, chars_per_minute / 60 * burst_seconds, clock, sleep)
+        self.requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60 * burst_seconds), clock, sleep)
+        self.concurrency = concurrency or AdaptiveConcurrency(
+            CONCURRENCY_INITIAL, CONCURRENCY_MIN, CONCURRENCY_MAX, TARGET_LATENCY_SECONDS
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clock = clock
+        self._sleep = sleep
+        self.stats = {"calls": 0, "retries": 0, "quota_errors": 0, "throttled_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for retry number ``attempt`` (0-based)."""
+        return backoff(attempt + 1, self.backoff_base, self.backoff_max, full_jitter=True)
+
+    def _failed(self, error, attempt, latency):
+        """Record a failed request. Returns the delay before retrying, or None if ``error`` is final."""
+        quota = is_quota_error(error)
+        retryable = quota or is_transient_error(error)
+        self.concurrency.release(latency, overloaded=retryable)
+        if quota:
+            self._count("quota_errors")
+        if not retryable or attempt >= self.max_retries:
+            return None
+        delay = self.backoff(attempt)
+        if quota:
+            self.characters.pause(delay)
+            self.requests.pause(delay)
+        logger.warning(
+            "Translation request failed (%s); retry %d/%d in %.1fs (concurrency limit now %d).",
+            error, attempt + 1, self.max_retries, delay, self.concurrency.limit, extra={"rate_limit": True}
+        )
+        self._count("retries")
+        return delay
+
+    def call(self, fn, characters):
+        """Run ``fn()``, a request carrying ``characters`` characters, within the quota. Returns its result."""
+        attempt = 0
+        while True:
+            waited = self.characters.acquire(characters) + self.requests.acquire(1)
+            if waited:
+                self._count("throttled_seconds", waited)
+            self.concurrency.acquire()
+            started = self._clock()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(e, attempt, self._clock() - started)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+                continue
+            self.concurrency.release(self._clock() - started)
+            self._count("calls")
+            return result
+
+    async def call_async(self, fn, characters):
+        """Like ``call`` for a coroutine function ``fn``; waits for quota without blocking the event loop."""
+        attempt = 0
+        while True:
+            wait = max(self.characters.reserve(characters), self.requests.reserve(1))
+            if wait:
+                self._count("throttled_seconds", wait)
+                await asyncio.sleep(wait)
+            await self.concurrency.acquire_async()
+            started = self._clock()
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._failed(e, attempt, self._clock() - started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.concurrency.release(self._clock() - started)
+            self._count("calls")
+            return result
+
+def create_limiter(max_concurrency=CONCURRENCY_MAX):
+    """Build a limiter for this process's share of the configured quota."""
+    return QuotaLimiter(
+        QUOTA_CHARS_PER_MINUTE / QUOTA_PROCESSES, QUOTA_REQUESTS_PER_MINUTE / QUOTA_PROCESSES,
+        concurrency=AdaptiveConcurrency(CONCURRENCY_INITIAL, CONCURRENCY_MIN, max_concurrency, TARGET_LATENCY_SECONDS)
+    )
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """Get the process-wide limiter shared by all workers, creating it on first use."""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                _default_limiter = create_limiter()
+    return _default_limiter
+
+def set_limiter(limiter):
+    """Replace the process-wide limiter. Returns the old one."""
+    global _default_limiter
+    with _default_limiter_lock:
+        previous, _default_limiter = _default_limiter, limiter
+    return previous
@@ -0,0 +1,96 @@
+import os
+import math
+from datetime import datetime
+
+# Scheduling settings. Scores are in priority levels: a job's score is its priority,
+# plus credit for waiting, minus a penalty for its size and for how many jobs its
+# client (or region) already has in flight. The highest score is claimed first.
+PRIORITY_MIN = -9
+PRIORITY_MAX = 9
+AGING_SECONDS = float(os.getenv('SCHEDULER_AGING_SECONDS', '600'))  # Waiting this long is worth one priority level
+SIZE_BIAS = float(os.getenv('SCHEDULER_SIZE_BIAS', '1'))  # Levels lost per tenfold growth beyond SIZE_FREE_CHARS
+SIZE_FREE_CHARS = 1000  # Jobs up to this size get no size penalty
+FAIR_SHARE_PENALTY = float(os.getenv('SCHEDULER_FAIR_SHARE_PENALTY', '1'))  # Levels lost per job of the same client in flight
+CANDIDATE_WINDOW = int(os.getenv('SCHEDULER_CANDIDATE_WINDOW', '100'))  # Rows read from each index per claim
+
+# Pending rows that can be claimed now. Each candidate query below walks a partial
+# index on "status = 'pending' AND duplicate_of IS NULL" in its own order; INDEXED BY
+# keeps the planner from falling back to the status index and a sort.
+_CLAIMABLE = "status = 'pending' AND duplicate_of IS NULL AND (retry_after IS NULL OR retry_after <= ?)"
+_CANDIDATE_QUERIES = (
+    # Most urgent
+    f"SELECT id FROM translations INDEXED BY idx_translations_pending_priority WHERE {_CLAIMABLE} "
+    "ORDER BY priority DESC, id LIMIT ?",
+    # Oldest (starvation protection)
+    f"SELECT id FROM translations INDEXED BY idx_translations_pending_age WHERE {_CLAIMABLE} ORDER BY id LIMIT ?",
+    # Shortest
+    f"SELECT id FROM translations INDEXED BY idx_translations_pending_size WHERE {_CLAIMABLE} "
+    "ORDER BY size_chars, id LIMIT ?",
+)
+
+def fair_share_key(row):
+    """Jobs of one client (or, without a client id, one region) share the pool fairly."""
+    return row['client_id'] or f"region:{row['region']}"
+
+def score(row, now, in_flight):
+    """Scheduling score of a pending job; see the settings above."""
+    created = datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S')
+    age = max((now - created).total_seconds(), 0.0)
+    size_penalty = SIZE_BIAS * math.log10(max(row['size_chars'], SIZE_FREE_CHARS) / SIZE_FREE_CHARS)
+    return (
+        row['priority']
+        + age / AGING_SECONDS
+        - size_penalty
+        - FAIR_SHARE_PENALTY * in_flight.get(fair_share_key(row), 0)
+    )
+
+def select_pending(cursor, limit, now):
+    """Choose up to ``limit`` pending job ids to claim, best first, inside an open transaction.
+
+    Candidates are the most urgent, the oldest and the shortest claimable jobs, each
+    read from its own index, so the cost does not grow with the queue. They are
+    scored, and each pick counts against its client's fair share before the next.
+    """
+    now_text = now.strftime('%Y-%m-%d %H:%M:%S')
+    ids = set()
+    for query in _CANDIDATE_QUERIES:
+        ids.update(row['id'] for row in cursor.execute(query, (now_text, max(CANDIDATE_WINDOW, limit))).fetchall())
+    if not ids:
+        return []
+    candidates = cursor.execute(
+        "SELECT id, priority, size_chars, client_id, region, created_at FROM translations "
+        f"WHERE id IN ({', '.join('?' * len(ids))})",
+        tuple(ids)
+    ).fetchall()
+    in_flight = {}
+    for row in cursor.execute(
+        "SELECT client_id, region, COUNT(*) AS running FROM translations "
+        "WHERE status = 'processing' GROUP BY client_id, region"
+    ).fetchall():
+        in_flight[fair_share_key(row)] = in_flight.get(fair_share_key(row), 0) + row['running']
+
+    chosen = []
+    while candidates and len(chosen) < limit:
+        best = max(candidates, key=lambda row: (score(row, now, in_flight), -row['id']))
+        candidates.remove(best)
+        chosen.append(best['id'])
+        key = fair_share_key(best)
+        in_flight[key] = in_flight.get(key, 0) + 1
+    return chosen
+
+def with_siblings(cursor, ids, now):
+    """``ids`` plus the other claimable languages of the multi-target jobs among them.
+
+    The languages of one submission are claimed together, so a worker splits the
+    transcription once and translates them in parallel.
+    """
+    if not ids:
+        return ids
+    placeholders = ', '.join('?' * len(ids))
+    siblings = cursor.execute(
+        f"SELECT id FROM translations WHERE parent_id IN ("
+        f"SELECT parent_id FROM translations WHERE id IN ({placeholders}) AND parent_id IS NOT NULL) "
+        f"AND {_CLAIMABLE} AND id NOT IN ({placeholders}) ORDER BY id",
+        (*ids, now.strftime('%Y-%m-%d %H:%M:%S'), *ids)
+    ).fetchall()
+    return ids + [row['id'] for row in siblings]
@@ -0,0 +1,118 @@
+import re
+
+# Per-request limits of the Translation v3 API. Lengths are counted in code points,
+# which is what len() of a str measures.
+MAX_CHARS = 30000  # Leave some buffer below the 30,720 limit
+MAX_CONTENTS_PER_REQUEST = 1024  # Strings per request (API limit)
+
+# Sentence end (terminal punctuation, closing quotes/brackets, then whitespace) or line break
+_SEGMENT_END = re.compile(r'[.!?]+["\'”’)\]]*\s+|\n\s*')
+
+def _cut_long(text, start, end, max_chars, segments, leading, trailing):
+    """Append ``text[start:end]`` as cores of at most ``max_chars``, cut at spaces where possible."""
+    while end - start > max_chars:
+        cut = text.rfind(' ', start, start + max_chars + 1)
+        if cut <= start:
+            cut = start + max_chars
+        head_end = cut
+        while head_end > start and text[head_end - 1].isspace():
+            head_end -= 1
+        rest = cut
+        while rest < end and text[rest].isspace():
+            rest += 1
+        if head_end == start:
+            # Nothing but whitespace before the cut; hard-cut instead
+            head_end = rest = start + max_chars
+        segments.append((leading, text[start:head_end], text[head_end:rest]))
+        leading, start = "", rest
+    segments.append((leading, text[start:end], trailing))
+
+def split_segments(text, max_chars=None):
+    """Split text into sentence/line segments without losing a single character.
+
+    Returns ``(leading, core, trailing)`` triples where ``core`` is the text to translate
+    (possibly empty) and the surrounding whitespace is kept verbatim, so joining all
+    the parts reproduces ``text`` exactly. Cores longer than ``max_chars`` are cut at
+    the last space that fits, or hard-cut if there is none. Runs in time linear in
+    the length of ``text``.
+    """
+    max_chars = max_chars or MAX_CHARS
+    segments = []
+    start = 0
+    length = len(text)
+    boundaries = [match.end() for match in _SEGMENT_END.finditer(text)]
+    if not boundaries or boundaries[-1] < length:
+        boundaries.append(length)
+    for end in boundaries:
+        core_start = start
+        while core_start < end and text[core_start].isspace():
+            core_start += 1
+        if core_start == end:
+            if end > start:
+                segments.append((text[start:end], "", ""))
+            start = end
+            continue
+        core_end = end
+        while text[core_end - 1].isspace():
+            core_end -= 1
+        _cut_long(text, core_start, core_end, max_chars, segments, text[start:core_start], text[core_end:end])
+        start = end
+    return segments
+
+def reassemble(segments, translations):
+    """Put translated cores back between their original whitespace."""
+    translations = iter(translations)
+    return "".join(leading + (next(translations) if core else "") + trailing for leading, core, trailing in segments)
+
+def _first_fit_decreasing(lengths, max_chars, max_contents):
+    """Place the longest items first, each into the first request with room for it."""
+    bins = []  # [indices, total_chars]
+    open_bins = []  # Bins that can still take another content
+    for index in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        length = lengths[index]
+        for entry in open_bins:
+            if entry[1] + length <= max_chars:
+                break
+        else:
+            entry = [[], 0]
+            bins.append(entry)
+            open_bins.append(entry)
+        entry[0].append(index)
+        entry[1] += length
+        if len(entry[0]) >= max_contents or entry[1] >= max_chars:
+            open_bins.remove(entry)
+    return [sorted(indices) for indices, _ in bins]
+
+def _next_fit(lengths, max_chars, max_contents):
+    """Fill requests in input order, starting a new one when the next item does not fit."""
+    bins = []
+    chars = 0
+    for index, length in enumerate(lengths):
+        if not bins or chars + length > max_chars or len(bins[-1]) >= max_contents:
+            bins.append([])
+            chars = 0
+        bins[-1].append(index)
+        chars += length
+    return bins
+
+def pack_indices(lengths, max_chars=None, max_contents=MAX_CONTENTS_PER_REQUEST):
+    """Bin-pack items of the given ``lengths`` into as few requests as the limits allow.
+
+    Limits are ``max_chars`` code points and ``max_contents`` strings per request.
+    First-fit decreasing packs best when the character limit binds. When the content
+    count binds (many short segments), filling requests in order does as well or
+    better, so both are tried and the one with fewer requests wins. Returns lists of
+    item indices, one per request; an item longer than ``max_chars`` gets a request to
+    itself. The result depends only on the input, so the same texts always pack the
+    same way.
+    """
+    max_chars = max_chars or MAX_CHARS
+    return min(
+        _first_fit_decreasing(lengths, max_chars, max_contents),
+        _next_fit(lengths, max_chars, max_contents),
+        key=len,
+    )
+
+def pack_requests(texts, max_chars=None, max_contents=MAX_CONTENTS_PER_REQUEST):
+    """Group texts into as few API requests as possible; see pack_indices. Returns lists of texts."""
+    return [[texts[i] for i in indices] for indices in pack_indices([len(text) for text in texts], max_chars, max_contents)]
@@ -0,0 +1,78 @@
+"""Production entry point: the API under gunicorn, the translation worker pool and the purge scheduler.
+
+Each service runs as its own process group member and can also be launched alone:
+
+    gunicorn -c gunicorn.conf.py app:app   # API (API_PROCESSES x API_THREADS)
+    python translation_worker.py           # Workers (TRANSLATION_WORKER_PROCESSES x TRANSLATION_WORKER_COUNT)
+    python purge.py                        # Purge scheduler
+
+Set SERVE_WORKERS=0 or SERVE_PURGE=0 when those run elsewhere (e.g. in their own
+containers, sharing the database volume and TRANSLATION_WAKEUP_DIR). On SIGTERM or
+SIGINT every service is asked to stop: the API finishes in-flight requests and the
+workers finish the jobs they have claimed before exiting.
+
+All services write their metrics to METRICS_DIR, which is emptied on startup, so
+/metrics on any API process reports the whole deployment.
+"""
+import os
+import sys
+import signal
+import shutil
+import logging
+import tempfile
+import subprocess
+from database import init_db, close_pools
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+SERVE_WORKERS = os.getenv('SERVE_WORKERS', '1') == '1'
+SERVE_PURGE = os.getenv('SERVE_PURGE', '1') == '1'
+METRICS_DIR = os.getenv('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'translator-metrics')
+
+def service_commands():
+    """Command line of every service this process should supervise."""
+    commands = {"api": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]}
+    if SERVE_WORKERS:
+        commands["worker"] = [sys.executable, "translation_worker.py"]
+    if SERVE_PURGE:
+        commands["purge"] = [sys.executable, "purge.py"]
+    return commands
+
+def main():
+    setup_logging()
+    # Migrate once up front so the services don't race to do it
+    init_db()
+    close_pools()
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)  # Counters start from zero with the services
+
+    environment = {**os.environ, 'METRICS_DIR': METRICS_DIR}
+    processes = {name: subprocess.Popen(command, env=environment) for name, command in service_commands().items()}
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # If any service dies on its own, take the rest down so the container restarts cleanly
+    exit_code = 0
+    pid, status = os.wait()
+    name = next(name for name, process in processes.items() if process.pid == pid)
+    processes[name].returncode = os.waitstatus_to_exitcode(status)
+    if not stopping:
+        logger.error("Service '%s' exited unexpectedly with code %s; stopping the others.", name, processes[name].returncode)
+        exit_code = 1
+        shutdown(None, None)
+    for process in processes.values():
+        process.wait()
+    logger.info("All services stopped.")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
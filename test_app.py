@@ -1,8 +1,17 @@
 import os
 import pytest
 import json
+import gzip
+import brotli
+import time
+import threading
+import app as app_module
 from app import app, init_db
-from database import execute_with_params
+from database import execute_with_params, close_pools, write_transaction, compress_text, put_texts, get_texts
+from notifications import notify_status_changed
+import translation_worker
+from translation_backend import FakeTranslationBackend
+from benchmarks.startup import FORBIDDEN_IN_API, measure, loaded
 
 API_KEY = os.getenv("TRANSLATION_API_KEY", "your_default_api_key")
 TEST_DB = 'test_translations_api.db'
@@ -12,6 +21,7 @@ def setup_teardown():
     os.environ['DATABASE_PATH'] = TEST_DB
     init_db()
     yield
+    close_pools()
     try:
         os.remove(TEST_DB)
     except FileNotFoundError:
@@ -32,6 +42,35 @@ def test_translate_missing_fields():
         assert resp.status_code == 400
         assert "Missing required fields" in resp.get_data(as_text=True)
 
+@pytest.mark.parametrize("body", [None, [], "text"])
+def test_translate_rejects_non_object_body(body):
+    with app.test_client() as client:
+        resp = client.post('/translate', json=body, headers=auth_headers())
+        assert resp.status_code == 400
+
+@pytest.mark.parametrize("field, value", [("transcription", 123), ("sermon_title", ["x"]), ("region", {"a": 1})])
+def test_non_string_required_field_is_invalid(field, value):
+    with app.test_client() as client:
+        resp = client.post('/translate', json=dict(sermon("guid-bad"), **{field: value}), headers=auth_headers())
+        assert resp.status_code == 400
+
+        batch = client.post('/translate/batch', json=[
+            dict(sermon("guid-bad"), **{field: value}), sermon("guid-good"),
+        ], headers=auth_headers())
+        assert batch.status_code == 200
+        assert [result["result"] for result in batch.get_json()["results"]] == ["invalid", "created"]
+
+def test_sermon_guid_with_slash_is_rejected():
+    with app.test_client() as client:
+        resp = client.post('/translate', json=sermon("x/es"), headers=auth_headers())
+        assert resp.status_code == 400
+        assert "'/'" in resp.get_json()["error"]
+        batch = client.post('/translate/batch', json=[sermon("x/es")], headers=auth_headers())
+        assert batch.get_json()["results"][0]["result"] == "invalid"
+
+        multi = client.post('/translate', json=dict(sermon("x"), convert_to_language=["es", "fr"]), headers=auth_headers())
+        assert multi.status_code == 201
+
 def test_translate_success_and_duplicate():
     with app.test_client() as client:
         data = {
@@ -89,3 +128,407 @@ def test_status_success():
         assert data["translated_text"] == "Texto traducido"
         assert data["status"] == "completed"
         assert data["finished"] == "2024-01-01 00:00:00"
+
+def sermon(guid, transcription="Same transcription"):
+    return {
+        "sermon_guid": guid,
+        "sermon_title": "Test Title",
+        "transcription": transcription,
+        "current_language": "en",
+        "convert_to_language": "es",
+        "region": "US"
+    }
+
+def test_identical_content_reuses_completed_translation():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-original"), headers=auth_headers())
+        execute_with_params(
+            "UPDATE translations SET status = 'completed', translated_text = 'Misma transcripción', "
+            "translated_sermon_title = 'Título' WHERE sermon_guid = 'guid-original'"
+        )
+
+        resp = client.post('/translate', json=sermon("guid-reupload"), headers=auth_headers())
+        assert resp.status_code == 201
+        assert resp.get_json()["status"] == "completed"
+
+        data = client.get('/status/guid-reupload', headers=auth_headers()).get_json()
+        assert data["status"] == "completed"
+        assert data["translated_text"] == "Misma transcripción"
+        assert data["translated_sermon_title"] == "Título"
+
+def test_submitted_text_is_stored_compressed_outside_the_jobs_table():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-stored", "Stored transcription"), headers=auth_headers())
+
+    row = execute_with_params("SELECT id, transcription FROM translations WHERE sermon_guid = 'guid-stored'")[0]
+    assert row['transcription'] == ''
+    assert get_texts([row['id']], 'transcription') == {row['id']: "Stored transcription"}
+
+def test_reused_result_is_copied_from_side_table():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-original"), headers=auth_headers())
+        original_id = execute_with_params("SELECT id FROM translations WHERE sermon_guid = 'guid-original'")[0]['id']
+        with write_transaction() as cursor:
+            cursor.execute("UPDATE translations SET status = 'completed' WHERE id = ?", (original_id,))
+            put_texts(cursor, 'translated_text', [(original_id, compress_text("Texto comprimido"))])
+
+        client.post('/translate', json=sermon("guid-reupload"), headers=auth_headers())
+        data = client.get('/status/guid-reupload', headers=auth_headers()).get_json()
+        assert data["translated_text"] == "Texto comprimido"
+
+        batch = client.post('/status/batch?fields=translated_text', json=["guid-original", "guid-reupload"],
+                            headers=auth_headers()).get_json()
+        assert [item["translated_text"] for item in batch["statuses"]] == ["Texto comprimido"] * 2
+
+def test_priority_and_client_are_stored():
+    with app.test_client() as client:
+        resp = client.post('/translate', json=dict(sermon("guid-urgent"), priority=5),
+                           headers=dict(auth_headers(), **{"X-Client-Id": "studio"}))
+        assert resp.status_code == 201
+
+    row = execute_with_params("SELECT priority, client_id, size_chars FROM translations WHERE sermon_guid = 'guid-urgent'")[0]
+    assert row == {"priority": 5, "client_id": "studio", "size_chars": len("Same transcription")}
+
+@pytest.mark.parametrize("priority", [10, -10, "high", 1.5, True])
+def test_invalid_priority_is_rejected(priority):
+    with app.test_client() as client:
+        resp = client.post('/translate', json=dict(sermon("guid-bad"), priority=priority), headers=auth_headers())
+        assert resp.status_code == 400
+        assert "priority" in resp.get_json()["error"]
+
+        batch = client.post('/translate/batch', json=[dict(sermon("guid-bad"), priority=priority)], headers=auth_headers())
+        assert batch.get_json()["results"][0]["result"] == "invalid"
+
+def test_urgent_duplicate_raises_priority_of_original():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-original"), headers=auth_headers())
+        client.post('/translate', json=dict(sermon("guid-urgent-copy"), priority=7), headers=auth_headers())
+
+    assert execute_with_params("SELECT priority FROM translations WHERE sermon_guid = 'guid-original'")[0]['priority'] == 7
+
+def test_identical_content_attaches_to_in_flight_job():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-original"), headers=auth_headers())
+        client.post('/translate', json=sermon("guid-reupload"), headers=auth_headers())
+        client.post('/translate', json=sermon("guid-other", "Different text"), headers=auth_headers())
+
+    rows = {row['sermon_guid']: row for row in execute_with_params("SELECT * FROM translations")}
+    assert rows["guid-reupload"]["duplicate_of"] == rows["guid-original"]["id"]
+    assert rows["guid-other"]["duplicate_of"] is None
+    assert rows["guid-original"]["content_hash"] == rows["guid-reupload"]["content_hash"]
+
+def change_status_later(guid, statuses, delay=0.2):
+    """Move a job through ``statuses`` in the background, notifying waiters like the worker does."""
+    def run():
+        for status in statuses:
+            time.sleep(delay)
+            execute_with_params("UPDATE translations SET status = ? WHERE sermon_guid = ?", (status, guid))
+            notify_status_changed([guid])
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def test_status_long_poll_returns_on_change():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-wait"), headers=auth_headers())
+        thread = change_status_later("guid-wait", ["processing"])
+
+        started = time.monotonic()
+        resp = client.get('/status/guid-wait?wait=10', headers=auth_headers())
+        thread.join()
+
+        assert resp.status_code == 200
+        assert resp.get_json()["status"] == "processing"
+        assert time.monotonic() - started < 5
+
+def test_status_long_poll_times_out_unchanged():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-wait"), headers=auth_headers())
+
+        resp = client.get('/status/guid-wait?wait=0.1', headers=auth_headers())
+
+        assert resp.get_json()["status"] == "pending"
+        assert client.get('/status/guid-wait?wait=soon', headers=auth_headers()).status_code == 400
+
+def test_status_event_stream():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-sse"), headers=auth_headers())
+        thread = change_status_later("guid-sse", ["processing", "completed"])
+
+        resp = client.get('/status/guid-sse/events', headers=auth_headers())
+        body = resp.get_data(as_text=True)
+        thread.join()
+
+        assert resp.mimetype == 'text/event-stream'
+        statuses = [json.loads(line[len("data: "):])["status"] for line in body.splitlines() if line.startswith("data: ")]
+        assert statuses == ["pending", "processing", "completed"]
+
+def test_status_event_stream_not_found():
+    with app.test_client() as client:
+        assert client.get('/status/missing/events', headers=auth_headers()).status_code == 404
+
+def test_waiters_beyond_the_cap_are_not_held_open(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(app_module, '_waiter_slots', slots)
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-wait"), headers=auth_headers())
+
+    def stream():
+        with app.test_client() as client:
+            resp = client.get('/status/guid-wait/events?timeout=1', headers=auth_headers())
+            resp.get_data()
+            resp.close()  # As the server does once the response is sent
+
+    holder = threading.Thread(target=stream)
+    holder.start()
+    deadline = time.monotonic() + 5
+    while slots._value and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with app.test_client() as client:
+        started = time.monotonic()
+        resp = client.get('/status/guid-wait?wait=10', headers=auth_headers())
+        assert resp.get_json()["status"] == "pending"
+        assert time.monotonic() - started < 0.9
+        refused = client.get('/status/guid-wait/events', headers=auth_headers())
+        assert refused.status_code == 503 and refused.headers['Retry-After']
+
+    holder.join()
+    assert slots.acquire(blocking=False)  # Released when the stream ended
+
+def test_batch_submission():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-existing", "Already here"), headers=auth_headers())
+        jobs = [
+            sermon("guid-b1", "First text"),
+            sermon("guid-existing", "Other text"),
+            {"sermon_guid": "guid-bad"},
+            sermon("guid-b2", "First text"),
+            sermon("guid-b1", "Repeated GUID"),
+        ]
+
+        resp = client.post('/translate/batch', json={"jobs": jobs}, headers=auth_headers())
+
+        assert resp.status_code == 200
+        results = resp.get_json()["results"]
+        assert [result["result"] for result in results] == ["created", "duplicate", "invalid", "created", "duplicate"]
+        assert results[0]["status"] == "pending"
+
+    rows = {row['sermon_guid']: row for row in execute_with_params("SELECT * FROM translations")}
+    assert set(rows) == {"guid-existing", "guid-b1", "guid-b2"}
+    # Identical content within the batch is attached to its first occurrence
+    assert rows["guid-b2"]["duplicate_of"] == rows["guid-b1"]["id"]
+
+def test_batch_submission_rejects_non_list():
+    with app.test_client() as client:
+        resp = client.post('/translate/batch', json={"jobs": "nope"}, headers=auth_headers())
+        assert resp.status_code == 400
+
+def test_batch_status():
+    with app.test_client() as client:
+        client.post('/translate/batch', json=[sermon("guid-s1", "One"), sermon("guid-s2", "Two")], headers=auth_headers())
+
+        resp = client.post('/status/batch', json={"sermon_guids": ["guid-s2", "missing", "guid-s1"]}, headers=auth_headers())
+
+        assert resp.status_code == 200
+        statuses = resp.get_json()["statuses"]
+        assert [status["sermon_guid"] for status in statuses] == ["guid-s2", "missing", "guid-s1"]
+        assert statuses[0]["status"] == "pending"
+        assert "error" in statuses[1]
+
+def test_status_fields_projection():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-fields"), headers=auth_headers())
+
+        resp = client.get('/status/guid-fields?fields=status,created', headers=auth_headers())
+        assert resp.get_json().keys() == {"status", "created"}
+        assert resp.get_json()["created"] is not None
+
+        assert client.get('/status/guid-fields?fields=transcription', headers=auth_headers()).status_code == 400
+
+def test_status_etag_not_modified():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-etag"), headers=auth_headers())
+        first = client.get('/status/guid-etag', headers=auth_headers())
+        etag = first.headers['ETag']
+
+        unchanged = client.get('/status/guid-etag', headers={**auth_headers(), "If-None-Match": etag})
+        assert unchanged.status_code == 304
+        assert unchanged.get_data() == b""
+
+        # A projection is a different representation with its own ETag
+        projected = client.get('/status/guid-etag?fields=status', headers={**auth_headers(), "If-None-Match": etag})
+        assert projected.status_code == 200
+
+        execute_with_params("UPDATE translations SET status = 'completed' WHERE sermon_guid = 'guid-etag'")
+        changed = client.get('/status/guid-etag', headers={**auth_headers(), "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+
+def test_status_etag_ignores_lease_renewal():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-lease"), headers=auth_headers())
+        etag = client.get('/status/guid-lease', headers=auth_headers()).headers['ETag']
+
+        execute_with_params("UPDATE translations SET lease_expires_at = '2030-01-01 00:00:00' WHERE sermon_guid = 'guid-lease'")
+
+        assert client.get('/status/guid-lease', headers={**auth_headers(), "If-None-Match": etag}).status_code == 304
+
+def test_large_status_is_compressed():
+    long_text = "Texto traducido. " * 1000
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, status, translated_text) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ("guid-big", "Title", "Transcript", "en", "es", "US", "completed", long_text)
+    )
+    with app.test_client() as client:
+        gzipped = client.get('/status/guid-big', headers={**auth_headers(), "Accept-Encoding": "gzip"})
+        assert gzipped.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(gzipped.get_data()))["translated_text"] == long_text
+
+        brotli_resp = client.get('/status/guid-big', headers={**auth_headers(), "Accept-Encoding": "gzip, br"})
+        assert brotli_resp.headers['Content-Encoding'] == 'br'
+        assert json.loads(brotli.decompress(brotli_resp.get_data()))["translated_text"] == long_text
+
+        plain = client.get('/status/guid-big', headers=auth_headers())
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.get_json()["translated_text"] == long_text
+
+def test_multi_target_submission_stores_source_once():
+    with app.test_client() as client:
+        data = dict(sermon("guid-multi"), convert_to_language=["es", "fr", "de"])
+        resp = client.post('/translate', json=data, headers=auth_headers())
+        assert resp.status_code == 201
+        assert resp.get_json()["status"] == "pending"
+
+        children = execute_with_params(
+            "SELECT sermon_guid, convert_to_language, status FROM translations WHERE parent_id IS NOT NULL ORDER BY id"
+        )
+        assert [(row['sermon_guid'], row['convert_to_language']) for row in children] == [
+            ("guid-multi/es", "es"), ("guid-multi/fr", "fr"), ("guid-multi/de", "de")
+        ]
+        stored = execute_with_params("SELECT COUNT(*) AS count FROM translation_texts WHERE kind = 'transcription'")
+        assert stored[0]['count'] == 1
+
+        resp = client.get('/status/guid-multi', headers=auth_headers())
+        body = resp.get_json()
+        assert body["status"] == "pending"
+        assert body["convert_to_language"] == ["es", "fr", "de"]
+        assert {language: result["status"] for language, result in body["translations"].items()} == {
+            "es": "pending", "fr": "pending", "de": "pending"
+        }
+        assert "translated_text" not in body
+
+        # Resubmitting the GUID, or any of its languages, is a duplicate
+        assert client.post('/translate', json=data, headers=auth_headers()).status_code == 409
+
+def test_multi_target_status_per_language():
+    with app.test_client() as client:
+        client.post(
+            '/translate', json=dict(sermon("guid-multi"), convert_to_language=["es", "fr"]), headers=auth_headers()
+        )
+        first = client.get('/status/guid-multi', headers=auth_headers())
+        with write_transaction() as cursor:
+            cursor.execute(
+                "UPDATE translations SET status = 'completed', translated_sermon_title = 'Titulo', "
+                "finished_at = '2024-01-01 00:00:00' WHERE sermon_guid = 'guid-multi/es'"
+            )
+            child_id = cursor.execute("SELECT id FROM translations WHERE sermon_guid = 'guid-multi/es'").fetchone()['id']
+            put_texts(cursor, 'translated_text', [(child_id, compress_text("Texto"))])
+
+        resp = client.get('/status/guid-multi', headers={**auth_headers(), "If-None-Match": first.headers["ETag"]})
+        assert resp.status_code == 200  # A language's progress changes the ETag
+        body = resp.get_json()
+        assert body["status"] == "processing"
+        assert body["finished"] is None
+        assert body["translations"]["es"] == {
+            "status": "completed", "translated_sermon_title": "Titulo", "translated_text": "Texto",
+            "finished": "2024-01-01 00:00:00", "progress": None
+        }
+        assert body["translations"]["fr"]["status"] == "pending"
+
+        resp = client.get('/status/guid-multi?fields=status', headers=auth_headers())
+        assert resp.get_json() == {"status": "processing", "translations": {"es": {"status": "completed"}, "fr": {"status": "pending"}}}
+
+def test_multi_target_language_reuses_completed_translation():
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-single"), headers=auth_headers())
+        execute_with_params("UPDATE translations SET status = 'completed', translated_sermon_title = 'Titulo'")
+
+        client.post(
+            '/translate', json=dict(sermon("guid-multi"), convert_to_language=["es", "fr"]), headers=auth_headers()
+        )
+
+        body = client.get('/status/guid-multi', headers=auth_headers()).get_json()
+        assert body["translations"]["es"]["status"] == "completed"
+        assert body["translations"]["fr"]["status"] == "pending"
+
+@pytest.mark.parametrize("targets", [[], ["es", "es"], ["es", 3], {"es": True}])
+def test_invalid_target_list_is_rejected(targets):
+    with app.test_client() as client:
+        resp = client.post('/translate', json=dict(sermon("guid-multi"), convert_to_language=targets), headers=auth_headers())
+        assert resp.status_code == 400
+
+def test_api_process_does_not_load_translation_client():
+    modules, _ = measure("import app")
+    assert 'app' in modules
+    assert loaded(modules, FORBIDDEN_IN_API) == []
+
+def test_status_reports_progress_and_partial_text(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'MAX_CHARS', 40)  # One sentence per chunk
+    monkeypatch.setattr(translation_worker.translation_memory, 'MEMORY_ENABLED', False)
+    text = "".join(f"Sentence {i} of the sermon.\n" for i in range(4))
+
+    def transform(text, source, target):
+        if "Sentence 2" in text:
+            raise RuntimeError("backend down")
+        return f"[{target}] {text}"
+
+    with app.test_client() as client:
+        client.post('/translate', json=sermon("guid-long", text), headers=auth_headers())
+        resp = client.get('/status/guid-long?partial=true', headers=auth_headers())
+        assert resp.get_json()["progress"] is None
+        assert resp.get_json()["partial_text"] == ""
+        started = resp.headers["ETag"]
+
+        [job] = translation_worker.claim_jobs('worker-a')
+        with pytest.raises(RuntimeError):
+            translation_worker.translate_job(
+                job['transcription'], job['sermon_title'], 'en', 'es', 'US',
+                backend=FakeTranslationBackend(transform=transform), checkpoint=translation_worker.ChunkCheckpoint(job['id'])
+            )
+
+        resp = client.get('/status/guid-long?partial=true', headers={**auth_headers(), "If-None-Match": started})
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body["status"] == "processing"
+        progress = body["progress"]
+        assert (progress["chunks_done"], progress["chunks_total"]) == (3, 4)  # The title shares a chunk
+        assert progress["characters_total"] == len(text)  # The sermon's own characters
+        assert progress["characters_done"] == len(text) - len("Sentence 2 of the sermon.\n")
+        assert body["partial_text"] == "[es] Sentence 0 of the sermon.\n[es] Sentence 1 of the sermon.\n"
+        assert body["translated_text"] is None
+
+        resp = client.get('/status/guid-long', headers=auth_headers())
+        assert "partial_text" not in resp.get_json()  # Opt-in
+        assert client.get('/status/guid-long?partial=maybe', headers=auth_headers()).status_code == 400
+
+def test_multi_target_progress_is_summed_over_languages():
+    with app.test_client() as client:
+        client.post('/translate', json=dict(sermon("guid-multi"), convert_to_language=["es", "fr"]), headers=auth_headers())
+        execute_with_params(
+            "UPDATE translations SET chunks_done = 1, chunks_total = 2, characters_done = 10, characters_total = 30 "
+            "WHERE sermon_guid = 'guid-multi/es'"
+        )
+        body = client.get('/status/guid-multi?fields=progress', headers=auth_headers()).get_json()
+        assert body["progress"] is None  # Not every language has started
+        assert body["translations"]["es"]["progress"] == {
+            "chunks_done": 1, "chunks_total": 2, "characters_done": 10, "characters_total": 30
+        }
+
+        execute_with_params(
+            "UPDATE translations SET chunks_done = 2, chunks_total = 2, characters_done = 30, characters_total = 30 "
+            "WHERE sermon_guid = 'guid-multi/fr'"
+        )
+        body = client.get('/status/guid-multi?fields=progress', headers=auth_headers()).get_json()
+        assert body["progress"] == {"chunks_done": 3, "chunks_total": 4, "characters_done": 40, "characters_total": 60}
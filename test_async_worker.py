@@ -0,0 +1,166 @@
+import os
+import asyncio
+import threading
+import time
+import pytest
+import async_worker
+from google.api_core import exceptions as google_exceptions
+from async_worker import AsyncWorker, run_async_worker
+from translation_backend import FakeTranslationBackend
+from database import init_db, execute_with_params, close_pools, get_texts
+from translation_worker import stop_workers, translate_job
+
+TEST_DB = 'test_translations_async_worker.db'
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+def insert_job(guid, transcription='Transcript'):
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES (?, 'Title', ?, 'en', 'es', 'US')",
+        (guid, transcription)
+    )
+
+def job_row(guid):
+    return execute_with_params("SELECT * FROM translations WHERE sermon_guid = ?", (guid,))[0]
+
+def job_text(guid):
+    row = job_row(guid)
+    return get_texts([row['id']], 'translated_text').get(row['id'])
+
+def run_until_idle(worker, monkeypatch):
+    """Run ``worker`` until a claim comes back empty, then let it drain."""
+    stop = threading.Event()
+    original_claim = async_worker.claim_jobs
+
+    def stop_when_idle(worker_id, limit=1):
+        jobs = original_claim(worker_id, limit)
+        if not jobs:
+            stop_workers(stop)
+        return jobs
+
+    monkeypatch.setattr(async_worker, 'claim_jobs', stop_when_idle)
+    asyncio.run(worker.run(stop))
+
+def test_jobs_complete_as_in_threaded_worker(monkeypatch):
+    text = "".join(f"Sentence number {i}.\n" for i in range(40))
+    insert_job('guid-1', text)
+    insert_job('guid-2')
+
+    run_until_idle(AsyncWorker('worker-a', backend=FakeTranslationBackend()), monkeypatch)
+
+    expected_text, expected_title = translate_job(text, 'Title', 'en', 'es', 'US', backend=FakeTranslationBackend())
+    row = job_row('guid-1')
+    assert row['status'] == 'completed'
+    assert job_text('guid-1') == expected_text
+    assert row['translated_sermon_title'] == expected_title
+    assert row['worker_id'] is None
+    assert job_text('guid-2') == '[es] Transcript'
+
+def test_many_requests_in_flight_from_one_process(monkeypatch):
+    monkeypatch.setattr(async_worker, 'MAX_CHARS', 100)
+    monkeypatch.setattr(async_worker.translation_memory, 'MEMORY_ENABLED', False)
+    for n in range(20):
+        insert_job(f'guid-{n}', "".join(f"Job {n} sentence number {i}.\n" for i in range(30)))
+    backend = FakeTranslationBackend(latency=0.05)
+
+    started = time.monotonic()
+    run_until_idle(AsyncWorker('worker-a', backend=backend, max_jobs=20, max_in_flight=50), monkeypatch)
+    elapsed = time.monotonic() - started
+
+    assert all(job_row(f'guid-{n}')['status'] == 'completed' for n in range(20))
+    assert 8 < backend.max_in_flight <= 50  # More than one job's worth, within the bound
+    assert elapsed < backend.calls * backend.latency / 4
+
+def test_retryable_failure_is_retried_later(monkeypatch):
+    insert_job('guid-1')
+    backend = FakeTranslationBackend(error_rate=1.0)
+    limiter = async_worker.create_limiter()
+    limiter.max_retries = 0
+
+    run_until_idle(AsyncWorker('worker-a', backend=backend, limiter=limiter), monkeypatch)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'pending'
+    assert row['attempts'] == 1
+    assert row['retry_after'] is not None
+    assert 'ServiceUnavailable' in row['last_error']
+
+class FailOnceBackend(FakeTranslationBackend):
+    """Fails its first request with a retryable error."""
+
+    def _begin(self, contents):
+        delay, _ = super()._begin(contents)
+        return delay, self.calls == 1
+
+def test_idle_worker_picks_up_retry_when_due(monkeypatch):
+    monkeypatch.setattr(async_worker.translation_worker, 'RETRY_BASE_SECONDS', 0)
+    monkeypatch.setattr(async_worker.translation_worker, 'TRANSLATION_POLL_INTERVAL', 60)
+    insert_job('guid-1')
+    backend = FailOnceBackend(latency=0.2)  # The worker is idle, waiting, when the attempt fails
+    limiter = async_worker.create_limiter()
+    limiter.max_retries = 0
+    stop = threading.Event()
+    worker = threading.Thread(target=asyncio.run, args=(AsyncWorker('worker-a', backend=backend, limiter=limiter).run(stop),))
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while job_row('guid-1')['status'] != 'completed' and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        stop_workers(stop)
+        worker.join(5)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'completed'
+    assert row['attempts'] == 2
+
+def test_permanent_failure_fails_job(monkeypatch):
+    insert_job('guid-1')
+    backend = FakeTranslationBackend(error_rate=1.0, error=lambda: google_exceptions.InvalidArgument("unsupported language"))
+
+    run_until_idle(AsyncWorker('worker-a', backend=backend), monkeypatch)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'failed'
+    assert 'unsupported language' in row['last_error']
+
+def test_database_calls_do_not_run_on_event_loop(monkeypatch):
+    insert_job('guid-1')
+    threads = []
+    original_finish = async_worker.finish_job
+
+    def recording_finish(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original_finish(*args, **kwargs)
+
+    monkeypatch.setattr(async_worker, 'finish_job', recording_finish)
+    run_until_idle(AsyncWorker('worker-a', backend=FakeTranslationBackend()), monkeypatch)
+
+    assert threads and all(name.startswith('async-worker-db') for name in threads)
+
+def test_run_async_worker_drains_claimed_jobs_on_stop():
+    insert_job('guid-1')
+    backend = FakeTranslationBackend(latency=0.3)
+    stop = threading.Event()
+    worker = threading.Thread(target=run_async_worker, args=(stop, backend))
+    worker.start()
+    deadline = time.monotonic() + 5
+    while backend.calls == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stop_workers(stop)  # Arrives while the job is being translated
+    worker.join(5)
+
+    assert not worker.is_alive()
+    assert job_row('guid-1')['status'] == 'completed'
@@ -1,7 +1,11 @@
 import pytest
 import os
 import sqlite3
-from database import init_db, get_db, execute_with_params
+from database import (
+    init_db, get_db, execute_with_params, execute_read, write_transaction,
+    close_pools, db_lock, ConnectionPool, compress_text, put_texts, get_texts, backoff, in_batches,
+    IN_QUERY_BATCH_SIZE
+)
 import threading
 import time
 
@@ -16,7 +20,8 @@ def setup_teardown():
     
     yield  # This is where the test runs
     
-    # Teardown: Remove test database
+    # Teardown: Release pooled connections, then remove test database
+    close_pools()
     try:
         os.remove(TEST_DB)
     except FileNotFoundError:
@@ -41,7 +46,10 @@ def test_init_db():
         'id', 'sermon_guid', 'sermon_title', 'transcription',
         'current_language', 'convert_to_language', 'region',
         'translated_text', 'translated_sermon_title', 'status',
-        'created_at', 'finished_at'
+        'created_at', 'finished_at', 'worker_id', 'lease_expires_at',
+        'content_hash', 'duplicate_of', 'version', 'attempts', 'last_error',
+        'retry_after', 'priority', 'size_chars', 'client_id', 'parent_id',
+        'chunks_done', 'chunks_total', 'characters_done', 'characters_total', 'callback_url'
     }
     assert columns == expected_columns
     conn.close()
@@ -167,3 +175,156 @@ def test_dict_factory():
     assert all(isinstance(key, str) for key in result[0].keys())
     assert 'sermon_guid' in result[0]
     assert 'sermon_title' in result[0]
+
+def test_wal_mode_enabled():
+    """Test that the database runs in WAL journal mode."""
+    init_db()
+
+    conn = sqlite3.connect(TEST_DB)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    conn.close()
+
+def test_reads_do_not_take_write_lock():
+    """Test that SELECTs are served while the writer lock is held."""
+    init_db()
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ('test-guid', 'Test Sermon', 'Test Content', 'en', 'es', 'US')
+    )
+
+    with db_lock:
+        result = execute_with_params("SELECT sermon_guid FROM translations")
+    assert result == [{'sermon_guid': 'test-guid'}]
+
+def test_write_transaction_rolls_back_on_error():
+    """Test that a failing write transaction leaves no partial changes."""
+    init_db()
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with write_transaction() as cursor:
+            for title in ('First', 'Second'):
+                cursor.execute(
+                    "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    ('test-guid', title, 'Test Content', 'en', 'es', 'US')
+                )
+
+    result = execute_with_params("SELECT COUNT(*) as count FROM translations")
+    assert result[0]['count'] == 0
+
+def test_pool_is_bounded():
+    """Test that the reader pool never opens more than its size."""
+    init_db()
+    pool = ConnectionPool(TEST_DB, size=2)
+    checked_out = []
+
+    def reader():
+        with pool.reader() as conn:
+            checked_out.append(conn)
+            time.sleep(0.05)
+            conn.execute("SELECT 1").fetchall()
+
+    threads = [threading.Thread(target=reader) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(map(id, checked_out))) <= 2
+    pool.close()
+
+def test_reader_connections_are_query_only():
+    """Test that a write sent to a reader connection is rejected."""
+    init_db()
+
+    with pytest.raises(sqlite3.OperationalError):
+        execute_read("DELETE FROM translations")
+
+def test_init_db_migrates_existing_table():
+    """Test that init_db adds new columns to a database created by an older schema."""
+    conn = sqlite3.connect(TEST_DB)
+    conn.execute('''
+        CREATE TABLE translations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sermon_guid TEXT NOT NULL UNIQUE,
+            sermon_title TEXT NOT NULL,
+            transcription TEXT NOT NULL,
+            current_language TEXT NOT NULL,
+            convert_to_language TEXT NOT NULL,
+            region TEXT NOT NULL,
+            translated_text TEXT DEFAULT NULL,
+            translated_sermon_title TEXT DEFAULT NULL,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP DEFAULT NULL
+        )
+    ''')
+    conn.execute(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES ('old-guid', 'Old Sermon', 'Old Content', 'en', 'es', 'US')"
+    )
+    conn.commit()
+    conn.close()
+
+    init_db()
+
+    result = execute_with_params("SELECT * FROM translations WHERE sermon_guid = ?", ('old-guid',))
+    assert result[0]['sermon_title'] == 'Old Sermon'
+    assert 'lease_expires_at' in result[0]
+
+def test_init_db_moves_inline_text_to_side_table():
+    """Test that text stored inline by older code is compressed into translation_texts."""
+    init_db()
+    long_text = "Inline transcription. " * 200
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, translated_text) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ('inline-guid', 'Title', long_text, 'en', 'es', 'US', 'Translated')
+    )
+    close_pools()
+
+    init_db()
+
+    row = execute_with_params("SELECT * FROM translations WHERE sermon_guid = ?", ('inline-guid',))[0]
+    assert row['transcription'] == ''
+    assert row['translated_text'] is None
+    assert get_texts([row['id']], 'transcription') == {row['id']: long_text}
+    assert get_texts([row['id']], 'translated_text') == {row['id']: 'Translated'}
+    stored = execute_with_params("SELECT body FROM translation_texts WHERE job_id = ? AND kind = 'transcription'", (row['id'],))
+    assert len(stored[0]['body']) < len(long_text)
+
+def test_texts_are_deleted_with_their_job():
+    """Test that deleting a job also deletes its stored texts."""
+    init_db()
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES ('guid', 'Title', '', 'en', 'es', 'US')"
+    )
+    job_id = execute_with_params("SELECT id FROM translations")[0]['id']
+    with write_transaction() as cursor:
+        put_texts(cursor, 'transcription', [(job_id, compress_text('Content'))])
+
+    execute_with_params("DELETE FROM translations WHERE id = ?", (job_id,))
+
+    assert execute_with_params("SELECT COUNT(*) AS count FROM translation_texts")[0]['count'] == 0
+
+def test_get_texts_reads_more_ids_than_one_in_clause():
+    """Test that get_texts batches its IN (...) lookups."""
+    init_db()
+    count = IN_QUERY_BATCH_SIZE * 2 + 1
+    with write_transaction() as cursor:
+        put_texts(cursor, 'transcription', [(job_id, compress_text(f'Text {job_id}')) for job_id in range(count)])
+
+    texts = get_texts(range(count), 'transcription')
+
+    assert len(texts) == count and texts[count - 1] == f'Text {count - 1}'
+    assert [len(batch) for batch, _ in in_batches(range(count))] == [IN_QUERY_BATCH_SIZE, IN_QUERY_BATCH_SIZE, 1]
+
+def test_backoff_doubles_with_jitter_up_to_cap():
+    """Test the retry delay after each failed attempt."""
+    for attempts, (low, high) in {1: (5, 10), 2: (10, 20), 3: (20, 40), 10: (50, 100)}.items():
+        delays = [backoff(attempts, 10, 100) for _ in range(50)]
+        assert all(low <= delay <= high for delay in delays)
+        delays = [backoff(attempts, 10, 100, full_jitter=True) for _ in range(50)]
+        assert all(0 <= delay <= high for delay in delays)
@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import queue
+import logging
+import pytest
+import log_config
+from log_config import RateLimitFilter, JsonFormatter, log_context, setup_logging, stop_logging
+from app import app
+from database import init_db, close_pools, execute_with_params
+from translation_backend import FakeTranslationBackend
+from translation_worker import claim_jobs, process_job
+
+TEST_DB = 'test_translations_log_config.db'
+HEADERS = {'X-API-KEY': 'your_default_api_key'}
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+@pytest.fixture
+def captured():
+    """Route logging through the queued pipeline into a list, restoring the previous setup afterwards."""
+    root = logging.getLogger()
+    level, srcfile = root.level, logging._srcfile
+    handler = ListHandler()
+    queue_handler = setup_logging('INFO', 'json', handler)
+    yield handler
+    stop_logging()
+    root.removeHandler(queue_handler)
+    root.setLevel(level)
+    logging._srcfile = srcfile
+    logging.logMultiprocessing = True
+
+def record(msg, *args, level=logging.INFO, name='test', **extra):
+    entry = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    entry.__dict__.update(extra)
+    return entry
+
+def test_rate_limit_reports_suppressed_count():
+    now = [0.0]
+    limiter = RateLimitFilter(limit=2, window=10, clock=lambda: now[0])
+
+    passed = [limiter.filter(record("Poll failed: %s", n, rate_limit=True)) for n in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(record("Other message", rate_limit=True))  # Counted separately
+
+    now[0] = 10.0
+    first = record("Poll failed: %s", 6, rate_limit=True)
+    assert limiter.filter(first)
+    assert first.suppressed == 3
+
+def test_rate_limit_applies_only_to_opted_in_records():
+    limiter = RateLimitFilter(limit=1, window=10, clock=lambda: 0.0)
+
+    assert all(limiter.filter(record("Translation job %s completed.", n)) for n in range(25))
+    assert all(
+        limiter.filter(record("Translation job %s failed", n, level=logging.ERROR, job_id=n, rate_limit=True))
+        for n in range(25)
+    )
+
+def test_json_formatter_includes_context_and_exception():
+    with log_context(job_id=7, sermon_guid='guid-1'):
+        entry = record("Translation job %s failed", 7, level=logging.ERROR)
+        log_config.ContextFilter().filter(entry)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        entry.exc_info = sys.exc_info()
+
+    line = json.loads(JsonFormatter().format(entry))
+
+    assert line['message'] == "Translation job 7 failed"
+    assert line['level'] == 'ERROR'
+    assert line['job_id'] == 7 and line['sermon_guid'] == 'guid-1'
+    assert 'worker_id' not in line
+    assert 'ValueError: boom' in line['exception']
+
+def test_records_reach_handler_through_queue(captured):
+    logger = logging.getLogger('test')
+    with log_context(worker_id='worker-a'):
+        logger.info("Claimed %d job(s)", 3)
+    logger.debug("Not written at INFO")
+    stop_logging()  # Drains the queue
+
+    assert [json.loads(line)['message'] for line in captured.lines] == ["Claimed 3 job(s)"]
+    assert json.loads(captured.lines[0])['worker_id'] == 'worker-a'
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = log_config._QueueHandler(queue.Queue(1))
+
+    handler.handle(record("first"))
+    handler.handle(record("second"))
+
+    assert handler.dropped == 1
+
+def test_worker_logs_carry_job_context(captured):
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES ('guid-1', 'Title', 'Transcript', 'en', 'es', 'US')"
+    )
+    job = claim_jobs('worker-a')[0]
+
+    process_job(job, 'worker-a', backend=FakeTranslationBackend())
+    stop_logging()
+
+    entries = [json.loads(line) for line in captured.lines if 'Translation job' in line]
+    assert entries and all(
+        entry['job_id'] == job['id'] and entry['sermon_guid'] == 'guid-1' and entry['worker_id'] == 'worker-a'
+        for entry in entries
+    )
+
+def test_status_requests_log_with_sermon_guid(captured):
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        client.get('/status/missing-guid', headers=HEADERS)
+    stop_logging()
+
+    entry = next(json.loads(line) for line in captured.lines if 'not found' in line)
+    assert entry['sermon_guid'] == 'missing-guid'
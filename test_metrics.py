@@ -0,0 +1,117 @@
+import os
+import re
+import pytest
+import metrics
+import app as app_module
+from app import app
+from database import init_db, close_pools, execute_with_params
+from purge import purge_old_jobs
+from translation_backend import FakeTranslationBackend
+from translation_worker import claim_jobs, process_job
+
+TEST_DB = 'test_translations_metrics.db'
+HEADERS = {'X-API-KEY': 'your_default_api_key'}
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    metrics.reset()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def sample(text, name, **labels):
+    """Value of one sample in exposition text, or None."""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = re.escape(name + (f"{{{label_text}}}" if labels else "")) + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+def submit(client, guid, transcription="Hello world."):
+    return client.post('/translate', headers=HEADERS, json={
+        "sermon_guid": guid, "sermon_title": "Title", "transcription": transcription,
+        "current_language": "en", "convert_to_language": "es", "region": "US",
+    })
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram('test_histogram_seconds', "Test.", buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    text = metrics.render(directory='')
+
+    assert sample(text, 'test_histogram_seconds_bucket', le='1') == 2
+    assert sample(text, 'test_histogram_seconds_bucket', le='5') == 3
+    assert sample(text, 'test_histogram_seconds_bucket', le='+Inf') == 4
+    assert sample(text, 'test_histogram_seconds_sum') == 14.5
+    assert sample(text, 'test_histogram_seconds_count') == 4
+
+def test_label_count_is_checked():
+    with pytest.raises(ValueError):
+        metrics.CHARACTERS_SENT.labels('en')
+
+def test_snapshots_of_other_processes_are_added(tmp_path):
+    metrics.CHARACTERS_SENT.labels('en', 'es').inc(100)
+    metrics.write_snapshot(str(tmp_path))
+    os.rename(tmp_path / f"{os.getpid()}.json", tmp_path / "12345.json")  # As if written by another process
+    metrics.reset()
+    metrics.CHARACTERS_SENT.labels('en', 'es').inc(20)
+
+    text = metrics.render(directory=str(tmp_path))
+
+    assert sample(text, 'translator_characters_sent_total', source_language='en', target_language='es') == 120
+
+def test_metrics_endpoint_does_not_need_api_key(client):
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert sample(response.get_data(as_text=True), 'translator_queue_jobs', status='pending') == 0
+
+def test_metrics_endpoint_checks_its_own_token(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 'scrape-secret')
+
+    assert client.get('/metrics', headers=HEADERS).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+def test_api_key_is_still_required_elsewhere(client):
+    assert client.get('/status/anything', headers={'Authorization': 'Bearer anything'}).status_code == 401
+
+def test_requests_jobs_and_database_are_instrumented(client):
+    submit(client, 'metrics-guid')
+    [job] = claim_jobs('worker-a', limit=1)
+    process_job(job, 'worker-a', backend=FakeTranslationBackend())
+
+    text = client.get('/metrics').get_data(as_text=True)
+
+    assert sample(text, 'translator_http_request_duration_seconds_count', method='POST', route='/translate', status='201') == 1
+    assert sample(text, 'translator_queue_wait_seconds_count') == 1
+    assert sample(text, 'translator_job_duration_seconds_count', outcome='completed') == 1
+    assert sample(text, 'translator_api_request_duration_seconds_count', outcome='ok') >= 1
+    assert sample(text, 'translator_characters_sent_total', source_language='en', target_language='es') == len("Hello world.") + len("Title")
+    assert sample(text, 'translator_db_lock_hold_seconds_count') >= 3
+    assert sample(text, 'translator_db_lock_wait_seconds_count') == sample(text, 'translator_db_lock_hold_seconds_count')
+    assert sample(text, 'translator_queue_jobs', status='completed') == 1
+
+def test_purge_duration_is_recorded():
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, "
+        "status, finished_at) VALUES ('old', 'Title', '', 'en', 'es', 'US', 'completed', datetime('now', '-30 days'))"
+    )
+
+    purge_old_jobs(pause=0)
+
+    text = metrics.render(directory='')
+    assert sample(text, 'translator_purge_duration_seconds_count') == 1
+    assert sample(text, 'translator_purged_jobs_total', status='completed') == 1
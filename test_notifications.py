@@ -0,0 +1,91 @@
+import os
+import socket
+import time
+import threading
+import notifications
+from notifications import (
+    WorkSignal, WakeupListener, StatusRegistry, StatusListener, notify_work_available, notify_status_changed,
+    notify_deliveries_queued,
+)
+
+def test_wait_returns_on_notify():
+    signal = WorkSignal()
+    generation = signal.generation
+    threading.Timer(0.05, signal.notify).start()
+
+    started = time.monotonic()
+    assert signal.wait(generation, timeout=5)
+    assert time.monotonic() - started < 1
+
+def test_notify_before_wait_is_not_lost():
+    signal = WorkSignal()
+    generation = signal.generation
+    signal.notify()
+
+    assert signal.wait(generation, timeout=0)
+
+def test_wait_times_out_without_notify():
+    signal = WorkSignal()
+
+    assert not signal.wait(signal.generation, timeout=0.05)
+
+def test_cross_process_wakeup(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, 'WAKEUP_DIR', str(tmp_path))
+    signal = WorkSignal()
+    listener = WakeupListener(signal=signal, directory=str(tmp_path)).start()
+    try:
+        generation = signal.generation
+        notify_work_available()
+        assert signal.wait(generation, timeout=5)
+    finally:
+        listener.stop()
+    assert not os.path.exists(listener.path)
+
+def test_cross_process_delivery_wakeup_wakes_only_dispatcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, 'WAKEUP_DIR', str(tmp_path))
+    work, deliveries = WorkSignal(), WorkSignal()
+    listener = WakeupListener(signal=work, directory=str(tmp_path), deliveries=deliveries).start()
+    try:
+        generation = deliveries.generation
+        notify_deliveries_queued()
+        assert deliveries.wait(generation, timeout=5)
+        assert work.generation == 0
+    finally:
+        listener.stop()
+
+def test_stale_socket_is_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, 'WAKEUP_DIR', str(tmp_path))
+    listener = WakeupListener(directory=str(tmp_path)).start()
+    # Simulate a crashed process that left its socket file behind. shutdown() first, so the
+    # listener thread's recv() lets go of the socket and close() really unbinds it.
+    listener._sock.shutdown(socket.SHUT_RDWR)
+    listener._thread.join(1)
+    listener._sock.close()
+
+    notify_work_available()
+
+    assert not os.path.exists(listener.path)
+
+def test_status_registry_wakes_only_matching_guid():
+    registry = StatusRegistry()
+    watched = registry.subscribe("guid-a")
+    other = registry.subscribe("guid-b")
+
+    registry.publish("guid-a")
+
+    assert watched.is_set()
+    assert not other.is_set()
+    registry.unsubscribe("guid-a", watched)
+    registry.unsubscribe("guid-b", other)
+    assert registry.waiting() == 0
+
+def test_cross_process_status_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, 'WAKEUP_DIR', str(tmp_path))
+    registry = StatusRegistry()
+    listener = StatusListener(registry=registry, directory=str(tmp_path)).start()
+    try:
+        event = registry.subscribe("guid-a")
+        notify_status_changed(["guid-a"])
+        assert event.wait(5)
+    finally:
+        listener.stop()
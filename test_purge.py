@@ -0,0 +1,125 @@
+import os
+import time
+import threading
+import pytest
+from database import (
+    init_db, execute_with_params, execute_read, write_transaction, close_pools, utc_timestamp, put_texts,
+    incremental_vacuum, free_pages,
+)
+from purge import purge_old_jobs, run_scheduler
+
+TEST_DB = 'test_translations_purge.db'
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+def insert_finished(guid, status, hours_ago, text_bytes=0):
+    with write_transaction() as cursor:
+        cursor.execute(
+            "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, status, finished_at) "
+            "VALUES (?, 'Title', '', 'en', 'es', 'US', ?, ?)",
+            (guid, status, utc_timestamp(-hours_ago * 3600))
+        )
+        if text_bytes:
+            put_texts(cursor, 'transcription', [(cursor.lastrowid, os.urandom(text_bytes))])
+
+def guids():
+    return {row['sermon_guid'] for row in execute_with_params("SELECT sermon_guid FROM translations")}
+
+def test_purge_respects_retention_per_status():
+    insert_finished('old-completed', 'completed', 30)
+    insert_finished('new-completed', 'completed', 1)
+    insert_finished('old-failed', 'failed', 30)
+    insert_finished('older-failed', 'failed', 200)
+    insert_finished('pending', 'pending', 500)
+
+    report = purge_old_jobs(completed_retention_hours=24, failed_retention_hours=168)
+
+    assert guids() == {'new-completed', 'old-failed', 'pending'}
+    assert report['completed'] == 1
+    assert report['failed'] == 1
+
+def test_purge_deletes_in_batches():
+    for i in range(25):
+        insert_finished(f'guid-{i}', 'completed', 48)
+
+    report = purge_old_jobs(completed_retention_hours=24, batch_size=10, pause=0)
+
+    assert report['completed'] == 25
+    assert guids() == set()
+
+def test_purge_reclaims_space():
+    assert execute_read("PRAGMA auto_vacuum")[0]['auto_vacuum'] == 2
+    for i in range(20):
+        insert_finished(f'guid-{i}', 'completed', 48, text_bytes=20000)
+    size_before = os.path.getsize(TEST_DB) + os.path.getsize(TEST_DB + '-wal')
+
+    report = purge_old_jobs(completed_retention_hours=24, pause=0)
+
+    assert report['bytes_reclaimed'] > 20 * 20000 * 0.9
+    assert execute_read("PRAGMA freelist_count")[0]['freelist_count'] == 0
+    assert execute_with_params("SELECT COUNT(*) AS count FROM translation_texts")[0]['count'] == 0
+    close_pools()  # Checkpoint the WAL so the file size reflects the vacuum
+    assert os.path.getsize(TEST_DB) < size_before
+
+def test_incremental_vacuum_frees_many_pages_per_call():
+    for i in range(20):
+        insert_finished(f'guid-{i}', 'completed', 48, text_bytes=20000)
+    execute_with_params("DELETE FROM translations")
+    assert free_pages() > 10
+
+    incremental_vacuum(1000)
+
+    assert free_pages() == 0
+
+def test_scheduler_purges_until_stopped():
+    insert_finished('old-completed', 'completed', 48)
+    stop = threading.Event()
+    scheduler = threading.Thread(target=run_scheduler, args=(stop, 60))
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + 5
+        while guids() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        scheduler.join(5)
+
+    assert not scheduler.is_alive()
+    assert guids() == set()
+
+def test_multi_target_job_is_purged_with_its_last_language():
+    insert_finished('guid-multi', 'fanout', 0, text_bytes=100)
+    parent_id = execute_with_params("SELECT id FROM translations WHERE sermon_guid = 'guid-multi'")[0]['id']
+    insert_finished('guid-multi/es', 'completed', 30)
+    insert_finished('guid-multi/fr', 'failed', 30)
+    execute_with_params("UPDATE translations SET parent_id = ? WHERE sermon_guid LIKE 'guid-multi/%'", (parent_id,))
+
+    purge_old_jobs(completed_retention_hours=24, failed_retention_hours=168)
+    assert guids() == {'guid-multi', 'guid-multi/fr'}
+
+    purge_old_jobs(completed_retention_hours=24, failed_retention_hours=1)
+    assert guids() == set()
+    assert execute_read("SELECT COUNT(*) AS count FROM translation_texts")[0]['count'] == 0
+
+def test_purge_deletes_queued_webhooks_of_purged_jobs():
+    insert_finished('old-completed', 'completed', 48)
+    insert_finished('new-completed', 'completed', 1)
+    execute_with_params(
+        "INSERT INTO webhook_deliveries (job_id, url, next_attempt_at) "
+        "SELECT id, 'http://example.com/hook', ? FROM translations", (utc_timestamp(3600),)
+    )
+
+    purge_old_jobs(completed_retention_hours=24)
+
+    [delivery] = execute_read("SELECT job_id FROM webhook_deliveries")
+    assert delivery['job_id'] == execute_read("SELECT id FROM translations")[0]['id']
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import pytest
+from google.api_core import exceptions as google_exceptions
+from translation_backend import FakeTranslationBackend
+from rate_limiter import TokenBucket, AdaptiveConcurrency, QuotaLimiter
+import translation_worker
+from translation_worker import translate_texts
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+def make_limiter(clock, **kwargs):
+    return QuotaLimiter(
+        chars_per_minute=6000, requests_per_minute=600, burst_seconds=1,
+        concurrency=AdaptiveConcurrency(4, 1, 8), clock=clock, sleep=clock.sleep, **kwargs
+    )
+
+def test_token_bucket_sleeps_off_deficit():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100, capacity=100, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(100) == 0
+    assert bucket.acquire(50) == pytest.approx(0.5)
+    clock.now += 1.0
+    assert bucket.acquire(50) == 0
+
+def test_token_bucket_pause_blocks_acquire():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100, capacity=100, clock=clock, sleep=clock.sleep)
+
+    bucket.pause(3)
+
+    assert bucket.acquire(1) == pytest.approx(3)
+
+def test_adaptive_concurrency_increases_additively_and_decreases_multiplicatively():
+    concurrency = AdaptiveConcurrency(4, minimum=1, maximum=8, target_latency=1.0)
+    for _ in range(8):
+        concurrency.acquire()
+        concurrency.release(latency=0.1)
+    assert concurrency.limit == 5
+
+    concurrency.acquire()
+    concurrency.release(latency=0.1, overloaded=True)
+    assert concurrency.limit == 2
+
+    concurrency.acquire()
+    concurrency.release(latency=5.0)  # Slower than the target counts as overload
+    for _ in range(3):
+        concurrency.acquire()
+        concurrency.release(overloaded=True)
+    assert concurrency.limit == 1
+
+def test_adaptive_concurrency_bounds_in_flight():
+    concurrency = AdaptiveConcurrency(2)
+    concurrency.acquire()
+    concurrency.acquire()
+    third = threading.Thread(target=concurrency.acquire)
+    third.start()
+    third.join(0.1)
+    assert third.is_alive()
+
+    concurrency.release()
+    third.join(1)
+    assert not third.is_alive()
+
+def test_quota_error_is_retried_with_backoff_and_pauses_buckets():
+    clock = FakeClock()
+    limiter = make_limiter(clock, backoff_base=2, backoff_max=10)
+    outcomes = [google_exceptions.ResourceExhausted("quota"), google_exceptions.TooManyRequests("429"), "ok"]
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert limiter.call(call, characters=10) == "ok"
+    assert limiter.stats["quota_errors"] == 2
+    assert limiter.stats["retries"] == 2
+    assert limiter.concurrency.limit < 4
+    assert all(delay <= 10 for delay in clock.slept)
+
+def test_non_retryable_error_is_raised_immediately():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    def call():
+        raise google_exceptions.InvalidArgument("bad language")
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        limiter.call(call, characters=10)
+    assert limiter.stats["retries"] == 0
+
+def test_retries_are_bounded():
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_retries=2)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise google_exceptions.ResourceExhausted("quota")
+
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        limiter.call(call, characters=10)
+    assert len(attempts) == 3
+
+def test_translate_texts_paces_requests_through_limiter(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'MAX_CHARS', 100)  # One text per request
+    clock = FakeClock()
+    limiter = make_limiter(clock)  # 100 characters per second
+    backend = FakeTranslationBackend()
+
+    translate_texts(["x" * 100, "y" * 100], 'en', 'es', 'US', max_concurrency=1, backend=backend, limiter=limiter)
+
+    assert backend.characters == 200
+    assert sum(clock.slept) == pytest.approx(1.0)
+
+def test_adaptive_concurrency_async_waiter_is_woken_by_release_from_thread():
+    concurrency = AdaptiveConcurrency(1)
+    concurrency.acquire()
+
+    async def wait_for_slot():
+        threading.Timer(0.05, concurrency.release).start()
+        await asyncio.wait_for(concurrency.acquire_async(), 2)
+
+    asyncio.run(wait_for_slot())
+    assert concurrency.in_flight == 1
+
+def test_call_async_retries_quota_errors():
+    limiter = QuotaLimiter(chars_per_minute=60000, requests_per_minute=6000, backoff_base=0.01, backoff_max=0.01)
+    outcomes = [google_exceptions.ResourceExhausted("quota"), "ok"]
+
+    async def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert asyncio.run(limiter.call_async(call, characters=10)) == "ok"
+    assert limiter.stats["quota_errors"] == 1
+    assert limiter.stats["retries"] == 1
+    assert limiter.concurrency.in_flight == 0
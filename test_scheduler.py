@@ -0,0 +1,81 @@
+import os
+import pytest
+import scheduler
+from database import init_db, execute_with_params, close_pools
+from translation_worker import claim_jobs
+
+TEST_DB = 'test_translations_scheduler.db'
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+def insert_job(guid, priority=0, size_chars=100, client_id=None, region='US', age_minutes=0, status='pending'):
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, "
+        "priority, size_chars, client_id, status, created_at) "
+        "VALUES (?, 'Title', '', 'en', 'es', ?, ?, ?, ?, ?, datetime('now', ?))",
+        (guid, region, priority, size_chars, client_id, status, f'-{age_minutes} minutes')
+    )
+
+def claim_order(count):
+    guids = []
+    for _ in range(count):
+        [job] = claim_jobs('worker-a', limit=1)
+        guids.append(execute_with_params("SELECT sermon_guid FROM translations WHERE id = ?", (job['id'],))[0]['sermon_guid'])
+    return guids
+
+def test_higher_priority_is_claimed_first():
+    insert_job('normal')
+    insert_job('urgent', priority=5)
+    insert_job('bulk', priority=-5)
+
+    assert claim_order(3) == ['urgent', 'normal', 'bulk']
+
+def test_short_job_goes_before_long_one_of_same_priority():
+    insert_job('hour-long', size_chars=500000)
+    insert_job('title-only', size_chars=40)
+
+    assert claim_order(2) == ['title-only', 'hour-long']
+
+def test_waiting_jobs_eventually_beat_higher_priorities():
+    insert_job('old-bulk', priority=-2, age_minutes=60)  # Six priority levels of aging
+    insert_job('new-urgent', priority=3)
+
+    assert claim_order(2) == ['old-bulk', 'new-urgent']
+
+def test_busy_client_yields_to_others():
+    insert_job('a-running-1', client_id='bulk-uploader', status='processing')
+    insert_job('a-running-2', client_id='bulk-uploader', status='processing')
+    execute_with_params("UPDATE translations SET lease_expires_at = datetime('now', '+1 hour') WHERE status = 'processing'")
+    insert_job('a-pending', client_id='bulk-uploader', age_minutes=5)
+    insert_job('b-pending', client_id='other-client')
+
+    assert claim_order(2) == ['b-pending', 'a-pending']
+
+def test_batch_claim_spreads_across_regions():
+    for i in range(3):
+        insert_job(f'us-{i}', region='US', age_minutes=3 - i)
+    insert_job('mx-0', region='MX')
+
+    jobs = claim_jobs('worker-a', limit=2)
+
+    guids = {execute_with_params("SELECT sermon_guid FROM translations WHERE id = ?", (job['id'],))[0]['sermon_guid'] for job in jobs}
+    assert guids == {'us-0', 'mx-0'}
+
+def test_candidate_queries_use_indexes():
+    plans = [
+        " ".join(row['detail'] for row in execute_with_params(f"EXPLAIN QUERY PLAN {query}", ('2100-01-01 00:00:00', 10)))
+        for query in scheduler._CANDIDATE_QUERIES
+    ]
+
+    assert all('idx_translations_pending_' in plan for plan in plans)
+    assert not any('TEMP B-TREE' in plan for plan in plans)
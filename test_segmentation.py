@@ -0,0 +1,69 @@
+import random
+import pytest
+from segmentation import split_segments, reassemble, pack_indices, pack_requests
+
+ALPHABET = (
+    ["word", "Ünïcödé", "日本語", "🙂", "a", "x" * 40]
+    + [" ", "  ", "\t", "\n", "\n\n", "\r\n", " "]
+    + [".", "!", "?", "...", "?!", "\"", "”", "’", ")", "]", ",", ";"]
+)
+
+def random_text(rng, pieces):
+    return "".join(rng.choice(ALPHABET) for _ in range(pieces))
+
+def test_split_segments_respects_limit_and_round_trips():
+    text = "One sentence here. " * 500 + "x" * 2500 + "\n\n  Last line"
+
+    segments = split_segments(text, max_chars=1000)
+
+    assert all(len(core) <= 1000 for _, core, _ in segments)
+    assert "".join(leading + core + trailing for leading, core, trailing in segments) == text
+
+@pytest.mark.parametrize("seed", range(200))
+def test_split_segments_round_trip_property(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randint(0, 400))
+    max_chars = rng.choice([1, 5, 17, 80, 30000])
+
+    segments = split_segments(text, max_chars=max_chars)
+
+    assert "".join(leading + core + trailing for leading, core, trailing in segments) == text
+    for leading, core, trailing in segments:
+        assert len(core) <= max_chars
+        assert core == core.strip()
+        assert not leading.strip() and not trailing.strip()
+    # Reassembling identity translations gives back the original
+    assert reassemble(segments, [core for _, core, _ in segments if core]) == text
+
+def test_split_keeps_punctuation_at_boundaries():
+    text = "First. Second!\nThird?” Fourth"
+
+    cores = [core for _, core, _ in split_segments(text)]
+
+    assert cores == ["First.", "Second!", "Third?”", "Fourth"]
+
+@pytest.mark.parametrize("seed", range(50))
+def test_pack_indices_respects_limits_and_covers_every_item(seed):
+    rng = random.Random(seed)
+    lengths = [rng.choice([1, 10, 100, 1000, 5000]) for _ in range(rng.randint(0, 300))]
+    max_chars, max_contents = 6000, rng.choice([1, 4, 128])
+
+    packed = pack_indices(lengths, max_chars, max_contents)
+
+    assert sorted(i for indices in packed for i in indices) == list(range(len(lengths)))
+    for indices in packed:
+        assert len(indices) <= max_contents
+        assert sum(lengths[i] for i in indices) <= max_chars
+    # No worse than filling requests in input order
+    in_order, chars, contents = 0, max_chars, max_contents
+    for length in lengths:
+        if chars + length > max_chars or contents >= max_contents:
+            in_order, chars, contents = in_order + 1, 0, 0
+        chars, contents = chars + length, contents + 1
+    assert len(packed) <= in_order
+
+def test_pack_fills_requests_better_than_in_order():
+    texts = ["a" * 600, "b" * 600, "c" * 500, "d" * 500]
+
+    # In order this takes three requests: [600], [600, 500], [500]
+    assert pack_requests(texts, max_chars=1100) == [["a" * 600, "c" * 500], ["b" * 600, "d" * 500]]
@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from google.api_core import exceptions as google_exceptions
+from translation_backend import (
+    GoogleTranslationBackend, AsyncGoogleTranslationBackend, FakeTranslationBackend, create_backend, get_backend,
+    set_backend
+)
+
+class FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeClient:
+    """Stands in for TranslationServiceClient."""
+
+    def __init__(self, fail_with=None):
+        self.fail_with = fail_with
+        self.requests = []
+        self.transport = FakeTransport()
+
+    def translate_text(self, request):
+        self.requests.append(request)
+        if self.fail_with is not None:
+            raise self.fail_with
+        translations = [type("Translation", (), {"translated_text": text[::-1]}) for text in request["contents"]]
+        return type("Response", (), {"translations": translations})
+
+def test_client_and_parent_are_created_once():
+    created = []
+
+    def factory():
+        created.append(FakeClient())
+        return created[-1]
+
+    backend = GoogleTranslationBackend(project_id="proj", client_factory=factory)
+    assert backend.translate(["abc"], "en", "es") == ["cba"]
+    assert backend.translate(["one", "two"], "en", "es") == ["eno", "owt"]
+
+    assert len(created) == 1
+    assert created[0].requests[0]["parent"] == "projects/proj/locations/global"
+
+def test_reconnects_after_channel_failure():
+    clients = [FakeClient(fail_with=google_exceptions.ServiceUnavailable("channel down")), FakeClient()]
+    backend = GoogleTranslationBackend(project_id="proj", client_factory=lambda: clients.pop(0))
+    broken = clients[0]
+
+    assert backend.translate(["abc"], "en", "es") == ["cba"]
+    assert broken.transport.closed
+    assert clients == []
+
+def test_other_errors_are_not_retried():
+    clients = [FakeClient(fail_with=google_exceptions.InvalidArgument("bad language"))]
+    backend = GoogleTranslationBackend(project_id="proj", client_factory=lambda: clients.pop(0))
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        backend.translate(["abc"], "en", "xx")
+
+def test_fake_backend_counts_calls():
+    backend = FakeTranslationBackend()
+
+    assert backend.translate(["hello", "world"], "en", "es") == ["[es] hello", "[es] world"]
+    assert backend.calls == 1
+    assert backend.characters == 10
+
+class FakeAsyncClient(FakeClient):
+    """Stands in for TranslationServiceAsyncClient."""
+
+    async def translate_text(self, request):
+        return super().translate_text(request)
+
+def test_async_backend_reconnects_after_channel_failure():
+    clients = [FakeAsyncClient(fail_with=google_exceptions.ServiceUnavailable("channel down")), FakeAsyncClient()]
+    factory_calls = []
+
+    def factory():
+        factory_calls.append(1)
+        return clients[len(factory_calls) - 1]
+
+    backend = AsyncGoogleTranslationBackend(project_id="proj", client_factory=factory)
+
+    assert asyncio.run(backend.translate_async(["abc"], "en", "es")) == ["cba"]
+    assert len(factory_calls) == 2
+    with pytest.raises(TypeError):
+        backend.translate(["abc"], "en", "es")
+
+def test_fake_backend_translates_async():
+    backend = FakeTranslationBackend(latency=0.01)
+
+    assert asyncio.run(backend.translate_async(["hello"], "en", "es")) == ["[es] hello"]
+    assert backend.calls == 1 and backend.in_flight == 0
+
+def test_fake_backend_injects_errors():
+    backend = FakeTranslationBackend(error_rate=0.5, seed=1)
+    failures = 0
+    for _ in range(200):
+        try:
+            backend.translate(["hello"], "en", "es")
+        except google_exceptions.ServiceUnavailable:
+            failures += 1
+
+    assert failures == backend.errors
+    assert 60 < failures < 140
+
+def test_fake_backend_latency_scales_with_characters(monkeypatch):
+    slept = []
+    monkeypatch.setattr('translation_backend.time.sleep', slept.append)
+    backend = FakeTranslationBackend(latency=0.1, latency_per_char=0.001)
+
+    backend.translate(["x" * 100, "y" * 100], "en", "es")
+
+    assert slept == [pytest.approx(0.3)]
+
+def test_backend_injection():
+    fake = FakeTranslationBackend()
+    previous = set_backend(fake)
+    try:
+        assert get_backend() is fake
+    finally:
+        set_backend(previous)
+
+def test_create_backend_rejects_unknown_name():
+    assert isinstance(create_backend('fake'), FakeTranslationBackend)
+    with pytest.raises(ValueError):
+        create_backend('nope')
@@ -0,0 +1,65 @@
+import os
+import pytest
+import translation_memory
+import metrics
+from database import init_db, execute_with_params, close_pools
+
+TEST_DB = 'test_translations_memory.db'
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+def test_lookup_after_store():
+    translation_memory.store(["Amen."], ["Amén."], "en", "es")
+
+    assert translation_memory.lookup(["Amen.", "Hallelujah."], "en", "es") == ["Amén.", None]
+    # Language pair is part of the key
+    assert translation_memory.lookup(["Amen."], "en", "fr") == [None]
+
+def test_whitespace_is_normalized():
+    translation_memory.store(["Grace  and\npeace."], ["Gracia y paz."], "en", "es")
+
+    assert translation_memory.lookup(["Grace and peace."], "en", "es") == ["Gracia y paz."]
+
+def test_blank_translation_of_text_is_not_stored():
+    translation_memory.store(["Amen.", "Hallelujah.", " "], ["Amén.", "", ""], "en", "es")
+
+    assert translation_memory.lookup(["Amen.", "Hallelujah.", " "], "en", "es") == ["Amén.", None, ""]
+
+def lookups(result):
+    return metrics.MEMORY_LOOKUPS.samples().get((result,), 0)
+
+def test_counters_are_exported_as_metrics():
+    hits, misses, stored = lookups('hit'), lookups('miss'), metrics.MEMORY_STORED.samples().get((), 0)
+    translation_memory.store(["Amen."], ["Amén."], "en", "es")
+    translation_memory.lookup(["Amen.", "Amen.", "Selah."], "en", "es")
+
+    assert (lookups('hit') - hits, lookups('miss') - misses) == (2, 1)
+    assert metrics.MEMORY_STORED.samples()[()] - stored == 1
+    text = metrics.render()
+    assert 'translator_translation_memory_lookups_total{result="hit"}' in text
+    assert 'translator_translation_memory_entries 1' in text
+
+def test_evict_least_recently_used():
+    translation_memory.store(["one", "two", "three"], ["uno", "dos", "tres"], "en", "es")
+    execute_with_params("UPDATE translation_memory SET last_used_at = '2026-01-01 00:00:00'")
+    translation_memory.lookup(["two"], "en", "es")
+
+    assert translation_memory.evict(max_entries=1) == 2
+    assert translation_memory.lookup(["one", "two", "three"], "en", "es") == [None, "dos", None]
+
+def test_evict_by_age():
+    translation_memory.store(["old"], ["viejo"], "en", "es")
+    execute_with_params("UPDATE translation_memory SET last_used_at = '2000-01-01 00:00:00'")
+
+    assert translation_memory.evict(max_age_days=30) == 1
+    assert translation_memory.memory_entries()[0][3] == {(): 0}
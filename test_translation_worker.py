@@ -0,0 +1,409 @@
+import os
+import threading
+import time
+import pytest
+import translation_worker
+from google.api_core import exceptions as google_exceptions
+from translation_backend import FakeTranslationBackend
+from notifications import notify_work_available
+from database import init_db, execute_with_params, close_pools, get_texts
+from translation_worker import (
+    claim_jobs, renew_leases, finish_job, process_translation_jobs, stop_workers, run_worker_pool,
+    process_job, ChunkCheckpoint, source_characters,
+    translate_text, translate_job
+)
+
+TEST_DB = 'test_translations_worker.db'
+
+@pytest.fixture(autouse=True)
+def setup_teardown():
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+def insert_job(guid, status='pending'):
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (guid, 'Title', 'Transcript', 'en', 'es', 'US', status)
+    )
+
+def job_row(guid):
+    return execute_with_params("SELECT * FROM translations WHERE sermon_guid = ?", (guid,))[0]
+
+def job_text(guid):
+    row = job_row(guid)
+    return get_texts([row['id']], 'translated_text').get(row['id'])
+
+def test_claim_marks_jobs_processing():
+    insert_job('guid-1')
+
+    jobs = claim_jobs('worker-a')
+
+    assert [job['id'] for job in jobs] == [job_row('guid-1')['id']]
+    row = job_row('guid-1')
+    assert row['status'] == 'processing'
+    assert row['worker_id'] == 'worker-a'
+    assert row['lease_expires_at'] is not None
+
+def test_concurrent_claims_never_overlap():
+    for i in range(20):
+        insert_job(f'guid-{i}')
+    claimed = {}
+    lock = threading.Lock()
+
+    def worker(name):
+        while True:
+            jobs = claim_jobs(name, limit=3)
+            if not jobs:
+                return
+            with lock:
+                for job in jobs:
+                    claimed.setdefault(job['id'], []).append(name)
+
+    threads = [threading.Thread(target=worker, args=(f'worker-{n}',)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(claimed) == 20
+    assert all(len(owners) == 1 for owners in claimed.values())
+
+def test_expired_lease_is_recovered():
+    insert_job('guid-1')
+    claim_jobs('crashed-worker')
+    execute_with_params(
+        "UPDATE translations SET lease_expires_at = '2000-01-01 00:00:00' WHERE sermon_guid = ?",
+        ('guid-1',)
+    )
+
+    jobs = claim_jobs('worker-b')
+
+    assert len(jobs) == 1
+    assert job_row('guid-1')['worker_id'] == 'worker-b'
+    # The crashed worker's late result is fenced off
+    assert not finish_job(jobs[0]['id'], 'crashed-worker', 'completed', 'late', 'late')
+    assert job_row('guid-1')['status'] == 'processing'
+
+def test_active_lease_is_not_stolen():
+    insert_job('guid-1')
+    claim_jobs('worker-a')
+
+    assert claim_jobs('worker-b') == []
+    assert renew_leases('worker-a') == 1
+    assert renew_leases('worker-b') == 0
+
+def test_attached_duplicates_finish_with_original():
+    insert_job('guid-1')
+    original_id = job_row('guid-1')['id']
+    insert_job('guid-2')
+    execute_with_params("UPDATE translations SET duplicate_of = ? WHERE sermon_guid = 'guid-2'", (original_id,))
+
+    jobs = claim_jobs('worker-a', limit=5)
+    assert [job['id'] for job in jobs] == [original_id]
+
+    finish_job(original_id, 'worker-a', 'completed', 'Texto', 'Titulo')
+    row = job_row('guid-2')
+    assert row['status'] == 'completed'
+    assert job_text('guid-2') == 'Texto'
+    assert row['finished_at'] is not None
+
+def test_worker_loop_completes_jobs(monkeypatch):
+    insert_job('guid-1')
+    stop = threading.Event()
+
+    def stop_when_idle(worker_id, limit=1):
+        jobs = original_claim(worker_id, limit)
+        if not jobs:
+            stop_workers(stop)
+        return jobs
+
+    original_claim = translation_worker.claim_jobs
+    monkeypatch.setattr(translation_worker, 'claim_jobs', stop_when_idle)
+
+    process_translation_jobs('worker-a', stop, backend=FakeTranslationBackend())
+
+    row = job_row('guid-1')
+    assert row['status'] == 'completed'
+    assert job_text('guid-1') == '[es] Transcript'
+    assert row['translated_sermon_title'] == '[es] Title'
+    assert row['worker_id'] is None
+
+def test_worker_pool_drains_claimed_jobs_on_stop():
+    insert_job('guid-1')
+    backend = FakeTranslationBackend(latency=0.3)
+    stop = threading.Event()
+    pool = threading.Thread(target=run_worker_pool, args=(1, stop, backend))
+    pool.start()
+    deadline = time.monotonic() + 5
+    while backend.calls == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stop_workers(stop)  # Arrives while the job is being translated
+    pool.join(5)
+
+    assert not pool.is_alive()
+    assert job_row('guid-1')['status'] == 'completed'
+
+LATENCY = 0.2
+
+@pytest.fixture
+def fake_backend():
+    return FakeTranslationBackend(latency=LATENCY, transform=lambda text, source, target: text.upper())
+
+def test_long_text_chunks_translate_concurrently(fake_backend, monkeypatch):
+    monkeypatch.setattr(translation_worker, 'MAX_CHARS', 100)
+    text = "".join(f"Sentence number {i}.\n" for i in range(60))  # Many requests at 100 chars
+
+    started = time.monotonic()
+    result = translate_job(text, "title", "en", "es", "US", backend=fake_backend)
+    elapsed = time.monotonic() - started
+
+    assert result == (text.upper(), "TITLE")
+    assert fake_backend.max_in_flight > 1
+    # Close to one round trip, not one per request
+    assert elapsed < LATENCY * 3
+
+def test_segments_are_packed_into_few_requests(fake_backend):
+    text = " ".join(f"S{i}." for i in range(1500))  # About 9,000 characters
+
+    assert translate_text(text, "en", "es", "US", backend=fake_backend) == text.upper()
+    assert fake_backend.calls == 2  # 1024 strings per request
+
+def test_repeated_segments_come_from_memory():
+    backend = FakeTranslationBackend()
+    liturgy = "The Lord be with you. And also with you. "
+
+    translate_job(liturgy + "First sermon.", "Sermonette 3/22", "en", "es", "US", backend=backend)
+    first_characters = backend.characters
+    second = translate_job(liturgy + "Second sermon.", "Sermonette 3/22", "en", "es", "US", backend=backend)
+
+    assert second == ("[es] The Lord be with you. [es] And also with you. [es] Second sermon.", "[es] Sermonette 3/22")
+    assert backend.characters - first_characters == len("Second sermon.")
+
+def test_chunk_concurrency_is_bounded(fake_backend, monkeypatch):
+    monkeypatch.setattr(translation_worker, 'MAX_CHARS', 60)  # One 50-char text per request
+
+    translation_worker.translate_texts(["x" * 50] * 10, "en", "es", "US", max_concurrency=3, backend=fake_backend)
+
+    assert fake_backend.max_in_flight == 3
+
+def test_short_text_single_request(fake_backend):
+    assert translate_text("hello", "en", "es", "US", backend=fake_backend) == "HELLO"
+    assert fake_backend.calls == 1
+
+def test_submission_wakes_idle_worker(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'TRANSLATION_POLL_INTERVAL', 60)
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=process_translation_jobs, args=('worker-a', stop), kwargs={'backend': FakeTranslationBackend()}
+    )
+    worker.start()
+    try:
+        time.sleep(0.2)  # Let the worker find nothing and go idle
+        insert_job('guid-1')
+        submitted = time.monotonic()
+        notify_work_available()
+        while job_row('guid-1')['status'] != 'completed':
+            assert time.monotonic() - submitted < 5, "worker was not woken"
+            time.sleep(0.01)
+    finally:
+        stop_workers(stop)
+        worker.join()
+
+class FlakyBackend(FakeTranslationBackend):
+    """Raises ``error`` for requests containing ``poison``, once ``gate`` (if given) is set."""
+
+    def __init__(self, poison, error, gate=None):
+        super().__init__()
+        self.poison = poison
+        self.error = error
+        self.gate = gate
+
+    def translate(self, contents, source_language, target_language):
+        contents = list(contents)
+        if self.error is not None and any(self.poison in text for text in contents):
+            if self.gate is not None:
+                assert self.gate.wait(5)
+            raise self.error
+        return super().translate(contents, source_language, target_language)
+
+def gate_after_saves(monkeypatch, count):
+    """An event set once ``count`` chunks have been checkpointed."""
+    gate = threading.Event()
+    saves = []
+    original_save = ChunkCheckpoint.save
+
+    def save(self, *args):
+        original_save(self, *args)
+        saves.append(1)
+        if len(saves) >= count:
+            gate.set()
+
+    monkeypatch.setattr(ChunkCheckpoint, 'save', save)
+    return gate
+
+class FakeLimiter:
+    """Calls straight through, without pacing or retries."""
+
+    def call(self, fn, characters):
+        return fn()
+
+def claim_one():
+    [job] = claim_jobs('worker-a')
+    return job
+
+def test_failed_chunk_is_retried_and_finished_chunks_are_kept(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'MAX_CHARS', 40)  # One sentence per chunk
+    monkeypatch.setattr(translation_worker, 'RETRY_BASE_SECONDS', 0)
+    monkeypatch.setattr(translation_worker.translation_memory, 'MEMORY_ENABLED', False)
+    text = "".join(f"Sentence {i} of the sermon.\n" for i in range(7))
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES ('guid-1', 'Title', ?, 'en', 'es', 'US')",
+        (text,)
+    )
+    # The failing chunk fails last, so the outcome does not depend on thread timing
+    backend = FlakyBackend(
+        "Sentence 5", google_exceptions.ServiceUnavailable("unavailable"), gate=gate_after_saves(monkeypatch, 6)
+    )
+    monkeypatch.setattr(translation_worker, 'get_limiter', lambda: FakeLimiter())
+
+    process_job(claim_one(), 'worker-a', backend)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'pending'
+    assert row['attempts'] == 1
+    assert 'ServiceUnavailable' in row['last_error']
+    assert len(ChunkCheckpoint(row["id"]).load()) == 6  # Seven chunks (the title shares the last); all but one saved
+    assert (row['chunks_done'], row['chunks_total']) == (6, 7)
+    assert row['characters_total'] == len(text)
+    assert row['characters_done'] == len(text) - len("Sentence 5 of the sermon.\n")
+    assert translation_worker.partial_translation(row['id'], text, 'Title') == "".join(
+        f"[es] Sentence {i} of the sermon.\n" for i in range(5)
+    )
+    translated_before = backend.characters
+
+    backend.error = None
+    process_job(claim_one(), 'worker-a', backend)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'completed'
+    assert row['attempts'] == 2
+    assert job_text('guid-1') == "".join(f"[es] Sentence {i} of the sermon.\n" for i in range(7))
+    assert backend.characters - translated_before == len("Sentence 5 of the sermon.")
+    assert ChunkCheckpoint(row['id']).load() == {}
+    assert (row['chunks_done'], row['characters_done']) == (7, row['characters_total'])
+
+def test_progress_counts_the_source_text_with_repeats():
+    text = "  Amen.  " + "Amen. " * 999 + "Praise.\n\n"
+    segments = translation_worker.split_segments(text, translation_worker.MAX_CHARS)
+    assert sum(source_characters(segments).values()) == len(text)
+
+    execute_with_params(
+        "INSERT INTO translations (sermon_guid, sermon_title, transcription, current_language, convert_to_language, region) "
+        "VALUES ('guid-1', 'A much longer sermon title', ?, 'en', 'es', 'US')",
+        (text,)
+    )
+    process_job(claim_one(), 'worker-a', FakeTranslationBackend())
+
+    row = job_row('guid-1')
+    assert (row['characters_done'], row['characters_total']) == (len(text), len(text))
+
+def test_failed_chunk_does_not_cancel_chunks_not_yet_started(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'MAX_CHARS', 40)  # One sentence per chunk
+    monkeypatch.setattr(translation_worker, 'get_limiter', lambda: FakeLimiter())
+    insert_job('guid-1')
+    job_id = job_row('guid-1')['id']
+    segments = [f"Sentence {i} of the sermon." for i in range(10)]
+    backend = FlakyBackend("Sentence 0", google_exceptions.InvalidArgument("bad segment"))
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        translation_worker.translate_segments(
+            segments, 'en', 'es', 'US', backend=backend, use_memory=False, checkpoint=ChunkCheckpoint(job_id),
+            max_concurrency=2
+        )
+
+    assert len(ChunkCheckpoint(job_id).load()) == 9
+
+def test_permanent_error_fails_job_immediately(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'get_limiter', lambda: FakeLimiter())
+    insert_job('guid-1')
+    backend = FlakyBackend("Transcript", google_exceptions.InvalidArgument("unsupported language"))
+
+    process_job(claim_one(), 'worker-a', backend)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'failed'
+    assert row['attempts'] == 1
+    assert 'unsupported language' in row['last_error']
+
+class ShortBackend(FakeTranslationBackend):
+    """Answers every request with one translation too few."""
+
+    def translate(self, contents, source_language, target_language):
+        return super().translate(contents, source_language, target_language)[:-1]
+
+def test_short_response_is_retried_and_not_remembered(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'get_limiter', lambda: FakeLimiter())
+    monkeypatch.setattr(translation_worker.translation_memory, 'MEMORY_ENABLED', True)
+    insert_job('guid-1')
+
+    process_job(claim_one(), 'worker-a', ShortBackend())
+
+    row = job_row('guid-1')
+    assert row['status'] == 'pending'
+    assert 'IncompleteResponseError' in row['last_error']
+    assert translation_worker.translation_memory.lookup(["Transcript", "Title"], 'en', 'es') == [None, None]
+
+def test_job_fails_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(translation_worker, 'get_limiter', lambda: FakeLimiter())
+    monkeypatch.setattr(translation_worker, 'MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(translation_worker, 'RETRY_BASE_SECONDS', 0)
+    insert_job('guid-1')
+    backend = FlakyBackend("Transcript", google_exceptions.ResourceExhausted("quota"))
+
+    process_job(claim_one(), 'worker-a', backend)
+    assert job_row('guid-1')['status'] == 'pending'
+    process_job(claim_one(), 'worker-a', backend)
+
+    row = job_row('guid-1')
+    assert row['status'] == 'failed'
+    assert row['attempts'] == 2
+
+def test_delayed_retry_is_not_claimed_early():
+    insert_job('guid-1')
+    execute_with_params("UPDATE translations SET retry_after = datetime('now', '+1 hour')")
+
+    assert claim_jobs('worker-a') == []
+
+def test_languages_of_multi_target_job_are_claimed_and_translated_together(monkeypatch):
+    from app import app
+    with app.test_client() as client:
+        client.post('/translate', headers={'X-API-KEY': 'your_default_api_key'}, json={
+            "sermon_guid": "guid-multi", "sermon_title": "Title", "transcription": "One.\nTwo.\n",
+            "current_language": "en", "convert_to_language": ["es", "fr", "de"], "region": "US",
+        })
+    splits = []
+    original_split = translation_worker.split_segments
+    monkeypatch.setattr(translation_worker, 'split_segments', lambda *args: splits.append(1) or original_split(*args))
+    backend = FakeTranslationBackend(latency=0.1)
+
+    jobs = claim_jobs('worker-a', limit=1)
+    assert sorted(job['convert_to_language'] for job in jobs) == ['de', 'es', 'fr']
+    assert all(job['transcription'] == "One.\nTwo.\n" for job in jobs)
+    started = time.monotonic()
+    translation_worker.process_jobs(jobs, 'worker-a', backend)
+
+    assert time.monotonic() - started < 3 * backend.latency  # In parallel
+    assert len(splits) == 1
+    for language in ('es', 'fr', 'de'):
+        assert job_row(f'guid-multi/{language}')['status'] == 'completed'
+        assert job_text(f'guid-multi/{language}') == f"[{language}] One.\n[{language}] Two.\n"
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import webhooks
+from webhooks import WebhookDispatcher, claim_deliveries, verify_signature
+from app import app
+from database import init_db, close_pools, execute_with_params, execute_read
+from translation_backend import FakeTranslationBackend
+from translation_worker import claim_jobs, process_jobs
+
+TEST_DB = 'test_translations_webhooks.db'
+HEADERS = {'X-API-KEY': 'your_default_api_key'}
+
+@pytest.fixture(autouse=True)
+def setup_teardown(monkeypatch):
+    monkeypatch.setattr(webhooks, 'WEBHOOK_SECRET', 'test-webhook-secret')
+    monkeypatch.setattr(webhooks, 'WEBHOOK_ALLOW_PRIVATE_HOSTS', True)  # The receiver listens on 127.0.0.1
+    os.environ['DATABASE_PATH'] = TEST_DB
+    init_db()
+    yield
+    close_pools()
+    try:
+        os.remove(TEST_DB)
+    except FileNotFoundError:
+        pass
+    os.environ.pop('DATABASE_PATH', None)
+
+class Receiver(ThreadingHTTPServer):
+    """A local webhook endpoint that records requests and answers with queued statuses (then 200)."""
+    daemon_threads = True
+
+    def __init__(self, statuses=(), delay=0.0):
+        super().__init__(('127.0.0.1', 0), ReceiverHandler)
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/hook?source=translator"
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.connections.add(self.client_address)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+            server.requests.append((self.path, dict(self.headers), body))
+            status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def receiver():
+    servers = []
+
+    def start(statuses=(), delay=0.0):
+        servers.append(Receiver(statuses, delay))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def submit(client, guid, callback_url, convert_to_language="es", transcription="Transcript"):
+    return client.post('/translate', headers=HEADERS, json={
+        "sermon_guid": guid, "sermon_title": "Title", "transcription": transcription, "current_language": "en",
+        "convert_to_language": convert_to_language, "region": "US", "callback_url": callback_url,
+    })
+
+def translate_all():
+    process_jobs(claim_jobs('worker-a', limit=50), 'worker-a', FakeTranslationBackend())
+
+def queued():
+    return execute_read("SELECT * FROM webhook_deliveries ORDER BY id")
+
+def test_completed_job_is_delivered_signed(receiver):
+    server = receiver()
+    with app.test_client() as client:
+        submit(client, 'guid-1', server.url)
+    assert queued() == []
+
+    translate_all()
+    [delivery] = claim_deliveries(10)
+    assert WebhookDispatcher(pool=webhooks.ConnectionPool()).deliver(delivery) == 'delivered'
+
+    [(path, headers, body)] = server.requests
+    assert path == "/hook?source=translator"
+    assert verify_signature(body, headers['X-Translator-Timestamp'], headers['X-Translator-Signature'])
+    assert not verify_signature(body + b" ", headers['X-Translator-Timestamp'], headers['X-Translator-Signature'])
+    assert headers['X-Translator-Delivery'] == str(delivery['id'])
+    payload = json.loads(body)
+    assert payload["sermon_guid"] == "guid-1"
+    assert payload["status"] == "completed"
+    assert payload["translated_text"] == "[es] Transcript"
+    assert payload["error"] is None
+    assert queued() == []
+
+def test_failed_delivery_is_retried_with_backoff_then_dropped(receiver, monkeypatch):
+    monkeypatch.setattr(webhooks, 'WEBHOOK_MAX_ATTEMPTS', 2)
+    server = receiver(statuses=[503, 500])
+    with app.test_client() as client:
+        submit(client, 'guid-1', server.url)
+    translate_all()
+    dispatcher = WebhookDispatcher()
+
+    assert dispatcher.deliver(claim_deliveries(10)[0]) == 'retried'
+    [row] = queued()
+    assert (row['attempts'], row['last_error']) == (1, "HTTP 503")
+    assert claim_deliveries(10) == []  # Backing off
+
+    execute_with_params("UPDATE webhook_deliveries SET next_attempt_at = '2000-01-01 00:00:00'")
+    assert dispatcher.deliver(claim_deliveries(10)[0]) == 'dropped'
+    assert queued() == []
+    assert len(server.requests) == 2
+
+def test_client_error_is_not_retried(receiver):
+    server = receiver(statuses=[404])
+    with app.test_client() as client:
+        submit(client, 'guid-1', server.url)
+    translate_all()
+
+    assert WebhookDispatcher().deliver(claim_deliveries(10)[0]) == 'dropped'
+    assert queued() == []
+
+def test_unreachable_endpoint_is_retried(receiver):
+    server = receiver()
+    url = server.url
+    server.shutdown()
+    server.server_close()
+    with app.test_client() as client:
+        submit(client, 'guid-1', url)
+    translate_all()
+
+    assert WebhookDispatcher().deliver(claim_deliveries(10)[0]) == 'retried'
+    assert 'ConnectionRefusedError' in queued()[0]['last_error']
+
+def test_dispatcher_bounds_concurrency_and_reuses_connections(receiver):
+    server = receiver(delay=0.05)
+    with app.test_client() as client:
+        for i in range(12):
+            submit(client, f'guid-{i}', server.url, transcription=f"Transcript {i}")
+    translate_all()
+    assert len(queued()) == 12
+
+    pool = webhooks.ConnectionPool(max_idle=3)
+    stop_event = threading.Event()
+    thread = threading.Thread(target=WebhookDispatcher(concurrency=3, pool=pool).run, args=(stop_event,))
+    thread.start()
+    deadline = time.monotonic() + 10
+    while len(server.requests) < 12 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    webhooks.stop_dispatcher(stop_event)
+    thread.join()
+
+    assert sorted(json.loads(body)["sermon_guid"] for _, _, body in server.requests) == sorted(
+        f'guid-{i}' for i in range(12)
+    )
+    assert server.max_in_flight <= 3
+    assert pool.connections_opened <= 3  # Kept alive between deliveries
+    assert len(server.connections) <= 3
+
+def test_multi_target_job_calls_back_once_all_languages_finish(receiver):
+    server = receiver()
+    with app.test_client() as client:
+        submit(client, 'guid-multi', server.url, convert_to_language=["es", "fr"])
+    [first, second] = claim_jobs('worker-a')
+
+    process_jobs([first], 'worker-a', FakeTranslationBackend())
+    assert queued() == []
+    process_jobs([second], 'worker-a', FakeTranslationBackend())
+    [delivery] = claim_deliveries(10)
+    WebhookDispatcher().deliver(delivery)
+
+    payload = json.loads(server.requests[0][2])
+    assert payload["sermon_guid"] == "guid-multi"
+    assert payload["status"] == "completed"
+    assert payload["convert_to_language"] == ["es", "fr"]
+    assert payload["translations"]["fr"]["translated_text"] == "[fr] Transcript"
+
+def test_job_served_from_completed_translation_calls_back(receiver):
+    server = receiver()
+    with app.test_client() as client:
+        submit(client, 'guid-1', None)
+        translate_all()
+        resp = submit(client, 'guid-2', server.url)
+    assert resp.get_json()["status"] == "completed"
+
+    [delivery] = claim_deliveries(10)
+    WebhookDispatcher().deliver(delivery)
+    assert json.loads(server.requests[0][2])["sermon_guid"] == "guid-2"
+
+def test_idle_dispatcher_does_not_take_the_write_lock(receiver, monkeypatch):
+    server = receiver(statuses=[503])
+    with app.test_client() as client:
+        submit(client, 'guid-1', server.url)
+    translate_all()
+    dispatcher = WebhookDispatcher()
+    dispatcher.deliver(claim_deliveries(10)[0])  # Due again within WEBHOOK_RETRY_BASE_SECONDS
+    assert 0 < webhooks.seconds_until_next_delivery() <= webhooks.WEBHOOK_RETRY_BASE_SECONDS
+
+    claims, waits = [], []
+    stop_event = threading.Event()
+
+    def wait_once(generation, timeout):
+        waits.append(timeout)
+        stop_event.set()
+
+    monkeypatch.setattr(webhooks, 'claim_deliveries', lambda limit: claims.append(limit) or [])
+    monkeypatch.setattr(webhooks.delivery_signal, 'wait', wait_once)
+    dispatcher.run(stop_event)
+
+    assert claims == []
+    assert 1 < waits[0] <= webhooks.WEBHOOK_RETRY_BASE_SECONDS + 1
+
+def test_callback_url_requires_a_webhook_secret(monkeypatch):
+    monkeypatch.setattr(webhooks, 'WEBHOOK_SECRET', '')
+    with app.test_client() as client:
+        resp = submit(client, 'guid-1', "https://example.com/hook")
+    assert resp.status_code == 400
+    assert "WEBHOOK_SECRET" in resp.get_json()["error"]
+    assert webhooks.start_dispatcher(threading.Event()) is None
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/hook", "http://localhost:8080/hook", "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook", "http://[::1]/hook", "http://[::ffff:192.168.0.1]/hook",
+])
+def test_callback_to_internal_address_is_rejected(url, monkeypatch):
+    monkeypatch.setattr(webhooks, 'WEBHOOK_ALLOW_PRIVATE_HOSTS', False)
+    with app.test_client() as client:
+        resp = submit(client, 'guid-1', url)
+    assert resp.status_code == 400
+    assert "private" in resp.get_json()["error"]
+
+def test_delivery_to_name_resolving_to_internal_address_is_dropped(receiver, monkeypatch):
+    server = receiver()
+    with app.test_client() as client:
+        submit(client, 'guid-1', server.url.replace('127.0.0.1', 'internal.example'))
+    translate_all()
+    monkeypatch.setattr(webhooks, 'WEBHOOK_ALLOW_PRIVATE_HOSTS', False)
+    monkeypatch.setattr(webhooks.socket, 'getaddrinfo', lambda host, *args, **kwargs: [
+        (webhooks.socket.AF_INET, webhooks.socket.SOCK_STREAM, 6, '', ('127.0.0.1', 0))
+    ])
+
+    assert WebhookDispatcher().deliver(claim_deliveries(10)[0]) == 'dropped'
+    assert server.requests == []
+
+@pytest.mark.parametrize("url", ["ftp://example.com/hook", "/relative", "http://", 42, "http://example.com:port/"])
+def test_invalid_callback_url_is_rejected(url):
+    with app.test_client() as client:
+        resp = submit(client, 'guid-1', url)
+    assert resp.status_code == 400
+    assert "callback_url" in resp.get_json()["error"]
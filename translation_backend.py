@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# API settings
+SERVICE_ACCOUNT_JSON = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', '/etc/secrets/key.json')  # Path to Google API credentials
+PROJECT_ID = os.getenv('GOOGLE_CLOUD_PROJECT')  # Optionally set this in your environment
+LOCATION = os.getenv('GOOGLE_TRANSLATE_LOCATION', 'global')  # Default location is 'global'
+BACKEND_NAME = os.getenv('TRANSLATION_BACKEND', 'google')  # 'google' or 'fake' (offline testing/benchmarks)
+
+def get_project_id():
+    if PROJECT_ID:
+        return PROJECT_ID
+    # Try to get project_id from service account file
+    try:
+        with open(SERVICE_ACCOUNT_JSON, 'r') as f:
+            info = json.load(f)
+            return info.get('project_id')
+    except Exception as e:
+        logger.error("Could not determine project_id: %s", e)
+        raise
+
+# google.cloud.translate pulls in gRPC and protobuf, which the API process never needs.
+# It is imported on first use of a Google backend, and the error checks below only look
+# at google.api_core.exceptions if something else has already loaded it: an error can't
+# be one of its classes otherwise.
+def _google_exceptions():
+    return sys.modules.get('google.api_core.exceptions')
+
+def _is_channel_error(error):
+    """Whether an error means the gRPC channel is unusable and should be rebuilt."""
+    google_exceptions = _google_exceptions()
+    if google_exceptions is not None and isinstance(error, google_exceptions.ServiceUnavailable):
+        return True
+    return isinstance(error, ValueError) and "closed channel" in str(error)
+
+def is_quota_error(error):
+    """Whether an error means a rate or quota limit was hit (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    google_exceptions = _google_exceptions()
+    return google_exceptions is not None and isinstance(
+        error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+    )
+
+class IncompleteResponseError(Exception):
+    """The API answered a request with fewer translations than it was sent."""
+
+def check_translations(contents, translations):
+    """Return ``translations``, raising IncompleteResponseError unless there is one per item of ``contents``."""
+    if len(translations) != len(contents):
+        raise IncompleteResponseError(f"Expected {len(contents)} translations, got {len(translations)}")
+    return translations
+
+def is_transient_error(error):
+    """Whether an error is a temporary server-side failure worth retrying after a pause."""
+    if _is_channel_error(error) or isinstance(error, IncompleteResponseError):
+        return True
+    google_exceptions = _google_exceptions()
+    return google_exceptions is not None and isinstance(error, (
+        google_exceptions.DeadlineExceeded, google_exceptions.InternalServerError, google_exceptions.BadGateway,
+        google_exceptions.GatewayTimeout,
+    ))
+
+def _service_error(message):
+    from google.api_core import exceptions as google_exceptions
+    return google_exceptions.ServiceUnavailable(message)
+
+class GoogleTranslationBackend:
+    """Google Cloud Translate v3 backend that keeps one warm client for its lifetime.
+
+    The client (and with it the gRPC channel, TLS session and credentials), the project
+    id and the ``parent`` path are resolved once, on first use. If the channel fails,
+    the client is rebuilt and the request is retried once.
+    """
+
+    def __init__(self, project_id=None, location=LOCATION, client_factory=None):
+        self._project_id = project_id
+        self.location = location
+        self._client_factory = client_factory
+        self._client = None
+        self._parent = None
+        self._lock = threading.Lock()
+
+    @property
+    def parent(self):
+        if self._parent is None:
+            project_id = self._project_id or get_project_id()
+            self._parent = f"projects/{project_id}/locations/{self.location}"
+        return self._parent
+
+    def _get_client(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = (self._client_factory or self._default_client_factory())()
+                client = self._client
+        return client
+
+    @staticmethod
+    def _default_client_factory():
+        from google.cloud import translate
+        return translate.TranslationServiceClient
+
+    def _discard_client(self, client):
+        """Drop ``client`` if it is still the current one, so the next call reconnects."""
+        with self._lock:
+            if self._client is not client:
+                return  # Another thread already reconnected
+            self._client = None
+        try:
+            client.transport.close()
+        except Exception as e:
+            logger.debug("Ignoring error while closing translation client: %s", e)
+
+    def translate(self, contents, source_language, target_language):
+        """Translates a list of strings in one request, returning translations in order."""
+        request = {
+            "parent": self.parent,
+            "contents": list(contents),
+            "mime_type": "text/plain",
+            "source_language_code": source_language,
+            "target_language_code": target_language,
+        }
+        client = self._get_client()
+        try:
+            response = client.translate_text(request=request)
+        except Exception as e:
+            if not _is_channel_error(e):
+                raise
+            logger.warning("Translation channel failed (%s); reconnecting.", e, extra={"rate_limit": True})
+            self._discard_client(client)
+            response = self._get_client().translate_text(request=request)
+        return [translation.translated_text for translation in response.translations]
+
+    def close(self):
+        """Close the underlying channel."""
+        client = self._client
+        if client is not None:
+            self._discard_client(client)
+
+class AsyncGoogleTranslationBackend(GoogleTranslationBackend):
+    """Google Cloud Translate v3 backend for the asyncio worker, built on TranslationServiceAsyncClient.
+
+    One client, created on first use inside the running event loop, carries every
+    request of the process over a single gRPC channel. As with the synchronous backend,
+    a failed channel is rebuilt and the request retried once.
+    """
+
+    @staticmethod
+    def _default_client_factory():
+        from google.cloud import translate
+        return translate.TranslationServiceAsyncClient
+
+    async def _discard_client_async(self, client):
+        with self._lock:
+            if self._client is not client:
+                return
+            self._client = None
+        try:
+            await client.transport.close()
+        except Exception as e:
+            logger.debug("Ignoring error while closing translation client: %s", e)
+
+    def translate(self, contents, source_language, target_language):
+        raise TypeError("AsyncGoogleTranslationBackend only supports translate_async")
+
+    def close(self):
+        raise TypeError("AsyncGoogleTranslationBackend is closed with close_async")
+
+    async def translate_async(self, contents, source_language, target_language):
+        """Translates a list of strings in one request, returning translations in order."""
+        request = {
+            "parent": self.parent,
+            "contents": list(contents),
+            "mime_type": "text/plain",
+            "source_language_code": source_language,
+            "target_language_code": target_language,
+        }
+        client = self._get_client()
+        try:
+            response = await client.translate_text(request=request)
+        except Exception as e:
+            if not _is_channel_error(e):
+                raise
+            logger.warning("Translation channel failed (%s); reconnecting.", e, extra={"rate_limit": True})
+            await self._discard_client_async(client)
+            response = await self._get_client().translate_text(request=request)
+        return [translation.translated_text for translation in response.translations]
+
+    async def close_async(self):
+        """Close the underlying channel."""
+        client = self._client
+        if client is not None:
+            await self._discard_client_async(client)
+
+class FakeTranslationBackend:
+    """Offline backend for tests and benchmarks.
+
+    Each request sleeps ``latency`` seconds plus ``latency_per_char`` for every character,
+    stretched by a random factor of up to ``jitter``, and returns
+    ``transform(text, source, target)`` for every content string. A fraction
+    ``error_rate`` of requests raise ``error()`` instead (by default a retryable
+    ServiceUnavailable). Call, character and error counts and the peak number of
+    concurrent requests are recorded.
+    """
+
+    def __init__(self, latency=0.0, transform=None, latency_per_char=0.0, jitter=0.0, error_rate=0.0, error=None,
+                 seed=None):
+        self.latency = latency
+        self.transform = transform or (lambda text, source, target: f"[{target}] {text}")
+        self.latency_per_char = latency_per_char
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error = error or (lambda: _service_error("Injected failure"))
+        self.calls = 0
+        self.characters = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _begin(self, contents):
+        """Count a request. Returns its simulated latency and whether it fails."""
+        characters = sum(len(text) for text in contents)
+        with self._lock:
+            self.calls += 1
+            self.characters += characters
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            stretch = 1 + self._random.random() * self.jitter
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return (self.latency + self.latency_per_char * characters) * stretch, fail
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def translate(self, contents, source_language, target_language):
+        contents = list(contents)
+        delay, fail = self._begin(contents)
+        try:
+            if delay:
+                time.sleep(delay)
+            if fail:
+                raise self.error()
+            return [self.transform(text, source_language, target_language) for text in contents]
+        finally:
+            self._end()
+
+    async def translate_async(self, contents, source_language, target_language):
+        """``translate`` for the asyncio worker; the latency is awaited, not slept."""
+        contents = list(contents)
+        delay, fail = self._begin(contents)
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            if fail:
+                raise self.error()
+            return [self.transform(text, source_language, target_language) for text in contents]
+        finally:
+            self._end()
+
+    def close(self):
+        pass
+
+def create_backend(name=None):
+    """Build a backend by name: 'google' (default) or 'fake'."""
+    name = name or BACKEND_NAME
+    if name == 'google':
+        return GoogleTranslationBackend()
+    if name == 'fake':
+        return FakeTranslationBackend(
+            latency=float(os.getenv('FAKE_TRANSLATION_LATENCY', '0')),
+            latency_per_char=float(os.getenv('FAKE_TRANSLATION_LATENCY_PER_CHAR', '0')),
+            jitter=float(os.getenv('FAKE_TRANSLATION_JITTER', '0')),
+            error_rate=float(os.getenv('FAKE_TRANSLATION_ERROR_RATE', '0')),
+        )
+    raise ValueError(f"Unknown translation backend: {name}")
+
+def create_async_backend(name=None):
+    """Build a backend for the asyncio worker, which calls ``translate_async``: 'google' (default) or 'fake'."""
+    name = name or BACKEND_NAME
+    if name == 'google':
+        return AsyncGoogleTranslationBackend()
+    return create_backend(name)  # The fake backend supports both
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+def get_backend():
+    """Get the process-wide backend, creating it on first use."""
+    global _default_backend
+    if _default_backend is None:
+        with _default_backend_lock:
+            if _default_backend is None:
+                _default_backend = create_backend()
+    return _default_backend
+
+def set_backend(backend):
+    """Replace the process-wide backend (e.g. with a FakeTranslationBackend). Returns the old one."""
+    global _default_backend
+    with _default_backend_lock:
+        previous, _default_backend = _default_backend, backend
+    return previous
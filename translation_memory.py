@@ -0,0 +1,106 @@
+import os
+import logging
+import hashlib
+import metrics
+from database import execute_read, write_transaction, utc_timestamp, in_batches
+
+logger = logging.getLogger(__name__)
+
+# Translation memory settings
+MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', '1') == '1'
+MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '200000'))  # LRU bound on stored segments
+MEMORY_MAX_AGE_DAYS = int(os.getenv('TRANSLATION_MEMORY_MAX_AGE_DAYS', '180'))  # Drop segments unused this long
+
+def normalize_segment(segment):
+    """Collapse whitespace so trivially different copies of a segment share an entry."""
+    return " ".join(segment.split())
+
+def segment_hash(segment):
+    """Key of a segment in the translation memory."""
+    return hashlib.sha256(normalize_segment(segment).encode("utf-8")).hexdigest()
+
+def lookup(segments, source_language, target_language):
+    """Look segments up in the memory.
+
+    Returns a list parallel to ``segments`` holding the stored translation, or None
+    for a miss. Hits have their ``last_used_at`` refreshed for LRU eviction.
+    """
+    hashes = [segment_hash(segment) for segment in segments]
+    found = {}
+    unique_hashes = list(dict.fromkeys(hashes))
+    for batch, placeholders in in_batches(unique_hashes):
+        rows = execute_read(
+            "SELECT segment_hash, translated_text FROM translation_memory "
+            f"WHERE source_language = ? AND target_language = ? AND segment_hash IN ({placeholders})",
+            (source_language, target_language, *batch)
+        )
+        found.update((row['segment_hash'], row['translated_text']) for row in rows)
+
+    if found:
+        now = utc_timestamp()
+        with write_transaction() as cursor:
+            cursor.executemany(
+                "UPDATE translation_memory SET hits = hits + 1, last_used_at = ? "
+                "WHERE source_language = ? AND target_language = ? AND segment_hash = ?",
+                [(now, source_language, target_language, h) for h in found]
+            )
+
+    results = [found.get(h) for h in hashes]
+    hits = sum(1 for result in results if result is not None)
+    metrics.MEMORY_LOOKUPS.labels('hit').inc(hits)
+    metrics.MEMORY_LOOKUPS.labels('miss').inc(len(results) - hits)
+    return results
+
+def store(segments, translations, source_language, target_language):
+    """Write newly translated segments back to the memory.
+
+    A blank translation of a non-blank segment is never stored, so a bad response
+    can't be served from the memory forever.
+    """
+    rows = [
+        (source_language, target_language, segment_hash(segment), translation)
+        for segment, translation in zip(segments, translations)
+        if translation or not segment.strip()
+    ]
+    if not rows:
+        return
+    with write_transaction() as cursor:
+        cursor.executemany(
+            "INSERT OR REPLACE INTO translation_memory "
+            "(source_language, target_language, segment_hash, translated_text) VALUES (?, ?, ?, ?)",
+            rows
+        )
+    metrics.MEMORY_STORED.inc(len(rows))
+
+def evict(max_entries=None, max_age_days=None):
+    """Drop segments unused for ``max_age_days``, then the least recently used beyond ``max_entries``.
+
+    Returns the number of entries removed.
+    """
+    max_entries = MEMORY_MAX_ENTRIES if max_entries is None else max_entries
+    max_age_days = MEMORY_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    with write_transaction() as cursor:
+        cursor.execute(
+            "DELETE FROM translation_memory WHERE last_used_at <= ?",
+            (utc_timestamp(-max_age_days * 86400),)
+        )
+        removed = cursor.rowcount
+        entries = cursor.execute("SELECT COUNT(*) AS count FROM translation_memory").fetchone()['count']
+        if entries > max_entries:
+            cursor.execute(
+                "DELETE FROM translation_memory WHERE (source_language, target_language, segment_hash) IN ("
+                "SELECT source_language, target_language, segment_hash FROM translation_memory "
+                "ORDER BY last_used_at LIMIT ?)",
+                (entries - max_entries,)
+            )
+            removed += cursor.rowcount
+    metrics.MEMORY_EVICTED.inc(removed)
+    if removed:
+        logger.info("Evicted %d translation memory entries.", removed)
+    return removed
+
+@metrics.register_collector
+def memory_entries():
+    """Entries in the translation memory, counted from the database so every process reports the same number."""
+    entries = execute_read("SELECT COUNT(*) AS count FROM translation_memory")[0]['count']
+    return [('translator_translation_memory_entries', "Segments stored in the translation memory.", (), {(): entries})]
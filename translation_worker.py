@@ -1,144 +1,670 @@
-import time
+import json
+import hashlib
 import logging
 import os
-from google.cloud import translate
-import json
+import signal
+import socket
+import threading
+import contextvars
+import time
+import multiprocessing
 from datetime import datetime
-from database import execute_with_params
+from concurrent.futures import ThreadPoolExecutor, wait
+import metrics
+import scheduler
+import translation_memory
+import webhooks
+from database import (
+    init_db, close_pools, execute_read, write_transaction, utc_timestamp,
+    compress_text, decompress_text, put_texts, get_texts, backoff, TEXT_CODEC
+)
+from translation_backend import check_translations, get_backend, is_quota_error, is_transient_error
+from segmentation import MAX_CHARS, MAX_CONTENTS_PER_REQUEST, split_segments, pack_indices, pack_requests, reassemble
+from rate_limiter import get_limiter
+from notifications import work_signal, notify_work_available, notify_status_changed, WakeupListener
+from log_config import setup_logging, log_context
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
-# API settings
-SERVICE_ACCOUNT_JSON = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', '/etc/secrets/key.json')  # Path to Google API credentials
-PROJECT_ID = os.getenv('GOOGLE_CLOUD_PROJECT')  # Optionally set this in your environment
-LOCATION = os.getenv('GOOGLE_TRANSLATE_LOCATION', 'global')  # Default location is 'global'
-TRANSLATION_POLL_INTERVAL = 30  # Seconds between checks
+# Worker settings
+TRANSLATION_POLL_INTERVAL = int(os.getenv('TRANSLATION_POLL_INTERVAL', '120'))  # Safety-net poll; submissions wake workers directly
+CHUNK_CONCURRENCY = int(os.getenv('TRANSLATION_CHUNK_CONCURRENCY', '8'))  # Requests in flight per job
 
-def get_project_id():
-    if PROJECT_ID:
-        return PROJECT_ID
-    # Try to get project_id from service account file
-    try:
-        with open(SERVICE_ACCOUNT_JSON, 'r') as f:
-            info = json.load(f)
-            return info.get('project_id')
-    except Exception as e:
-        logging.error(f"Could not determine project_id: {e}")
-        raise
-
-def translate_text(text, source_language, target_language, region):
+# Worker pool settings
+WORKER_COUNT = int(os.getenv('TRANSLATION_WORKER_COUNT', '1'))  # Worker threads per process
+WORKER_PROCESSES = int(os.getenv('TRANSLATION_WORKER_PROCESSES', '1'))  # Processes when run standalone
+WORKER_MODE = os.getenv('TRANSLATION_WORKER_MODE', 'threads')  # 'threads', or 'asyncio' for async_worker
+LEASE_SECONDS = int(os.getenv('TRANSLATION_LEASE_SECONDS', '300'))  # How long a claim lasts without renewal
+CLAIM_BATCH_SIZE = int(os.getenv('TRANSLATION_CLAIM_BATCH_SIZE', '1'))  # Jobs leased per claim; 1 keeps idle workers fed
+MAX_ATTEMPTS = int(os.getenv('TRANSLATION_MAX_ATTEMPTS', '5'))  # Claims per job before it is marked failed
+RETRY_BASE_SECONDS = float(os.getenv('TRANSLATION_RETRY_BASE_SECONDS', '30'))  # First retry delay; doubles per attempt
+RETRY_MAX_SECONDS = float(os.getenv('TRANSLATION_RETRY_MAX_SECONDS', '3600'))
+
+def _in_context(fn):
+    """``fn`` wrapped to run in a copy of the caller's log context, for use on pool threads."""
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(fn, *args)
+
+def translate_texts(texts, source_language, target_language, region, max_concurrency=CHUNK_CONCURRENCY, backend=None,
+                    limiter=None):
+    """Translates several strings concurrently, returning the translations in input order.
+
+    Strings are packed into as few requests as the size limits allow, and at most
+    ``max_concurrency`` requests for this call are in flight at once. Every request
+    goes through the process-wide quota limiter (unless ``limiter`` is given), which
+    paces, retries and throttles requests across all workers. Uses the process-wide
+    backend unless ``backend`` is given.
+    """
+    texts = [text.decode("utf-8") if isinstance(text, bytes) else text for text in texts]
+    if not texts:
+        return []
+    backend = backend or get_backend()
+    limiter = limiter or get_limiter()
+
+    def translate_batch(batch):
+        characters = sum(len(text) for text in batch)
+        metrics.CHARACTERS_SENT.labels(source_language, target_language).inc(characters)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            translations = limiter.call(
+                lambda: check_translations(batch, backend.translate(batch, source_language, target_language)), characters
+            )
+            outcome = 'ok'
+        finally:
+            metrics.API_REQUEST_DURATION.labels(outcome).observe(time.perf_counter() - started)
+        return translations
+
+    packed = pack_indices([len(text) for text in texts], MAX_CHARS, MAX_CONTENTS_PER_REQUEST)
+    batches = [[texts[i] for i in indices] for indices in packed]
+    if len(batches) == 1 or max_concurrency <= 1:
+        results = [translate_batch(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+            results = list(executor.map(_in_context(translate_batch), batches))
+    translations = [None] * len(texts)
+    for indices, batch in zip(packed, results):
+        for i, translation in zip(indices, batch):
+            translations[i] = translation
+    return translations
+
+def source_characters(segments):
+    """How many characters of the source text each distinct core of ``segments`` stands for.
+
+    A core is credited with every occurrence and the whitespace around it; a
+    whitespace-only segment counts towards the next core (or else the last). The
+    counts add up to the length of the text whenever it has anything to translate.
+    """
+    characters = {}
+    carried = 0
+    core = None
+    for leading, core_text, trailing in segments:
+        carried += len(leading) + len(core_text) + len(trailing)
+        if core_text:
+            core = core_text
+            characters[core] = characters.get(core, 0) + carried
+            carried = 0
+    if carried and core is not None:
+        characters[core] += carried
+    return characters
+
+class ChunkCheckpoint:
+    """Persists each translated chunk of one job as soon as it completes.
+
+    Chunks are keyed by index and by a hash of their source segments, so a retry reuses
+    exactly the chunks whose input is unchanged and translates only the rest. The job's
+    progress (chunks and source characters done, of the total) is kept on its row, one
+    small update per chunk, for /status to report.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._characters = None
+
+    def _size(self, chunk):
+        """Source characters a chunk covers (see start)."""
+        if self._characters is None:
+            return sum(len(source) for source in chunk)
+        return sum(self._characters.get(source, 0) for source in chunk)
+
+    @staticmethod
+    def source_hash(sources):
+        return hashlib.sha256("\0".join(sources).encode("utf-8")).hexdigest()
+
+    def load(self):
+        """Saved chunks as ``{chunk_index: (source_hash, translations)}``."""
+        rows = execute_read(
+            "SELECT chunk_index, source_hash, codec, body FROM translation_chunks WHERE job_id = ?",
+            (self.job_id,)
+        )
+        return {
+            row['chunk_index']: (row['source_hash'], json.loads(decompress_text(row['body'], row['codec'])))
+            for row in rows
+        }
+
+    def start(self, chunks, characters=None):
+        """Begin an attempt at translating ``chunks``.
+
+        Returns the translations saved by an earlier attempt for chunks whose input is
+        unchanged, as ``{chunk_index: translations}``, drops any others, and resets the
+        job's progress to count just the reused chunks as done. ``characters`` maps
+        each source segment to the characters of the original text it covers (see
+        source_characters); without it a segment counts its own length.
+        """
+        self._characters = characters
+        saved = self.load()
+        reused = {
+            index: translations for index, (source_hash, translations) in saved.items()
+            if index < len(chunks) and source_hash == self.source_hash(chunks[index])
+        }
+        stale = [index for index in saved if index not in reused]
+        sizes = [self._size(chunk) for chunk in chunks]
+        with write_transaction() as cursor:
+            if stale:
+                cursor.execute(
+                    f"DELETE FROM translation_chunks WHERE job_id = ? AND chunk_index IN ({', '.join('?' * len(stale))})",
+                    (self.job_id, *stale)
+                )
+            cursor.execute(
+                "UPDATE translations SET chunks_done = ?, chunks_total = ?, characters_done = ?, characters_total = ? "
+                "WHERE id = ?",
+                (len(reused), len(chunks), sum(sizes[index] for index in reused), sum(sizes), self.job_id)
+            )
+            guids = guids_with_parents(cursor, [self.job_id])
+        notify_status_changed(guids)
+        return reused
+
+    def save(self, index, sources, translations):
+        body = compress_text(json.dumps(translations, ensure_ascii=False))
+        with write_transaction() as cursor:
+            new = cursor.execute(
+                "SELECT 1 FROM translation_chunks WHERE job_id = ? AND chunk_index = ?", (self.job_id, index)
+            ).fetchone() is None
+            cursor.execute(
+                "INSERT OR REPLACE INTO translation_chunks (job_id, chunk_index, source_hash, codec, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.job_id, index, self.source_hash(sources), TEXT_CODEC, body)
+            )
+            guids = []
+            if new:
+                cursor.execute(
+                    "UPDATE translations SET chunks_done = chunks_done + 1, characters_done = characters_done + ? "
+                    "WHERE id = ?",
+                    (self._size(sources), self.job_id)
+                )
+                guids = guids_with_parents(cursor, [self.job_id])
+        notify_status_changed(guids)
+
+def translate_segments(segments, source_language, target_language, region, backend=None, use_memory=None,
+                       checkpoint=None, max_concurrency=CHUNK_CONCURRENCY, characters=None):
+    """Translates segments chunk by chunk, serving repeats from the translation memory.
+
+    The unique segments are packed into request-sized chunks, translated concurrently.
+    Within a chunk only segments the memory has not seen are sent to the API, and their
+    translations are written back for next time. With a ``checkpoint``, every finished
+    chunk is saved as it completes (advancing the job's progress) and chunks saved by an
+    earlier attempt are reused. ``characters`` weighs the progress; see ChunkCheckpoint.start.
+    """
+    use_memory = translation_memory.MEMORY_ENABLED if use_memory is None else use_memory
+    unique = list(dict.fromkeys(segments))
+    chunks = pack_requests(unique, MAX_CHARS, MAX_CONTENTS_PER_REQUEST)
+    saved = checkpoint.start(chunks, characters) if checkpoint else {}
+
+    def translate_chunk(index):
+        chunk = chunks[index]
+        if index in saved:
+            return saved[index]
+        cached = translation_memory.lookup(chunk, source_language, target_language) if use_memory else [None] * len(chunk)
+        misses = [segment for segment, translation in zip(chunk, cached) if translation is None]
+        translated_misses = translate_texts(misses, source_language, target_language, region, max_concurrency=1, backend=backend)
+        if use_memory:
+            translation_memory.store(misses, translated_misses, source_language, target_language)
+        translated_misses = iter(translated_misses)
+        translations = [translation if translation is not None else next(translated_misses) for translation in cached]
+        if checkpoint:
+            checkpoint.save(index, chunk, translations)
+        return translations
+
+    if len(chunks) <= 1 or max_concurrency <= 1:
+        results = [translate_chunk(index) for index in range(len(chunks))]
+    else:
+        # A failing chunk does not cancel the others, so their work is checkpointed too
+        # (Executor.map would cancel the chunks not yet started once one fails)
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+            futures = [executor.submit(_in_context(translate_chunk), index) for index in range(len(chunks))]
+            wait(futures)
+        results = [future.result() for future in futures]  # Raises the first chunk's error
+
+    table = {}
+    for chunk, translations in zip(chunks, results):
+        table.update(zip(chunk, translations))
+    return [table[segment] for segment in segments]
+
+def partial_translation(job_id, transcription, sermon_title, segments=None):
+    """The translation of an unfinished job so far, from its chunk checkpoints.
+
+    Returns the translated transcription up to the first segment whose chunk has not
+    been saved yet ("" if none has). ``segments`` is as for translate_job.
+    """
+    if segments is None:
+        if isinstance(transcription, bytes):
+            transcription = transcription.decode("utf-8")
+        segments = split_segments(transcription, MAX_CHARS)
+    cores = [core for _, core, _ in segments if core]
+    # The same chunks translate_job packs, so saved chunks line up by index
+    chunks = pack_requests(list(dict.fromkeys(cores + [sermon_title])), MAX_CHARS, MAX_CONTENTS_PER_REQUEST)
+    table = {}
+    for index, (source_hash, translations) in ChunkCheckpoint(job_id).load().items():
+        if index < len(chunks) and source_hash == ChunkCheckpoint.source_hash(chunks[index]):
+            table.update(zip(chunks[index], translations))
+    done = 0
+    while done < len(segments) and (not segments[done][1] or segments[done][1] in table):
+        done += 1
+    return reassemble(segments[:done], [table[core] for _, core, _ in segments[:done] if core])
+
+def translate_text(text, source_language, target_language, region, backend=None):
     """Translates text using Google Cloud Translate v3 API."""
-    MAX_CHARS = 30000  # Leave some buffer below the 30,720 limit
-    
     if isinstance(text, bytes):
         text = text.decode("utf-8")
-    
-    # Initialize client and project info once
-    client = translate.TranslationServiceClient()
-    project_id = get_project_id()
-    parent = f"projects/{project_id}/locations/{LOCATION}"
-    
-    # If text is within limit, translate directly
-    if len(text) <= MAX_CHARS:
-        response = client.translate_text(
-            request={
-                "parent": parent,
-                "contents": [text],
-                "mime_type": "text/plain",
-                "source_language_code": source_language,
-                "target_language_code": target_language,
-            }
+    segments = split_segments(text, MAX_CHARS)
+    cores = [core for _, core, _ in segments if core]
+    return reassemble(segments, translate_segments(cores, source_language, target_language, region, backend=backend))
+
+def translate_job(transcription, sermon_title, source_language, target_language, region, backend=None, checkpoint=None,
+                  segments=None):
+    """Translates a sermon's transcription and title, dispatching every segment and the title together.
+
+    Returns ``(translated_text, translated_sermon_title)``. See translate_segments for
+    ``checkpoint``. Pass the transcription's ``segments`` (from split_segments) to reuse
+    a segmentation shared with other target languages.
+    """
+    if segments is None:
+        if isinstance(transcription, bytes):
+            transcription = transcription.decode("utf-8")
+        segments = split_segments(transcription, MAX_CHARS)
+    cores = [core for _, core, _ in segments if core]
+    # Progress counts the transcription's own characters; the title adds none
+    translated = translate_segments(
+        cores + [sermon_title], source_language, target_language, region, backend=backend, checkpoint=checkpoint,
+        characters=source_characters(segments)
+    )
+    return reassemble(segments, translated[:-1]), translated[-1]
+
+def make_worker_id():
+    """A worker id that is unique across hosts, processes and threads."""
+    return f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+
+def claim_jobs(worker_id, limit=CLAIM_BATCH_SIZE):
+    """Atomically lease up to ``limit`` jobs to ``worker_id``.
+
+    Pending jobs (once any retry delay has passed) and jobs whose lease has expired
+    (their worker crashed or hung) are moved to 'processing' with this worker's id and
+    a fresh lease expiry in the same IMMEDIATE transaction that selects them, so no two
+    workers, in this process or any other, can claim the same job. Each claim counts
+    as one of the job's attempts. Expired leases are recovered first; pending jobs are
+    chosen by the scheduler (priority, age, size and fair share). The other pending
+    languages of a multi-target job come with it, beyond ``limit``.
+    """
+    now = datetime.utcnow()
+    with write_transaction() as cursor:
+        ids = [row['id'] for row in cursor.execute(
+            "SELECT id FROM translations WHERE status = 'processing' AND lease_expires_at <= ? ORDER BY id LIMIT ?",
+            (now.strftime('%Y-%m-%d %H:%M:%S'), limit)
+        ).fetchall()]
+        if len(ids) < limit:
+            ids += scheduler.select_pending(cursor, limit - len(ids), now)
+        if not ids:
+            return []
+        ids = scheduler.with_siblings(cursor, ids, now)
+        placeholders = ", ".join("?" * len(ids))
+        candidates = cursor.execute(
+            f"SELECT id, sermon_guid, status, worker_id FROM translations WHERE id IN ({placeholders})", ids
+        ).fetchall()
+        cursor.execute(
+            f"UPDATE translations SET status = 'processing', worker_id = ?, lease_expires_at = ?, "
+            f"retry_after = NULL, attempts = attempts + 1 "
+            f"WHERE id IN ({placeholders})",
+            (worker_id, utc_timestamp(LEASE_SECONDS), *ids)
         )
-        return response.translations[0].translated_text if response.translations else ""
-    
-    # Split text into chunks for large texts
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + MAX_CHARS
-        if end >= len(text):
-            chunks.append(text[start:])
-            break
-        
-        # Try to break at sentence boundary to preserve context
-        break_point = text.rfind('.', start, end)
-        if break_point == -1 or break_point <= start:
-            break_point = text.rfind(' ', start, end)
-        if break_point == -1 or break_point <= start:
-            break_point = end
-            
-        chunks.append(text[start:break_point])
-        start = break_point + 1 if break_point < len(text) else break_point
-    
-    # Translate each chunk
-    translated_chunks = []
-    for chunk in chunks:
-        # Skip empty chunks
-        if not chunk.strip():
-            continue
-            
-        response = client.translate_text(
-            request={
-                "parent": parent,
-                "contents": [chunk],
-                "mime_type": "text/plain",
-                "source_language_code": source_language,
-                "target_language_code": target_language,
-            }
+        rows = {row['id']: row for row in cursor.execute(
+            "SELECT id, sermon_guid, parent_id, transcription, sermon_title, current_language, convert_to_language, region, "
+            "attempts, last_error, created_at "
+            f"FROM translations WHERE id IN ({placeholders})",
+            ids
+        ).fetchall()}
+        jobs = [rows[job_id] for job_id in ids]  # In scheduling order
+        guids = guids_with_parents(cursor, [row['id'] for row in candidates if row['status'] == 'pending'])
+    for row in candidates:
+        if row['status'] == 'processing':
+            logger.warning("Recovered translation job %s from expired lease held by %s.", row['id'], row['worker_id'])
+    notify_status_changed(guids)
+    for job in jobs:
+        if job['attempts'] == 1:
+            waited = now - datetime.strptime(job['created_at'], '%Y-%m-%d %H:%M:%S')
+            metrics.QUEUE_WAIT.observe(max(waited.total_seconds(), 0.0))
+
+    # Fetch and decompress the source text only now that the jobs are ours; the
+    # languages of a multi-target job share the one stored with it
+    transcriptions = get_texts({job['parent_id'] or job['id'] for job in jobs}, 'transcription')
+    for job in jobs:
+        job['transcription'] = transcriptions.get(job['parent_id'] or job['id'], job['transcription'])
+    return jobs
+
+def guids_with_parents(cursor, ids):
+    """GUIDs of jobs ``ids`` and of the multi-target jobs they belong to, whose status they are part of."""
+    if not ids:
+        return []
+    placeholders = ", ".join("?" * len(ids))
+    return [row['sermon_guid'] for row in cursor.execute(
+        f"SELECT sermon_guid FROM translations WHERE id IN ({placeholders}) OR id IN ("
+        f"SELECT parent_id FROM translations WHERE id IN ({placeholders}) AND parent_id IS NOT NULL)",
+        (*ids, *ids)
+    ).fetchall()]
+
+def renew_leases(worker_id):
+    """Push out the lease expiry of every job ``worker_id`` holds. Returns how many it still holds."""
+    with write_transaction() as cursor:
+        cursor.execute(
+            "UPDATE translations SET lease_expires_at = ? "
+            "WHERE worker_id = ? AND status = 'processing'",
+            (utc_timestamp(LEASE_SECONDS), worker_id)
         )
-        translated_chunks.append(response.translations[0].translated_text if response.translations else "")
-    
-    return "".join(translated_chunks)
+        return cursor.rowcount
 
-def process_translation_jobs():
-    """Checks for pending translations and processes them."""
-    while True:
+def finish_job(job_id, worker_id, status, translated_text=None, translated_sermon_title=None, last_error=None):
+    """Record a job's outcome, but only if ``worker_id`` still holds its lease.
+
+    Jobs attached to this one as content duplicates get the same outcome in the same
+    transaction. The translated text goes to translation_texts, compressed, the job's
+    chunk checkpoints are dropped and webhooks are queued for those with a callback.
+    """
+    finished_at = utc_timestamp()
+    body = compress_text(translated_text) if translated_text is not None else None
+    with write_transaction() as cursor:
+        cursor.execute(
+            "UPDATE translations "
+            "SET translated_sermon_title = ?, status = ?, finished_at = ?, last_error = ?, "
+            "worker_id = NULL, lease_expires_at = NULL "
+            "WHERE id = ? AND worker_id = ? AND status = 'processing'",
+            (translated_sermon_title, status, finished_at, last_error, job_id, worker_id)
+        )
+        owned = cursor.rowcount == 1
+        if owned:
+            changed = [row['id'] for row in cursor.execute(
+                "SELECT id FROM translations WHERE id = ? OR (duplicate_of = ? AND status = 'pending')",
+                (job_id, job_id)
+            ).fetchall()]
+            cursor.execute(
+                "UPDATE translations "
+                "SET translated_sermon_title = ?, status = ?, finished_at = ?, last_error = ? "
+                "WHERE duplicate_of = ? AND status = 'pending'",
+                (translated_sermon_title, status, finished_at, last_error, job_id)
+            )
+            if body is not None:
+                put_texts(cursor, 'translated_text', [(changed_id, body) for changed_id in changed])
+            cursor.execute("DELETE FROM translation_chunks WHERE job_id = ?", (job_id,))
+            guids = guids_with_parents(cursor, changed)
+            callbacks = webhooks.enqueue_deliveries(cursor, changed)
+    if not owned:
+        logger.warning("Translation job %s: lease lost before completion, discarding result from %s.", job_id, worker_id)
+        return False
+    notify_status_changed(guids)
+    if callbacks:
+        webhooks.delivery_signal.notify()
+    return True
+
+def retry_job(job_id, worker_id, last_error, delay):
+    """Put a failed attempt back in the queue to be claimed again after ``delay`` seconds.
+
+    Like finish_job this only applies while ``worker_id`` holds the lease. Chunk
+    checkpoints are kept, so the next attempt resumes where this one stopped.
+    """
+    with write_transaction() as cursor:
+        cursor.execute(
+            "UPDATE translations "
+            "SET status = 'pending', retry_after = ?, last_error = ?, worker_id = NULL, lease_expires_at = NULL "
+            "WHERE id = ? AND worker_id = ? AND status = 'processing'",
+            (utc_timestamp(delay), last_error, job_id, worker_id)
+        )
+        owned = cursor.rowcount == 1
+        guids = guids_with_parents(cursor, [job_id]) if owned else []
+    notify_status_changed(guids)
+    if owned:
+        # Idle workers are waiting on timeouts computed before this retry existed
+        notify_work_available()
+    return owned
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter before attempt number ``attempts + 1``."""
+    return backoff(attempts, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS)
+
+def is_retryable(error):
+    """Whether a failed attempt may succeed if tried again later."""
+    return is_quota_error(error) or is_transient_error(error) or isinstance(error, (ConnectionError, TimeoutError))
+
+def seconds_until_next_retry():
+    """Seconds until the earliest delayed retry is due, or None if none are waiting."""
+    row = execute_read(
+        "SELECT MIN(retry_after) AS retry_after FROM translations WHERE status = 'pending' AND retry_after IS NOT NULL"
+    )[0]
+    if row['retry_after'] is None:
+        return None
+    due = datetime.strptime(row['retry_after'], '%Y-%m-%d %H:%M:%S')
+    return max((due - datetime.utcnow()).total_seconds(), 0.0)
+
+class LeaseKeeper:
+    """Renews a worker's leases in the background while its claimed jobs are translated."""
+
+    def __init__(self, worker_id, interval=None):
+        self.worker_id = worker_id
+        self.interval = interval if interval is not None else LEASE_SECONDS / 3
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                renew_leases(self.worker_id)
+            except Exception as e:
+                logger.error("Lease renewal for %s failed: %s", self.worker_id, e, extra={"rate_limit": True})
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def process_job(job, worker_id, backend=None, segments=None):
+    """Translate one claimed job and record the result.
+
+    Translated chunks are checkpointed as they finish. A transient failure puts the job
+    back in the queue with exponential backoff until it has used ``MAX_ATTEMPTS``
+    attempts; any other failure, or the last attempt, marks it failed. ``attempts`` and
+    ``last_error`` record what happened. See translate_job for ``segments``.
+    """
+    job_id = job['id']
+    transcription = job['transcription']
+    sermon_title = job['sermon_title']
+    source_language = job['current_language']
+    target_language = job['convert_to_language']
+    region = job['region'] if job['region'] else "US"  # Default to US if region is not set
+    attempts = job.get('attempts', 1)
+
+    with log_context(job_id=job_id, sermon_guid=job.get('sermon_guid'), worker_id=worker_id):
+        if attempts > MAX_ATTEMPTS:
+            abandon_job(job, worker_id)
+            return
+
+        logger.info(
+            "Processing translation job %s: %s → %s (Region: %s), attempt %d/%d...",
+            job_id, source_language, target_language, region, attempts, MAX_ATTEMPTS
+        )
+
+        started = time.perf_counter()
         try:
-            # Fetch pending translation requests
-            jobs = execute_with_params(
-                "SELECT id, transcription, sermon_title, current_language, convert_to_language, region "
-                "FROM translations WHERE status = 'pending' LIMIT 5"
+            # Translate both transcription and sermon title
+            translated_text, translated_sermon_title = translate_job(
+                transcription, sermon_title, source_language, target_language, region,
+                backend=backend, checkpoint=ChunkCheckpoint(job_id), segments=segments
             )
+            outcome = 'completed'
+            if finish_job(job_id, worker_id, 'completed', translated_text, translated_sermon_title):
+                logger.info("Translation job %s completed successfully.", job_id)
+        except Exception as e:
+            outcome = record_failure(job_id, worker_id, attempts, e)
+        metrics.JOB_DURATION.labels(outcome).observe(time.perf_counter() - started)
+
+def group_jobs(jobs):
+    """Claimed jobs grouped so the languages of each multi-target job are together, in claim order."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(('parent', job['parent_id']) if job['parent_id'] else ('job', job['id']), []).append(job)
+    return list(groups.values())
+
+def process_jobs(jobs, worker_id, backend=None):
+    """Process claimed jobs in turn, translating the languages of a multi-target job in parallel.
+
+    Those languages share one segmentation of their transcription.
+    """
+    for group in group_jobs(jobs):
+        if len(group) == 1:
+            process_job(group[0], worker_id, backend)
+            continue
+        segments = split_segments(group[0]['transcription'], MAX_CHARS)
+        with ThreadPoolExecutor(max_workers=len(group)) as executor:
+            list(executor.map(_in_context(lambda job: process_job(job, worker_id, backend, segments)), group))
+
+def abandon_job(job, worker_id):
+    """Fail a job claimed more than ``MAX_ATTEMPTS`` times; every earlier attempt lost its lease."""
+    logger.error("Translation job %s abandoned after %d attempt(s).", job['id'], job['attempts'] - 1)
+    finish_job(job['id'], worker_id, 'failed', last_error=job.get('last_error') or "Worker lease expired")
+    metrics.JOB_DURATION.labels('abandoned').observe(0)
+
+def record_failure(job_id, worker_id, attempts, exception):
+    """Put a job back in the queue after a transient failure, or fail it. Returns 'retried' or 'failed'."""
+    error = f"{type(exception).__name__}: {exception}"
+    if is_retryable(exception) and attempts < MAX_ATTEMPTS:
+        delay = retry_delay(attempts)
+        logger.warning("Translation job %s attempt %d failed (%s); retrying in %.0fs.", job_id, attempts, error, delay)
+        retry_job(job_id, worker_id, error, delay)
+        return 'retried'
+    logger.error("Translation job %s failed: %s", job_id, error)
+    finish_job(job_id, worker_id, 'failed', last_error=error)
+    return 'failed'
+
+def process_translation_jobs(worker_id=None, stop_event=None, backend=None):
+    """Claims pending translations and processes them until ``stop_event`` is set.
+
+    The translation backend is resolved once, so the worker reuses one warm client.
+    """
+    worker_id = worker_id or make_worker_id()
+    stop_event = stop_event or threading.Event()
+    backend = backend or get_backend()
+    while not stop_event.is_set():
+        try:
+            # Read the generation before looking for work, so a submission that arrives
+            # after an empty claim still wakes us
+            generation = work_signal.generation
+            jobs = claim_jobs(worker_id)
 
             if not jobs:
-                logging.info("No pending translations. Waiting...")
-            else:
-                for job in jobs:
-                    job_id = job['id']
-                    transcription = job['transcription']
-                    sermon_title = job['sermon_title']
-                    source_language = job['current_language']
-                    target_language = job['convert_to_language']
-                    region = job['region'] if job['region'] else "US"  # Default to US if region is not set
-                    
-                    logging.info(f"Processing translation job {job_id}: {source_language} → {target_language} (Region: {region})...")
-                    
-                    try:
-                        # Translate both transcription and sermon title
-                        translated_text = translate_text(transcription, source_language, target_language, region)
-                        translated_sermon_title = translate_text(sermon_title, source_language, target_language, region)
-                        finished_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        # Update database with both translated texts, status, and finished time
-                        execute_with_params(
-                            "UPDATE translations "
-                            "SET translated_text = ?, translated_sermon_title = ?, status = 'completed', finished_at = ? "
-                            "WHERE id = ?",
-                            (translated_text, translated_sermon_title, finished_at, job_id)
-                        )
-                        logging.info(f"Translation job {job_id} completed successfully.")
-                    except Exception as e:
-                        logging.error(f"Translation job {job_id} failed: {e}")
-                        execute_with_params(
-                            "UPDATE translations SET status = 'failed' WHERE id = ?",
-                            (job_id,)
-                        )
-            time.sleep(TRANSLATION_POLL_INTERVAL)
+                logger.debug("No pending translations. Waiting...")
+                next_retry = seconds_until_next_retry()
+                timeout = TRANSLATION_POLL_INTERVAL if next_retry is None else min(TRANSLATION_POLL_INTERVAL, next_retry + 1)
+                work_signal.wait(generation, timeout)
+                continue
+
+            with LeaseKeeper(worker_id):
+                process_jobs(jobs, worker_id, backend)
         except Exception as e:
-            logging.error(f"Error in translation worker: {e}")
-            time.sleep(TRANSLATION_POLL_INTERVAL)
+            logger.error("Error in translation worker: %s", e, extra={"rate_limit": True})
+            stop_event.wait(TRANSLATION_POLL_INTERVAL)
+
+def stop_workers(stop_event):
+    """Ask workers (and a webhook dispatcher) sharing ``stop_event`` to exit once their current jobs finish."""
+    stop_event.set()
+    work_signal.notify()
+    webhooks.delivery_signal.notify()
+
+def start_workers(count=WORKER_COUNT, stop_event=None, backend=None):
+    """Start ``count`` worker threads sharing ``stop_event`` and ``backend``. Returns the threads."""
+    threads = []
+    for n in range(count):
+        thread = threading.Thread(
+            target=process_translation_jobs,
+            kwargs={"stop_event": stop_event, "backend": backend},
+            name=f"translation-worker-{n}",
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+def run_worker_pool(threads=WORKER_COUNT, stop_event=None, backend=None):
+    """Run ``threads`` workers with a cross-process wakeup listener until ``stop_event`` is set.
+
+    Returns once every worker has finished the jobs it had claimed, so setting the event
+    (via stop_workers) drains the pool instead of abandoning jobs to lease expiry.
+    """
+    stop_event = stop_event or threading.Event()
+    listener = WakeupListener().start()
+    try:
+        for thread in start_workers(threads, stop_event, backend):
+            thread.join()
+    finally:
+        listener.stop()
+    logger.info("Translation workers stopped.")
+
+def _run_worker_process(threads):
+    """Entry point for one worker process: run ``threads`` workers (or, in asyncio mode, one
+    AsyncWorker) and a webhook dispatcher until SIGTERM or SIGINT, then drain."""
+    stop_event = threading.Event()
+
+    def shutdown(signum, frame):
+        logger.info("Received signal %s; finishing in-flight translation jobs...", signum)
+        stop_workers(stop_event)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    snapshots = metrics.start_snapshots(stop_event)
+    dispatcher = webhooks.start_dispatcher(stop_event)
+    if WORKER_MODE == 'asyncio':
+        from async_worker import run_async_worker  # Imported here: it builds on this module
+        run_async_worker(stop_event)
+    else:
+        run_worker_pool(threads, stop_event)
+    if dispatcher is not None:
+        dispatcher.join()  # Lets webhooks in flight finish
+    if snapshots:
+        snapshots.join()  # Final snapshot includes the drained jobs
 
 if __name__ == "__main__":
-    logging.info("Starting translation worker...")
-    process_translation_jobs()
+    setup_logging()
+    if WORKER_MODE == 'asyncio':
+        logger.info("Starting translation worker (%d asyncio processes)...", WORKER_PROCESSES)
+    else:
+        logger.info("Starting translation worker (%d processes x %d threads)...", WORKER_PROCESSES, WORKER_COUNT)
+    init_db()
+    close_pools()  # Connections must not be shared with forked worker processes
+    if WORKER_PROCESSES <= 1:
+        _run_worker_process(WORKER_COUNT)
+    else:
+        processes = [
+            multiprocessing.Process(target=_run_worker_process, args=(WORKER_COUNT,), name=f"translation-worker-process-{n}")
+            for n in range(WORKER_PROCESSES)
+        ]
+        for process in processes:
+            process.start()
+
+        def forward(signum, frame):
+            # Each child drains its own jobs; the parent just waits for them
+            for process in processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for process in processes:
+            process.join()
@@ -0,0 +1,376 @@
+"""Completion webhooks: POST a job's result to its ``callback_url`` once it finishes.
+
+Deliveries are queued in the webhook_deliveries table in the same transaction that
+finishes the job, so a result is never lost between the two. A dispatcher thread in
+each worker process claims due deliveries (a short lease keeps other processes off
+them), sends up to ``WEBHOOK_CONCURRENCY`` at a time over pooled keep-alive
+connections, and reschedules failures with exponential backoff. Delivery is at least
+once: receivers can recognise a repeat by its ``X-Translator-Delivery`` header.
+
+Every request is signed: ``X-Translator-Signature`` is ``sha256=`` and the hex
+HMAC-SHA256, keyed with ``WEBHOOK_SECRET``, of the ``X-Translator-Timestamp`` value,
+a ``.`` and the body (see verify_signature). Without a WEBHOOK_SECRET the API
+refuses ``callback_url`` and no dispatcher runs.
+
+Callbacks go to public addresses only: a URL naming a loopback, link-local or private
+address is refused on submission, and a host name that resolves to one is dropped
+at delivery (unless WEBHOOK_ALLOW_PRIVATE_HOSTS is set).
+"""
+import os
+import json
+import time
+import hmac
+import hashlib
+import logging
+import threading
+import socket
+import ipaddress
+import http.client
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import metrics
+from database import execute_read, write_transaction, utc_timestamp, get_texts, backoff, in_batches
+from notifications import delivery_signal
+
+logger = logging.getLogger(__name__)
+
+# Signing, concurrency and retries
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # HMAC key shared with receivers; required for callbacks
+WEBHOOK_ALLOW_PRIVATE_HOSTS = os.getenv('WEBHOOK_ALLOW_PRIVATE_HOSTS', '0') == '1'  # Allow callbacks to internal addresses
+WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', '8'))  # Deliveries in flight per worker process
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv('WEBHOOK_TIMEOUT_SECONDS', '10'))  # Connect and read timeout per request
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '10'))  # Attempts before a delivery is dropped
+WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv('WEBHOOK_RETRY_BASE_SECONDS', '10'))  # First retry delay; doubles per attempt
+WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv('WEBHOOK_RETRY_MAX_SECONDS', '3600'))
+WEBHOOK_IDLE_SECONDS = float(os.getenv('WEBHOOK_IDLE_SECONDS', '300'))  # Safety-net check when nothing is due; queuing wakes the dispatcher
+MAX_CALLBACK_URL_LENGTH = 2048
+RETRYABLE_HTTP_STATUSES = (408, 425, 429)  # Besides 5xx; any other response is final
+
+def _is_public_address(address):
+    return ipaddress.ip_address(address.split('%')[0]).is_global
+
+def private_host(host):
+    """Whether ``host`` is, or resolves to, an address that is not public (loopback,
+    link-local, private, reserved). A name that does not resolve is not private."""
+    if WEBHOOK_ALLOW_PRIVATE_HOSTS:
+        return False
+    if host.lower() == 'localhost' or host.lower().endswith('.localhost'):
+        return True
+    try:
+        return not _is_public_address(host)
+    except ValueError:
+        pass  # A name
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (OSError, UnicodeError):
+        return False
+    return not all(_is_public_address(info[4][0]) for info in infos)
+
+def invalid_callback_url(url):
+    """Error message for a ``callback_url`` that is malformed or names a non-public address, or None.
+
+    Host names are resolved only at delivery, so submissions never wait on DNS.
+    """
+    if not WEBHOOK_SECRET:
+        return "callback_url is not available: the server has no WEBHOOK_SECRET to sign callbacks with"
+    if not isinstance(url, str) or len(url) > MAX_CALLBACK_URL_LENGTH:
+        return f"callback_url must be a URL of at most {MAX_CALLBACK_URL_LENGTH} characters"
+    try:
+        parts = urlsplit(url)
+        parts.port  # Raises on a malformed port
+    except ValueError:
+        parts = None
+    if parts is None or parts.scheme not in ('http', 'https') or not parts.hostname:
+        return "callback_url must be an absolute http or https URL"
+    try:
+        ipaddress.ip_address(parts.hostname.split('%')[0])
+        literal = True
+    except ValueError:
+        literal = parts.hostname.lower() == 'localhost' or parts.hostname.lower().endswith('.localhost')
+    if literal and private_host(parts.hostname):
+        return "callback_url must not point to a loopback, link-local or private address"
+    return None
+
+def enqueue_deliveries(cursor, job_ids):
+    """Queue a delivery for each of ``job_ids`` (just finished) that has a callback, inside an open write transaction.
+
+    The languages of a multi-target job have no callback of their own; the job's is
+    queued once the last of them finishes. Returns the number queued.
+    """
+    queued = 0
+    for batch, placeholders in in_batches(job_ids):
+        cursor.execute(
+            f"INSERT INTO webhook_deliveries (job_id, url, next_attempt_at) "
+            f"SELECT id, callback_url, ? FROM translations AS job WHERE callback_url IS NOT NULL AND ("
+            f"id IN ({placeholders}) OR id IN ("
+            f"SELECT parent_id FROM translations WHERE id IN ({placeholders}) AND parent_id IS NOT NULL) "
+            f"AND NOT EXISTS (SELECT 1 FROM translations WHERE parent_id = job.id "
+            f"AND status NOT IN ('completed', 'failed')))",
+            (utc_timestamp(), *batch, *batch)
+        )
+        queued += cursor.rowcount
+    return queued
+
+def seconds_until_next_delivery():
+    """Seconds until the earliest queued delivery is due (0 if one is due now), or None if none are queued."""
+    row = execute_read("SELECT MIN(next_attempt_at) AS next_attempt_at FROM webhook_deliveries")[0]
+    if row['next_attempt_at'] is None:
+        return None
+    due = datetime.strptime(row['next_attempt_at'], '%Y-%m-%d %H:%M:%S')
+    return max((due - datetime.utcnow()).total_seconds(), 0.0)
+
+def claim_deliveries(limit):
+    """Lease up to ``limit`` due deliveries to this process, counting an attempt for each.
+
+    A delivery whose sender dies is due again once its lease runs out.
+    """
+    if limit <= 0:
+        return []
+    lease = utc_timestamp(WEBHOOK_TIMEOUT_SECONDS * 3)
+    with write_transaction() as cursor:
+        deliveries = cursor.execute(
+            "SELECT id, job_id, url, attempts + 1 AS attempts FROM webhook_deliveries "
+            "WHERE next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+            (utc_timestamp(), limit)
+        ).fetchall()
+        if deliveries:
+            cursor.execute(
+                f"UPDATE webhook_deliveries SET attempts = attempts + 1, next_attempt_at = ? "
+                f"WHERE id IN ({', '.join('?' * len(deliveries))})",
+                (lease, *(delivery['id'] for delivery in deliveries))
+            )
+    return deliveries
+
+def build_payload(job_id):
+    """The body of a job's webhook, like its /status response with every field, or None if the job is gone.
+
+    A multi-target job reports its languages under ``translations``.
+    """
+    rows = execute_read(
+        "SELECT id, sermon_guid, status, convert_to_language, translated_sermon_title, translated_text, "
+        "created_at, finished_at, last_error FROM translations WHERE id = ? OR parent_id = ? ORDER BY id",
+        (job_id, job_id)
+    )
+    if not rows or rows[0]['id'] != job_id:
+        return None
+    job, children = rows[0], rows[1:]
+    texts = get_texts([row['id'] for row in rows], 'translated_text')
+
+    def result(row):
+        return {
+            "status": row['status'],
+            "translated_sermon_title": row['translated_sermon_title'],
+            "translated_text": texts.get(row['id'], row['translated_text']),
+            "finished": row['finished_at'],
+            "error": row['last_error'] if row['status'] == 'failed' else None,
+        }
+
+    payload = {"sermon_guid": job['sermon_guid'], "convert_to_language": job['convert_to_language'],
+               "created": job['created_at']}
+    if not children:
+        payload.update(result(job))
+        return payload
+    translations = {child['convert_to_language']: result(child) for child in children}
+    statuses = [translation['status'] for translation in translations.values()]
+    payload.update(
+        status='completed' if all(status == 'completed' for status in statuses) else 'failed',
+        convert_to_language=list(translations),
+        finished=max(translation['finished'] for translation in translations.values()),
+        translations=translations,
+    )
+    return payload
+
+def sign(body, timestamp, secret=None):
+    """The ``X-Translator-Signature`` value for ``body`` sent at ``timestamp``."""
+    key = (secret or WEBHOOK_SECRET).encode("utf-8")
+    return "sha256=" + hmac.new(key, f"{timestamp}.".encode("ascii") + body, hashlib.sha256).hexdigest()
+
+def verify_signature(body, timestamp, signature, secret=None, tolerance=300):
+    """Whether a received webhook is authentic and was sent within ``tolerance`` seconds (for receivers)."""
+    try:
+        fresh = abs(time.time() - int(timestamp)) <= tolerance
+    except (TypeError, ValueError):
+        return False
+    return fresh and hmac.compare_digest(sign(body, timestamp, secret), signature or "")
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter after failed attempt number ``attempts``."""
+    return backoff(attempts, WEBHOOK_RETRY_BASE_SECONDS, WEBHOOK_RETRY_MAX_SECONDS)
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections, reused per scheme, host and port.
+
+    A connection goes back to the pool after a complete response the server did not
+    close, and up to ``max_idle`` are kept per host. A request on a reused connection
+    that the server has meanwhile closed is retried once on a new one.
+    """
+
+    def __init__(self, max_idle=None, timeout=None):
+        self.max_idle = max_idle or WEBHOOK_CONCURRENCY
+        self.timeout = timeout or WEBHOOK_TIMEOUT_SECONDS
+        self.connections_opened = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(host, port, timeout=self.timeout), False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def post(self, url, body, headers):
+        """POST ``body`` to ``url``. Returns the response status; raises OSError or HTTPException on failure."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        while True:
+            connection, reused = self._acquire(key)
+            try:
+                connection.request("POST", path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if reused:
+                    continue  # Closed by the server while idle
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return response.status
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+class WebhookDispatcher:
+    """Sends due webhooks from this process, at most ``concurrency`` at a time."""
+
+    def __init__(self, concurrency=None, pool=None, secret=None):
+        self.concurrency = concurrency or WEBHOOK_CONCURRENCY
+        self.pool = pool or ConnectionPool(self.concurrency)
+        self.secret = secret
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def deliver(self, delivery):
+        """Send one claimed delivery, then delete it, or reschedule or drop it if it failed. Returns the outcome."""
+        started = time.perf_counter()
+        payload = build_payload(delivery['job_id'])
+        if payload is None:
+            outcome, error = 'dropped', "job no longer exists"
+        elif private_host(urlsplit(delivery['url']).hostname):
+            outcome, error = 'dropped', "host resolves to a non-public address"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            timestamp = str(int(time.time()))
+            headers = {
+                "Content-Type": "application/json",
+                "User-Agent": "TranslatorAPI-Webhooks",
+                "X-Translator-Delivery": str(delivery['id']),
+                "X-Translator-Timestamp": timestamp,
+                "X-Translator-Signature": sign(body, timestamp, self.secret),
+            }
+            try:
+                status = self.pool.post(delivery['url'], body, headers)
+                retryable = status >= 500 or status in RETRYABLE_HTTP_STATUSES
+                error = None if 200 <= status < 300 else f"HTTP {status}"
+            except (OSError, http.client.HTTPException) as e:
+                retryable, error = True, f"{type(e).__name__}: {e}"
+            if error is None:
+                outcome = 'delivered'
+            elif retryable and delivery['attempts'] < WEBHOOK_MAX_ATTEMPTS:
+                outcome = 'retried'
+            else:
+                outcome = 'dropped'
+        metrics.WEBHOOK_REQUEST_DURATION.labels(outcome).observe(time.perf_counter() - started)
+        metrics.WEBHOOK_DELIVERIES.labels(outcome).inc()
+
+        with write_transaction() as cursor:
+            if outcome == 'retried':
+                cursor.execute(
+                    "UPDATE webhook_deliveries SET next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (utc_timestamp(retry_delay(delivery['attempts'])), error, delivery['id'])
+                )
+            else:
+                cursor.execute("DELETE FROM webhook_deliveries WHERE id = ?", (delivery['id'],))
+        if outcome == 'retried':
+            logger.warning("Webhook %s to %s failed (%s); will retry.", delivery['id'], delivery['url'], error, extra={"rate_limit": True})
+        elif outcome == 'dropped':
+            logger.error(
+                "Webhook %s to %s dropped after %d attempt(s): %s", delivery['id'], delivery['url'], delivery['attempts'], error
+            )
+        return outcome
+
+    def _deliver_in_slot(self, delivery):
+        try:
+            self.deliver(delivery)
+        except Exception as e:
+            logger.error("Webhook %s failed unexpectedly: %s", delivery['id'], e)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            delivery_signal.notify()
+
+    def run(self, stop_event):
+        """Claim and send deliveries until ``stop_event`` is set; requests in flight then finish."""
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="webhook") as executor:
+            while not stop_event.is_set():
+                generation = delivery_signal.generation
+                with self._lock:
+                    free = self.concurrency - self._in_flight
+                deliveries = []
+                try:
+                    # A read decides whether anything is due, so an idle dispatcher never takes the write lock
+                    next_due = seconds_until_next_delivery()
+                    if next_due == 0 and free:
+                        deliveries = claim_deliveries(free)
+                except Exception as e:
+                    logger.error("Claiming webhooks failed: %s", e, extra={"rate_limit": True})
+                    next_due = 0
+                with self._lock:
+                    self._in_flight += len(deliveries)
+                for delivery in deliveries:
+                    executor.submit(self._deliver_in_slot, delivery)
+                if deliveries and len(deliveries) == free:
+                    continue  # There may be more due; take them as slots free up
+                # Timestamps have one-second resolution
+                timeout = WEBHOOK_IDLE_SECONDS if next_due is None else min(WEBHOOK_IDLE_SECONDS, next_due + 1)
+                delivery_signal.wait(generation, timeout)
+        self.pool.close()
+
+def stop_dispatcher(stop_event):
+    """Ask the dispatcher watching ``stop_event`` to exit once its requests in flight finish."""
+    stop_event.set()
+    delivery_signal.notify()
+
+def start_dispatcher(stop_event, **kwargs):
+    """Run a WebhookDispatcher in a daemon thread. Returns the thread, or None without a WEBHOOK_SECRET."""
+    if not (kwargs.get('secret') or WEBHOOK_SECRET):
+        logger.warning("WEBHOOK_SECRET is not set; not sending webhooks.")
+        return None
+    thread = threading.Thread(
+        target=WebhookDispatcher(**kwargs).run, args=(stop_event,), name="webhook-dispatcher", daemon=True
+    )
+    thread.start()
+    return thread